@@ -2,17 +2,67 @@
 FastAPI Backend for Face Liveness Detection System
 """
 import base64
-import cv2
-import numpy as np
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+import os
+import tempfile
+import time
+
+# Startup timing breakdown (printed at startup and returned by /ready) starts here
+IMPORT_STARTED = time.perf_counter()
+
+import asyncio
+from fastapi import FastAPI, HTTPException, Query, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from starlette.background import BackgroundTask
 import json
 from typing import Optional
 
-from utils.face_detector import FaceDetector
 from utils.liveness_detector import LivenessDetector
-from utils.database import InferenceLogger
+from utils.database import InferenceLogger, normalize_timestamp
+from utils.executor import InferenceExecutor
+from utils.face_tracker import FaceTracker
+from utils.result_cache import PassiveResultCache
+from utils.logging_policy import LoggingPolicy
+from utils.metrics import MetricsRegistry, process_memory
+from utils import log_export, pipeline, protocol
+
+# Configuration
+MODEL_PATH = os.environ.get("MODEL_PATH", "models/liveness_model.h5")
+MODEL_RUNTIME = os.environ.get("MODEL_RUNTIME", "auto")  # "auto", "keras", "tflite", "tflite-int8" or "onnx"
+MODEL_XLA = os.environ.get("MODEL_XLA", "0") == "1"  # XLA-compile Keras inference
+DB_PATH = os.environ.get("DB_PATH", "backend/inference_logs.db")
+EXECUTOR_KIND = os.environ.get("EXECUTOR_KIND", "thread")  # "thread" or "process"
+EXECUTOR_WORKERS = int(os.environ.get("EXECUTOR_WORKERS", "0")) or None
+EXECUTOR_MAX_INFLIGHT = int(os.environ.get("EXECUTOR_MAX_INFLIGHT", "0")) or None
+BATCH_MAX_SIZE = int(os.environ.get("BATCH_MAX_SIZE", "16"))  # 1 disables micro-batching
+BATCH_MAX_WAIT_MS = float(os.environ.get("BATCH_MAX_WAIT_MS", "5"))
+TRACKING_KEYFRAME_INTERVAL = int(os.environ.get("TRACKING_KEYFRAME_INTERVAL", "10"))  # 0 disables tracking
+TRACKING_MIN_SCORE = float(os.environ.get("TRACKING_MIN_SCORE", "0.6"))
+REUSE_MAX_DIFF = float(os.environ.get("REUSE_MAX_DIFF", "3"))  # 0 disables result reuse
+REUSE_MAX_AGE_MS = float(os.environ.get("REUSE_MAX_AGE_MS", "1000"))
+PREDICT_MAX_IMAGES = int(os.environ.get("PREDICT_MAX_IMAGES", "32"))
+PREDICT_MAX_BYTES = int(os.environ.get("PREDICT_MAX_BYTES", str(10 * 1024 * 1024)))
+# Executor jobs all /predict requests together may hold; the rest stay free for /ws sessions
+PREDICT_MAX_PARALLEL = int(os.environ.get("PREDICT_MAX_PARALLEL", "0")) or None
+VIDEO_MAX_BYTES = int(os.environ.get("VIDEO_MAX_BYTES", str(500 * 1024 * 1024)))
+VIDEO_SEGMENT_FRAMES = int(os.environ.get("VIDEO_SEGMENT_FRAMES", "10"))  # analyzed frames per executor job
+# Which frames get a thumbnail and a log row (see utils/logging_policy.py)
+LOG_POLICY = [m for m in os.environ.get("LOG_POLICY", "verdict_change,low_confidence,every_n,summary").split(",") if m]
+LOG_EVERY_N = int(os.environ.get("LOG_EVERY_N", "30"))
+LOG_LOW_CONFIDENCE = float(os.environ.get("LOG_LOW_CONFIDENCE", "0.7"))
+LOG_RESERVOIR_BYTES = int(os.environ.get("LOG_RESERVOIR_BYTES", "65536"))
+LOGGER_OPTIONS = {
+    "batch_size": int(os.environ.get("LOG_BATCH_SIZE", "100")),
+    "flush_interval_ms": float(os.environ.get("LOG_FLUSH_MS", "200")),
+    "max_queue": int(os.environ.get("LOG_QUEUE_SIZE", "10000")),
+    "overflow": os.environ.get("LOG_OVERFLOW", "drop"),  # "drop" or "block"
+    "retention_days": int(os.environ.get("LOG_RETENTION_DAYS", "0")),  # 0 keeps everything
+    "rollup_retention_days": int(os.environ.get("ROLLUP_RETENTION_DAYS", "365"))
+}
+
+if EXECUTOR_WORKERS is None and EXECUTOR_KIND == "thread":
+    # Threads mostly wait on the batch scheduler; leave room for a full batch to gather
+    EXECUTOR_WORKERS = max(os.cpu_count() or 1, BATCH_MAX_SIZE)
 
 app = FastAPI(title="Face Liveness Detection API")
 
@@ -25,14 +75,164 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize components
-face_detector = FaceDetector()
-liveness_detector = LivenessDetector()
-inference_logger = InferenceLogger()
+startup_timings = {"imports": time.perf_counter() - IMPORT_STARTED}
+
+# Initialize components; the model is loaded by the background warm-up (or the
+# first frame), log retention runs there too
+components_started = time.perf_counter()
+liveness_detector = LivenessDetector(MODEL_PATH, MODEL_RUNTIME, lazy=True, jit_compile=MODEL_XLA)
+liveness_detector.enable_batching(BATCH_MAX_SIZE, BATCH_MAX_WAIT_MS)
+inference_logger = InferenceLogger(DB_PATH, startup_retention=False, **LOGGER_OPTIONS)
+pipeline.share_components(liveness_detector, inference_logger)
+startup_timings["components"] = time.perf_counter() - components_started
+
+# CPU-bound frame work runs here, never on the event loop
+executor = None
+predict_slots = None
+
+# Set once the background warm-up has succeeded, or to its error (see /ready)
+warmed_up = False
+warm_up_error = None
+# Runtime of the model the workers loaded, as reported after warm-up (see /health);
+# with process workers, the detector in this process is never loaded
+loaded_runtime = None
 
 # Active check mode flag
 active_check_enabled = False
 
+# Metrics (exposed at /metrics)
+metrics = MetricsRegistry()
+stage_seconds = metrics.histogram(
+    "liveness_stage_seconds", "Time spent in each pipeline stage", ["stage"]
+)
+frame_seconds = metrics.histogram(
+    "liveness_frame_seconds", "End-to-end frame latency from receive to send"
+)
+frames_total = metrics.counter("liveness_frames_total", "Frames received")
+no_face_total = metrics.counter("liveness_no_face_total", "Frames without a usable face")
+decode_failures_total = metrics.counter("liveness_decode_failures_total", "Frames that failed to decode")
+reused_total = metrics.counter("liveness_reused_total", "Frames that reused the previous passive score")
+disconnects_total = metrics.counter("liveness_disconnects_total", "WebSocket disconnects")
+predict_images_total = metrics.counter("liveness_predict_images_total", "Images scored through POST /predict")
+active_sessions = metrics.gauge("liveness_active_sessions", "Open WebSocket sessions")
+metrics.gauge(
+    "liveness_inflight_jobs", "Jobs running on the inference executor",
+    callback=lambda: executor.inflight if executor is not None else 0
+)
+metrics.gauge(
+    "liveness_queued_jobs", "Jobs waiting for an inference executor slot",
+    callback=lambda: executor.waiting if executor is not None else 0
+)
+metrics.gauge(
+    "liveness_process_rss_bytes", "Resident memory of this server process",
+    callback=lambda: process_memory().get("rss", 0)
+)
+metrics.gauge(
+    "liveness_process_pss_bytes", "Proportional set size: resident memory with shared pages split between processes",
+    callback=lambda: process_memory().get("pss", 0)
+)
+metrics.gauge(
+    "liveness_log_queue_depth", "Inference log rows waiting for the database writer",
+    callback=lambda: inference_logger.queue_depth
+)
+metrics.counter(
+    "liveness_log_rows_dropped_total", "Inference log rows dropped on queue overflow or write errors",
+    callback=lambda: inference_logger.dropped
+)
+
+
+def record_frame_metrics(response, timings):
+    """Update per-frame counters and stage histograms"""
+    frames_total.inc()
+    for stage, seconds in timings.items():
+        stage_seconds.labels(stage).observe(seconds)
+    
+    if response["type"] == "error":
+        decode_failures_total.inc()
+    elif not response["face_detected"]:
+        no_face_total.inc()
+    elif response["reused"]:
+        reused_total.inc()
+
+
+def new_session():
+    """Per-session pipeline state for one client's stream of frames"""
+    return pipeline.SessionState(
+        liveness_detector.new_active_check_state(),
+        tracker=FaceTracker(
+            keyframe_interval=TRACKING_KEYFRAME_INTERVAL,
+            min_score=TRACKING_MIN_SCORE
+        ) if TRACKING_KEYFRAME_INTERVAL > 0 else None,
+        result_cache=PassiveResultCache(
+            max_diff=REUSE_MAX_DIFF,
+            max_age_ms=REUSE_MAX_AGE_MS
+        ) if REUSE_MAX_DIFF > 0 else None,
+        log_policy=LoggingPolicy(
+            LOG_POLICY,
+            every_n=LOG_EVERY_N,
+            low_confidence=LOG_LOW_CONFIDENCE,
+            reservoir_bytes=LOG_RESERVOIR_BYTES
+        )
+    )
+
+
+def format_timings(timings):
+    """Stage timings as "stage 0.12s, ..." for the startup log"""
+    return ", ".join(f"{stage} {seconds:.2f}s" for stage, seconds in timings.items())
+
+
+async def warm_up():
+    """
+    Load the model, run a dummy forward pass and build a MediaPipe graph on an
+    executor worker while the server already accepts connections
+    """
+    global warmed_up, warm_up_error, loaded_runtime
+    try:
+        # /predict scores up to PREDICT_MAX_IMAGES faces in one batch
+        timings = await executor.run(pipeline.warm_up, PREDICT_MAX_IMAGES)
+        loaded_runtime = await executor.run(pipeline.model_runtime)
+    except Exception as e:
+        # Stay unready: whatever failed here would fail the first frames too
+        warm_up_error = str(e)
+        print(f"Error: Warm-up failed: {e}")
+        return
+    startup_timings.update(timings)
+    print(f"Warm-up done: {format_timings(timings)}")
+    startup_timings["ready"] = time.perf_counter() - IMPORT_STARTED
+    warmed_up = True
+    print(f"Ready {startup_timings['ready']:.2f}s after start")
+
+
+@app.on_event("startup")
+async def startup():
+    """Start the inference executor and the background warm-up"""
+    global executor, predict_slots
+    start = time.perf_counter()
+    executor = InferenceExecutor(
+        kind=EXECUTOR_KIND,
+        max_workers=EXECUTOR_WORKERS,
+        max_inflight=EXECUTOR_MAX_INFLIGHT,
+        initializer=pipeline.init_worker,
+        initargs=(MODEL_PATH, DB_PATH, MODEL_RUNTIME, LOGGER_OPTIONS, MODEL_XLA)
+    )
+    print(f"Inference executor: {executor.kind} pool, "
+          f"{executor.max_workers} workers, {executor.max_inflight} max in-flight")
+    predict_slots = asyncio.Semaphore(PREDICT_MAX_PARALLEL or max(1, executor.max_inflight // 2))
+    startup_timings["executor"] = time.perf_counter() - start
+    
+    print(f"Startup: {format_timings(startup_timings)}; warming up in the background")
+    # Runs once the server is listening, so the port binds without waiting for the model
+    asyncio.get_running_loop().create_task(warm_up())
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    """Stop the inference executor and flush queued logs"""
+    if executor is not None:
+        executor.shutdown()
+    liveness_detector.disable_batching()
+    inference_logger.close()
+
 
 @app.get("/")
 async def root():
@@ -43,7 +243,30 @@ async def root():
 @app.get("/health")
 async def health():
     """Health check endpoint"""
-    return {"status": "healthy", "model_loaded": liveness_detector.model is not None}
+    return {
+        "status": "healthy",
+        "model_loaded": loaded_runtime is not None,
+        "model_runtime": loaded_runtime
+    }
+
+
+@app.get("/ready")
+async def ready():
+    """Readiness probe: 503 until the model is loaded and warmed up, or if warm-up failed"""
+    if warm_up_error is not None:
+        return JSONResponse(status_code=503, content={"status": "warm_up_failed", "error": warm_up_error})
+    if not warmed_up:
+        return JSONResponse(status_code=503, content={"status": "warming_up"})
+    return {
+        "status": "ready",
+        "startup_seconds": {stage: round(seconds, 3) for stage, seconds in startup_timings.items()}
+    }
+
+
+@app.get("/metrics")
+async def get_metrics():
+    """Prometheus metrics endpoint"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
 
 
 @app.post("/toggle-active-check")
@@ -65,109 +288,425 @@ async def toggle_active_check():
 async def websocket_endpoint(websocket: WebSocket):
     """
     WebSocket endpoint for real-time frame streaming and inference
+    Accepts JSON text messages and binary protocol messages (utils/protocol.py);
+    each response uses the same format as the message it answers.
     """
     await websocket.accept()
+    active_sessions.inc()
+    
+    # Per-session state; active check state is reset whenever active check is switched on
+    session = new_session()
+    session_active_enabled = active_check_enabled
+    
+    async def send(response, binary=False, seq=0, timestamp=0):
+        if binary:
+            await websocket.send_bytes(protocol.encode_response(response, seq, timestamp))
+        else:
+            await websocket.send_json(response)
     
     try:
         while True:
             # Receive frame data from client
-            data = await websocket.receive_text()
-            message = json.loads(data)
+            data = await websocket.receive()
+            received_at = time.perf_counter()
+            if data["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(data.get("code", 1000))
             
-            if message["type"] == "frame":
-                # Decode base64 image
-                image_data = base64.b64decode(message["data"])
-                nparr = np.frombuffer(image_data, dtype=np.uint8)
-                frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-                
-                if frame is None:
-                    await websocket.send_json({
-                        "type": "error",
-                        "message": "Failed to decode frame"
-                    })
-                    continue
-                
-                # Detect face
-                bbox = face_detector.detect_face(frame)
-                
-                if bbox is None:
-                    await websocket.send_json({
-                        "type": "result",
-                        "face_detected": False,
-                        "message": "No face detected"
-                    })
-                    continue
-                
-                # Extract face ROI
-                face_roi = face_detector.extract_face_roi(frame, bbox)
-                
-                if face_roi is None:
-                    await websocket.send_json({
-                        "type": "result",
-                        "face_detected": False,
-                        "message": "Failed to extract face"
-                    })
+            binary = data.get("bytes") is not None
+            if binary:
+                try:
+                    msg_type, seq, timestamp, image_data = protocol.decode_message(data["bytes"])
+                except protocol.ProtocolError as e:
+                    await send({"type": "error", "message": str(e)}, binary=True)
                     continue
+            else:
+                message = json.loads(data["text"])
+                msg_type, seq, timestamp = message["type"], 0, 0
+            
+            if msg_type == "hello":
+                # Protocol negotiation: confirm binary support and header layout
+                protocol_name = "binary" if message.get("protocol") == "binary" else "json"
+                await send({
+                    "type": "hello",
+                    "protocol": protocol_name,
+                    "header_size": protocol.HEADER.size
+                })
+            
+            elif msg_type == "frame":
+                if active_check_enabled and not session_active_enabled:
+                    session.active_state = liveness_detector.new_active_check_state()
+                session_active_enabled = active_check_enabled
                 
-                # Perform liveness detection
-                result = liveness_detector.detect(
-                    face_roi,
-                    frame=frame if active_check_enabled else None,
-                    face_detector=face_detector if active_check_enabled else None,
-                    use_active_check=active_check_enabled
-                )
-                
-                # Log inference (store small thumbnail)
-                _, buffer = cv2.imencode('.jpg', face_roi, [cv2.IMWRITE_JPEG_QUALITY, 50])
-                thumbnail_bytes = buffer.tobytes()
+                if not binary:
+                    # Decode base64 payload
+                    image_data = base64.b64decode(message["data"])
+                elif executor.kind == "process":
+                    # memoryview payloads cannot be pickled to worker processes
+                    image_data = bytes(image_data)
                 
-                inference_logger.log_inference(
-                    result,
-                    frame_data=thumbnail_bytes,
-                    metadata={
-                        "bbox": bbox,
-                        "active_check_enabled": active_check_enabled
-                    }
+                # Image decoding and inference run on the executor
+                response, session, timings = await executor.run(
+                    pipeline.process_frame,
+                    image_data,
+                    active_check_enabled,
+                    session
                 )
                 
                 # Send result back to client
-                await websocket.send_json({
-                    "type": "result",
-                    "face_detected": True,
-                    "is_real": result["is_real"],
-                    "confidence": round(result["confidence"], 3),
-                    "active_check_passed": result.get("active_check_passed", True),
-                    "active_check_message": result.get("active_check_message", ""),
-                    "bbox": bbox
-                })
+                await send(response, binary, seq, timestamp)
+                
+                record_frame_metrics(response, timings)
+                frame_seconds.observe(time.perf_counter() - received_at)
             
-            elif message["type"] == "ping":
+            elif msg_type == "ping":
                 # Heartbeat
-                await websocket.send_json({"type": "pong"})
+                await send({"type": "pong"}, binary, seq, timestamp)
             
-            elif message["type"] == "reset_active_check":
+            elif msg_type == "reset_active_check":
                 # Reset active check state
-                liveness_detector.reset_active_check()
-                await websocket.send_json({
+                session.active_state = liveness_detector.new_active_check_state()
+                await send({
                     "type": "active_check_reset",
                     "message": "Active check reset"
-                })
+                }, binary, seq, timestamp)
     
     except WebSocketDisconnect:
         print("Client disconnected")
+        disconnects_total.inc()
     except Exception as e:
         print(f"WebSocket error: {e}")
         await websocket.send_json({
             "type": "error",
             "message": str(e)
         })
+    finally:
+        active_sessions.dec()
+        # Reservoir samples and the session summary are logged once the session ends;
+        # log_inference may block (LOG_OVERFLOW=block), so not on the event loop
+        await executor.run(pipeline.finish_session, session)
+
+
+async def run_predict_job(fn, *args):
+    """Run a /predict job on the executor within the share reserved for batch uploads"""
+    async with predict_slots:
+        return await executor.run(fn, *args)
+
+
+def content_length(request: Request):
+    """
+    Declared body size of a request
+    Returns: Content-Length in bytes, or None if the header is absent
+    Raises: HTTPException 400 if the header is not a number
+    """
+    value = request.headers.get("content-length")
+    if value is None:
+        return None
+    if not value.isdigit():
+        raise HTTPException(status_code=400, detail="Invalid Content-Length")
+    return int(value)
+
+
+@app.post("/predict")
+async def predict(request: Request):
+    """
+    Score uploaded images (server-to-server, no WebSocket session)
+    Accepts multipart/form-data with one or more image files, or a single raw
+    image as the request body. Images are decoded and face-detected in parallel,
+    then all face ROIs go through the model in one batched forward pass.
+    """
+    if (content_length(request) or 0) > PREDICT_MAX_BYTES:
+        raise HTTPException(status_code=413, detail=f"Request exceeds {PREDICT_MAX_BYTES} bytes")
+    
+    content_type = request.headers.get("content-type", "")
+    if content_type.startswith("multipart/form-data"):
+        form = await request.form()
+        uploads = [value for _, value in form.multi_items() if hasattr(value, "read")]
+        names = [upload.filename for upload in uploads]
+        images = [await upload.read() for upload in uploads]
+    else:
+        images = [await request.body()]
+        names = [None]
+    
+    named = [(name, image) for name, image in zip(names, images) if image]
+    names = [name for name, _ in named]
+    images = [image for _, image in named]
+    if not images:
+        raise HTTPException(status_code=400, detail="No images in request")
+    if len(images) > PREDICT_MAX_IMAGES:
+        raise HTTPException(status_code=413, detail=f"At most {PREDICT_MAX_IMAGES} images per request")
+    if sum(len(image) for image in images) > PREDICT_MAX_BYTES:
+        raise HTTPException(status_code=413, detail=f"Request exceeds {PREDICT_MAX_BYTES} bytes")
+    
+    # Decode and detect faces in parallel
+    detections = await asyncio.gather(*(
+        run_predict_job(pipeline.detect_image, image) for image in images
+    ))
+    
+    # One batched forward pass over all faces
+    faces = [d for d in detections if d["face_detected"]]
+    if faces:
+        scores = await run_predict_job(
+            pipeline.predict_faces,
+            [d["face_roi"] for d in faces],
+            [d["bbox"] for d in faces]
+        )
+        for detection, (is_real, confidence) in zip(faces, scores):
+            detection.update({
+                "is_real": bool(is_real),
+                "confidence": round(confidence, 3)
+            })
+            del detection["face_roi"]
+    
+    predict_images_total.inc(len(images))
+    return {
+        "results": [
+            dict(detection, index=i, filename=name)
+            for i, (name, detection) in enumerate(zip(names, detections))
+        ]
+    }
+
+
+async def spool_upload(request: Request, max_bytes: int):
+    """
+    Write an uploaded file (raw or chunked body, or the first multipart file) to a
+    temporary file chunk by chunk, so the upload is never held in memory
+    Returns: Path of the temporary file; the caller deletes it
+    """
+    # Refuse oversized uploads before reading them: multipart parsing spools the
+    # whole body before the chunked size check below sees a byte
+    declared = content_length(request)
+    multipart = request.headers.get("content-type", "").startswith("multipart/form-data")
+    if declared is not None and declared > max_bytes:
+        raise HTTPException(status_code=413, detail=f"Upload exceeds {max_bytes} bytes")
+    if multipart and declared is None:
+        raise HTTPException(status_code=411, detail="Multipart uploads need a Content-Length")
+    
+    async def chunks():
+        if multipart:
+            form = await request.form()
+            upload = next((v for _, v in form.multi_items() if hasattr(v, "read")), None)
+            if upload is None:
+                raise HTTPException(status_code=400, detail="No file in request")
+            while chunk := await upload.read(1 << 20):
+                yield chunk
+        else:
+            async for chunk in request.stream():
+                yield chunk
+    
+    fd, path = tempfile.mkstemp(prefix="liveness_upload_")
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as f:
+            async for chunk in chunks():
+                size += len(chunk)
+                if size > max_bytes:
+                    raise HTTPException(status_code=413, detail=f"Upload exceeds {max_bytes} bytes")
+                f.write(chunk)
+        
+        if size == 0:
+            raise HTTPException(status_code=400, detail="Empty upload")
+    except BaseException:
+        os.unlink(path)
+        raise
+    return path
+
+
+def discard_upload(path):
+    """Delete a spooled upload if it is still on disk"""
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+# Cleanup jobs that must outlive the cancelled request that started them
+cleanup_tasks = set()
+
+
+async def release_video(video_path, session):
+    """Close the capture of a finished upload and log its held-back rows"""
+    await executor.run(pipeline.close_video, video_path)
+    await executor.run(pipeline.finish_session, session)
+
+
+def sse_event(event, data):
+    """Format one Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@app.post("/predict/video")
+async def predict_video(
+    request: Request,
+    sample_fps: float = Query(5.0, ge=0),
+    active_check: bool = False
+):
+    """
+    Verify a recorded session from an uploaded video
+    The video is spooled to disk and decoded as a stream at sample_fps (0 for every
+    frame). Each analyzed frame is sent as a Server-Sent Event ("frame"), followed by
+    an aggregated verdict ("summary"). Frames run through the same pipeline as /ws,
+    including the blink/head-movement active check when active_check is set.
+    """
+    video_path = await spool_upload(request, VIDEO_MAX_BYTES)
+    # Segments of one video must share a capture, which process workers cannot:
+    # there the whole video is one job and its results arrive at the end
+    segment_frames = VIDEO_SEGMENT_FRAMES if executor.kind == "thread" else None
+    
+    async def events():
+        session = new_session()
+        frames = faces = real = 0
+        confidence_sum = 0.0
+        active_passed = False
+        frame_index = 0
+        try:
+            while frame_index is not None:
+                # Short segments keep each job small and results flowing
+                responses, session, frame_index = await run_predict_job(
+                    pipeline.process_video_segment,
+                    video_path,
+                    frame_index,
+                    sample_fps,
+                    segment_frames,
+                    active_check,
+                    session
+                )
+                for response in responses:
+                    if response["type"] == "error":
+                        yield sse_event("error", response)
+                        continue
+                    frames += 1
+                    if response["face_detected"]:
+                        faces += 1
+                        real += response["is_real"]
+                        confidence_sum += response["confidence"]
+                        active_passed = active_passed or response["active_check_passed"]
+                    yield sse_event("frame", response)
+            
+            is_real = faces > 0 and real * 2 >= faces
+            yield sse_event("summary", {
+                "frames": frames,
+                "faces": faces,
+                "real_frames": real,
+                "mean_confidence": round(confidence_sum / faces, 3) if faces else 0.0,
+                "active_check_passed": active_passed if active_check else None,
+                "is_real": is_real and (active_passed or not active_check)
+            })
+        finally:
+            # A client disconnect cancels this generator at its next await, so the
+            # file goes first (an open capture keeps reading through its handle)
+            # and the executor jobs run in a task of their own
+            discard_upload(video_path)
+            cleanup = asyncio.ensure_future(release_video(video_path, session))
+            cleanup_tasks.add(cleanup)
+            cleanup.add_done_callback(cleanup_tasks.discard)
+            await asyncio.shield(cleanup)
+    
+    # Also runs when events() never starts (client gone before the response)
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"},
+        background=BackgroundTask(discard_upload, video_path)
+    )
+
+
+def timestamp_query(value, name):
+    """Validate a since/until query parameter (422 if it is not a timestamp)"""
+    try:
+        return normalize_timestamp(value)
+    except ValueError:
+        raise HTTPException(
+            status_code=422,
+            detail=f"{name} must be a UTC timestamp like 2024-01-31 or 2024-01-31T12:00:00"
+        )
 
 
 @app.get("/logs")
-async def get_logs(limit: int = 100):
-    """Get recent inference logs"""
-    logs = inference_logger.get_recent_logs(limit=limit)
-    return {"logs": logs, "count": len(logs)}
+async def get_logs(
+    limit: int = Query(100, ge=1, le=1000),
+    before_id: Optional[int] = None,
+    is_real: Optional[bool] = None,
+    min_confidence: Optional[float] = None,
+    max_confidence: Optional[float] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None
+):
+    """
+    Get inference logs, newest first, without thumbnails
+    Pass next_before_id from a response as before_id to fetch the next page.
+    """
+    since = timestamp_query(since, "since")
+    until = timestamp_query(until, "until")
+    # The logger holds locks and a queue and cannot be sent to process workers:
+    # reads run on a thread of this process
+    logs = await asyncio.to_thread(
+        inference_logger.get_logs,
+        before_id=before_id,
+        limit=limit,
+        is_real=is_real,
+        min_confidence=min_confidence,
+        max_confidence=max_confidence,
+        since=since,
+        until=until
+    )
+    next_before_id = logs[-1]["id"] if len(logs) == limit else None
+    return {"logs": logs, "count": len(logs), "next_before_id": next_before_id}
+
+
+@app.get("/logs/export")
+async def export_logs(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    is_real: Optional[bool] = None,
+    min_confidence: Optional[float] = None,
+    max_confidence: Optional[float] = None
+):
+    """
+    Stream all matching inference logs, oldest first, as NDJSON or CSV
+    Logs are read in keyset chunks, so memory use does not depend on the time range.
+    """
+    since = timestamp_query(since, "since")
+    until = timestamp_query(until, "until")
+    logs = inference_logger.iter_logs(
+        since=since,
+        until=until,
+        is_real=is_real,
+        min_confidence=min_confidence,
+        max_confidence=max_confidence
+    )
+    return StreamingResponse(
+        log_export.export_chunks(logs, format),
+        media_type=log_export.EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="inference_logs.{format}"'}
+    )
+
+
+@app.get("/stats")
+async def get_stats(
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    resolution: str = Query("minute", pattern="^(minute|hour|day)$")
+):
+    """
+    Get pre-aggregated frame counts for dashboards
+    Reads the per-minute rollup table, never the raw logs.
+    """
+    since = timestamp_query(since, "since")
+    until = timestamp_query(until, "until")
+    rollups = await asyncio.to_thread(
+        inference_logger.get_rollups, since=since, until=until, resolution=resolution
+    )
+    return {"rollups": rollups, "count": len(rollups)}
+
+
+@app.get("/logs/{log_id}/thumbnail")
+async def get_log_thumbnail(log_id: int):
+    """Get the JPEG thumbnail stored with one inference log"""
+    thumbnail = await asyncio.to_thread(inference_logger.get_thumbnail, log_id)
+    if thumbnail is None:
+        raise HTTPException(status_code=404, detail="Thumbnail not found")
+    return Response(content=thumbnail, media_type="image/jpeg")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,148 @@
+"""
+Export the trained liveness model to lightweight inference formats
+TFLite (float16 and int8 post-training quantization) and optionally ONNX
+"""
+import argparse
+import os
+import random
+from pathlib import Path
+
+import cv2
+import numpy as np
+import tensorflow as tf
+from tensorflow import keras
+
+
+def load_calibration_images(data_dir="datasets", num_samples=200, image_size=(128, 128), seed=42):
+    """
+    Load a random, class-balanced sample of training images for int8 calibration
+    Preprocessed exactly like LivenessDetector.preprocess_frame (RGB, [0, 1])
+    Returns: float32 array (N, 128, 128, 3)
+    """
+    rng = random.Random(seed)
+    images = []
+
+    for class_name in ("real", "spoof"):
+        paths = sorted((Path(data_dir) / class_name).glob("*.jpg"))
+        rng.shuffle(paths)
+        for img_path in paths[:num_samples // 2]:
+            img = cv2.imread(str(img_path))
+            if img is None:
+                continue
+            img = cv2.resize(img, image_size)
+            img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+            images.append(img.astype(np.float32) / 255.0)
+
+    return np.array(images, dtype=np.float32)
+
+
+def export_tflite(model, output_path, quantization="float16", calibration_images=None):
+    """
+    Convert a Keras model to TFLite
+    Args:
+        model: Keras model
+        output_path: Destination .tflite file
+        quantization: "float16" or "int8"
+        calibration_images: Representative inputs, required for int8
+    Returns: Size of the written model in bytes
+    """
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+
+    if quantization == "float16":
+        converter.target_spec.supported_types = [tf.float16]
+    elif quantization == "int8":
+        if calibration_images is None or len(calibration_images) == 0:
+            raise ValueError("int8 quantization needs calibration images")
+
+        def representative_dataset():
+            for image in calibration_images:
+                yield [image[np.newaxis]]
+
+        converter.representative_dataset = representative_dataset
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+    else:
+        raise ValueError(f"Unknown quantization: {quantization}")
+
+    tflite_model = converter.convert()
+    with open(output_path, "wb") as f:
+        f.write(tflite_model)
+    return len(tflite_model)
+
+
+def export_onnx(model, output_path, image_size=(128, 128)):
+    """
+    Convert a Keras model to ONNX (requires tf2onnx)
+    Returns: Size of the written model in bytes
+    """
+    import tf2onnx
+
+    input_signature = (
+        tf.TensorSpec((None, image_size[0], image_size[1], 3), tf.float32, name="input"),
+    )
+    tf2onnx.convert.from_keras(
+        model, input_signature=input_signature, opset=13, output_path=str(output_path)
+    )
+    return os.path.getsize(output_path)
+
+
+def export_model(
+    model_path="models/liveness_model.h5",
+    data_dir="datasets",
+    formats=("fp16", "int8"),
+    calibration_samples=200
+):
+    """
+    Export a trained model next to itself
+    Writes <name>_fp16.tflite, <name>_int8.tflite and <name>.onnx, the file
+    names LivenessDetector looks for ("auto" picks fp16 or ONNX; int8 needs
+    runtime "tflite-int8").
+    """
+    model_path = Path(model_path)
+    print(f"Loading model from {model_path}...")
+    model = keras.models.load_model(model_path)
+
+    calibration_images = None
+    if "int8" in formats:
+        calibration_images = load_calibration_images(data_dir, calibration_samples)
+        print(f"Loaded {len(calibration_images)} calibration images from {data_dir}")
+
+    outputs = {}
+    for fmt in formats:
+        if fmt == "fp16":
+            output_path = model_path.with_name(model_path.stem + "_fp16.tflite")
+            size = export_tflite(model, output_path, "float16")
+        elif fmt == "int8":
+            output_path = model_path.with_name(model_path.stem + "_int8.tflite")
+            size = export_tflite(model, output_path, "int8", calibration_images)
+        elif fmt == "onnx":
+            output_path = model_path.with_suffix(".onnx")
+            size = export_onnx(model, output_path)
+        else:
+            raise ValueError(f"Unknown format: {fmt}")
+
+        print(f"  {fmt}: {output_path} ({size / 1024 / 1024:.1f} MB)")
+        outputs[fmt] = output_path
+
+    return outputs
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export liveness model to TFLite/ONNX")
+    parser.add_argument("--model", default="models/liveness_model.h5",
+                        help="Trained Keras model")
+    parser.add_argument("--data-dir", default="datasets",
+                        help="Dataset with real/ and spoof/ for int8 calibration")
+    parser.add_argument("--formats", nargs="+", default=["fp16", "int8"],
+                        choices=["fp16", "int8", "onnx"],
+                        help="Formats to export")
+    parser.add_argument("--calibration-samples", type=int, default=200,
+                        help="Number of calibration images for int8")
+    args = parser.parse_args()
+
+    export_model(
+        model_path=args.model,
+        data_dir=args.data_dir,
+        formats=args.formats,
+        calibration_samples=args.calibration_samples
+    )
@@ -4,10 +4,24 @@ Download and preprocess public datasets for training
 """
 import os
 import cv2
+import errno
+import hashlib
+import json
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import shutil
 
+# Shard layout written by build_shards and read by model/train_model.py
+SHARD_MANIFEST = "manifest.json"
+DEFAULT_SHARD_SIZE = 2048
+
+# Record of organized files, kept in the dataset root next to real/ and spoof/
+ORGANIZE_MANIFEST = "organize_manifest.json"
+
+# Linux ioctl that clones a file's extents (copy-on-write reflink)
+FICLONE = 0x40049409
+
 
 def preprocess_image(image_path, output_size=(128, 128), normalize=True):
     """
@@ -27,27 +41,268 @@ def preprocess_image(image_path, output_size=(128, 128), normalize=True):
     return img
 
 
-def organize_dataset(source_dir, target_dir, real_folder="real", spoof_folder="spoof"):
+def file_sha256(path, chunk_size=1 << 20):
+    """SHA-256 hex digest of a file's contents"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def link_or_copy(source, target):
     """
-    Organize dataset into real/spoof folders
+    Place source at target without copying data where possible
+    Tries a hardlink, then a reflink (copy-on-write clone), then a regular copy.
+    Hardlinked targets share the source inode: treat organized files as read-only.
+    Returns: "hardlink", "reflink" or "copy"
+    """
+    try:
+        os.link(source, target)
+        return "hardlink"
+    except OSError as e:
+        if e.errno == errno.EEXIST:
+            raise
+    
+    try:
+        import fcntl
+        with open(source, "rb") as src, open(target, "wb") as dst:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+        return "reflink"
+    except (ImportError, OSError):
+        # Not Linux, or the filesystem has no reflinks
+        if os.path.exists(target):
+            os.remove(target)
+    
+    shutil.copy2(source, target)
+    return "copy"
+
+
+def organize_files(files, target_dir, workers=None):
+    """
+    Organize labeled images into target_dir/<class>/<sha256>.jpg in parallel
+    Files are named by content hash, so equal names from different sources never
+    collide and exact duplicates are stored once. Files are hardlinked (or reflinked)
+    when possible instead of copied. Every run is merged into target_dir/organize_manifest.json.
+    Args:
+        files: Iterable of (source path, class name) pairs
+        target_dir: Dataset directory
+        workers: I/O threads (default: 4 x CPU count)
+    Returns: Counts per outcome (hardlink, reflink, copy, duplicates, conflicts)
     """
-    target_real = Path(target_dir) / real_folder
-    target_spoof = Path(target_dir) / spoof_folder
+    target_path = Path(target_dir)
+    files = [(Path(source), class_name) for source, class_name in files]
+    for class_name in {class_name for _, class_name in files}:
+        (target_path / class_name).mkdir(parents=True, exist_ok=True)
     
-    target_real.mkdir(parents=True, exist_ok=True)
-    target_spoof.mkdir(parents=True, exist_ok=True)
+    manifest_path = target_path / ORGANIZE_MANIFEST
+    if manifest_path.exists():
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+    else:
+        manifest = {"files": {}, "conflicts": []}
+    entries = manifest["files"]
     
-    source_path = Path(source_dir)
+    counts = {"hardlink": 0, "reflink": 0, "copy": 0, "duplicates": 0, "conflicts": 0}
     
-    # Copy files based on folder structure or naming convention
-    for img_path in source_path.rglob("*.jpg"):
+    # Hashing and linking are I/O bound: threads overlap the disk waits
+    with ThreadPoolExecutor(max_workers=workers or 4 * (os.cpu_count() or 1)) as pool:
+        digests = list(pool.map(lambda f: file_sha256(f[0]), files))
+        
+        # Deduplicate serially so exactly one source wins for each digest
+        to_link = []
+        for (source, class_name), digest in zip(files, digests):
+            entry = entries.get(digest)
+            if entry is None:
+                entry = {"class": class_name, "path": f"{class_name}/{digest}.jpg", "sources": []}
+                entries[digest] = entry
+                to_link.append((source, target_path / entry["path"]))
+            elif entry["class"] != class_name:
+                # Same bytes labeled real in one place and spoof in another: keep the first label
+                conflict = {"sha256": digest, "source": str(source), "class": class_name}
+                if conflict not in manifest["conflicts"]:
+                    manifest["conflicts"].append(conflict)
+                counts["conflicts"] += 1
+                continue
+            else:
+                counts["duplicates"] += 1
+            if str(source) not in entry["sources"]:
+                entry["sources"].append(str(source))
+        
+        def place(pair):
+            source, target = pair
+            if target.exists():
+                return None
+            return link_or_copy(source, target)
+        
+        for method in pool.map(place, to_link):
+            if method is not None:
+                counts[method] += 1
+    
+    with open(manifest_path, "w") as f:
+        json.dump(manifest, f, indent=1)
+    
+    print(f"Organized {len(files)} files into {target_dir}: "
+          f"{counts['hardlink']} hardlinked, {counts['reflink']} reflinked, {counts['copy']} copied, "
+          f"{counts['duplicates']} duplicates skipped, {counts['conflicts']} label conflicts")
+    return counts
+
+
+def organize_dataset(source_dir, target_dir, real_folder="real", spoof_folder="spoof"):
+    """
+    Organize dataset into real/spoof folders
+    """
+    files = []
+    for img_path in Path(source_dir).rglob("*.jpg"):
         # Adjust this logic based on your dataset structure
         parent_name = img_path.parent.name.lower()
         
         if "real" in parent_name or "live" in parent_name or "genuine" in parent_name:
-            shutil.copy(img_path, target_real / img_path.name)
+            files.append((img_path, real_folder))
         elif "spoof" in parent_name or "fake" in parent_name or "attack" in parent_name:
-            shutil.copy(img_path, target_spoof / img_path.name)
+            files.append((img_path, spoof_folder))
+    
+    return organize_files(files, target_dir)
+
+
+def list_labeled_images(data_dir):
+    """
+    List (path, label) pairs from data_dir/real and data_dir/spoof (1 real, 0 spoof)
+    """
+    files = []
+    for class_name, label in (("real", 1), ("spoof", 0)):
+        class_dir = Path(data_dir) / class_name
+        if class_dir.exists():
+            files.extend((str(p), label) for p in sorted(class_dir.glob("*.jpg")))
+    return files
+
+
+def _load_for_shard(path, image_size):
+    """
+    Read one image for a shard
+    Returns: (RGB uint8 image or None, sha256 of the file, size, mtime)
+    """
+    data = Path(path).read_bytes()
+    stat = os.stat(path)
+    digest = hashlib.sha256(data).hexdigest()
+    
+    img = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if img is not None:
+        img = cv2.resize(img, image_size)
+        img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+    return img, digest, stat.st_size, stat.st_mtime
+
+
+def build_shards(data_dir, output_dir, shard_size=DEFAULT_SHARD_SIZE, image_size=(128, 128),
+                 workers=None):
+    """
+    Pack resized images and labels into fixed-size memory-mappable .npy shards
+    Each shard is shard_NNNNN_images.npy (uint8, N x H x W x 3, RGB) plus
+    shard_NNNNN_labels.npy (uint8). manifest.json records every source file
+    with its sha256, size, mtime, label and position in the shards.
+    Args:
+        data_dir: Dataset directory with real/ and spoof/
+        output_dir: Directory for the shards and manifest
+        shard_size: Images per shard
+        image_size: Resize target (width, height)
+        workers: Decode threads (default: CPU count)
+    Returns: Manifest dict
+    """
+    output_path = Path(output_dir)
+    output_path.mkdir(parents=True, exist_ok=True)
+    
+    # The old manifest must not outlive its shards: without it, an interrupted
+    # rebuild reads as missing, not as a complete set of half-overwritten shards
+    (output_path / SHARD_MANIFEST).unlink(missing_ok=True)
+    for stale in output_path.glob("shard_*.npy"):
+        stale.unlink()
+    
+    files = list_labeled_images(data_dir)
+    manifest = {
+        "version": 1,
+        "data_dir": str(data_dir),
+        "image_size": list(image_size),
+        "shard_size": shard_size,
+        "shards": [],
+        "files": [],
+        "skipped": []
+    }
+    
+    # OpenCV releases the GIL while decoding, so threads use all cores
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        for start in range(0, len(files), shard_size):
+            chunk = files[start:start + shard_size]
+            loaded = pool.map(lambda f: _load_for_shard(f[0], image_size), chunk)
+            
+            shard_index = len(manifest["shards"])
+            images = []
+            labels = []
+            for (path, label), (img, digest, size, mtime) in zip(chunk, loaded):
+                if img is None:
+                    manifest["skipped"].append(path)
+                    continue
+                manifest["files"].append({
+                    "path": path,
+                    "sha256": digest,
+                    "size": size,
+                    "mtime": mtime,
+                    "label": label,
+                    "shard": shard_index,
+                    "index": len(images)
+                })
+                images.append(img)
+                labels.append(label)
+            
+            if not images:
+                continue
+            
+            name = f"shard_{shard_index:05d}"
+            np.save(output_path / f"{name}_images.npy", np.stack(images))
+            np.save(output_path / f"{name}_labels.npy", np.array(labels, dtype=np.uint8))
+            manifest["shards"].append({
+                "images": f"{name}_images.npy",
+                "labels": f"{name}_labels.npy",
+                "count": len(images)
+            })
+            print(f"Wrote {name} ({len(images)} images)")
+    
+    # Written last: a manifest only exists for a complete set of shards
+    with open(output_path / SHARD_MANIFEST, "w") as f:
+        json.dump(manifest, f)
+    
+    print(f"Packed {len(manifest['files'])} images into {len(manifest['shards'])} shards "
+          f"at {output_dir} ({len(manifest['skipped'])} unreadable files skipped)")
+    return manifest
+
+
+def shards_up_to_date(data_dir, shard_dir):
+    """
+    Check that shards still match the dataset (same files, sizes and mtimes)
+    Uses os.stat only; file contents are not re-hashed.
+    """
+    manifest_path = Path(shard_dir) / SHARD_MANIFEST
+    if not manifest_path.exists():
+        return False
+    
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    
+    recorded = {entry["path"]: entry for entry in manifest["files"]}
+    recorded.update({path: None for path in manifest["skipped"]})
+    current = list_labeled_images(data_dir)
+    if len(current) != len(recorded):
+        return False
+    
+    for path, _ in current:
+        if path not in recorded:
+            return False
+        entry = recorded[path]
+        if entry is None:
+            continue
+        stat = os.stat(path)
+        if stat.st_size != entry["size"] or stat.st_mtime != entry["mtime"]:
+            return False
+    return True
 
 
 def create_synthetic_dataset(output_dir="datasets/synthetic", num_samples=100):
@@ -89,8 +344,12 @@ if __name__ == "__main__":
             create_synthetic_dataset()
         elif sys.argv[1] == "organize" and len(sys.argv) > 3:
             organize_dataset(sys.argv[2], sys.argv[3])
+        elif sys.argv[1] == "shard" and len(sys.argv) > 3:
+            shard_size = int(sys.argv[4]) if len(sys.argv) > 4 else DEFAULT_SHARD_SIZE
+            build_shards(sys.argv[2], sys.argv[3], shard_size=shard_size)
     else:
         print("Usage:")
         print("  python preprocess_dataset.py synthetic  # Create synthetic test dataset")
         print("  python preprocess_dataset.py organize <source> <target>  # Organize dataset")
+        print("  python preprocess_dataset.py shard <dataset> <output> [shard_size]  # Pack .npy shards")
 
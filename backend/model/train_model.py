@@ -2,21 +2,21 @@
 Train MobileNetV2-based liveness detection model
 """
 import os
+import hashlib
+import json
 import numpy as np
 import tensorflow as tf
 from tensorflow import keras
 from tensorflow.keras.applications import MobileNetV2
 from tensorflow.keras.layers import Dense, GlobalAveragePooling2D, Dropout
 from tensorflow.keras.models import Model
-from tensorflow.keras.preprocessing.image import ImageDataGenerator
 from sklearn.model_selection import train_test_split
-import cv2
 from pathlib import Path
 
 
-def load_and_preprocess_dataset(data_dir, image_size=(128, 128)):
+def list_image_files(data_dir):
     """
-    Load and preprocess dataset from directory structure:
+    List image files and labels from directory structure:
     data_dir/
         real/
             image1.jpg
@@ -26,45 +26,207 @@ def load_and_preprocess_dataset(data_dir, image_size=(128, 128)):
             image1.jpg
             image2.jpg
             ...
+    Only paths are collected; images are read later by the tf.data pipeline.
+    Returns: (list of paths, int array of labels: 1 for real, 0 for spoof)
     """
-    real_images = []
-    spoof_images = []
+    paths = []
+    labels = []
     
-    real_dir = Path(data_dir) / "real"
-    spoof_dir = Path(data_dir) / "spoof"
+    for class_name, label in (("real", 1), ("spoof", 0)):
+        class_dir = Path(data_dir) / class_name
+        if class_dir.exists():
+            class_paths = sorted(str(p) for p in class_dir.glob("*.jpg"))
+            paths.extend(class_paths)
+            labels.extend([label] * len(class_paths))
     
-    # Load real images
-    if real_dir.exists():
-        for img_path in real_dir.glob("*.jpg"):
-            img = cv2.imread(str(img_path))
-            if img is not None:
-                img = cv2.resize(img, image_size)
-                img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-                real_images.append(img)
+    return paths, np.array(labels, dtype=np.int32)
+
+
+def split_files(paths, labels, validation_split=0.2, test_split=0.1, seed=42):
+    """
+    Stratified train/val/test split of file paths
+    Returns: ((train_paths, train_labels), (val_paths, val_labels), (test_paths, test_labels))
+    """
+    paths_temp, paths_test, y_temp, y_test = train_test_split(
+        paths, labels, test_size=test_split, random_state=seed, stratify=labels
+    )
     
-    # Load spoof images
-    if spoof_dir.exists():
-        for img_path in spoof_dir.glob("*.jpg"):
-            img = cv2.imread(str(img_path))
-            if img is not None:
-                img = cv2.resize(img, image_size)
-                img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-                spoof_images.append(img)
+    val_size = validation_split / (1 - test_split)
+    paths_train, paths_val, y_train, y_val = train_test_split(
+        paths_temp, y_temp, test_size=val_size, random_state=seed, stratify=y_temp
+    )
     
-    # Create labels (1 for real, 0 for spoof)
-    real_labels = [1] * len(real_images)
-    spoof_labels = [0] * len(spoof_images)
+    return (paths_train, y_train), (paths_val, y_val), (paths_test, y_test)
+
+
+def load_image(path, label, image_size=(128, 128)):
+    """
+    Read, decode and resize one image inside the tf.data graph
+    Matches the OpenCV preprocessing used at inference (RGB, bilinear resize, [0, 1]).
+    """
+    image = tf.io.read_file(path)
+    # INTEGER_ACCURATE is libjpeg's default, as used by cv2.imread
+    image = tf.io.decode_jpeg(image, channels=3, dct_method="INTEGER_ACCURATE")
+    image = tf.image.resize(image, image_size, method="bilinear")
+    image = tf.cast(image, tf.float32) / 255.0
+    return image, label
+
+
+def create_augmentation():
+    """
+    Random augmentation applied to training batches
+    (rotation, shift, zoom and horizontal flip)
+    """
+    return keras.Sequential([
+        keras.layers.RandomRotation(15 / 360, fill_mode='nearest'),
+        keras.layers.RandomTranslation(0.1, 0.1, fill_mode='nearest'),
+        keras.layers.RandomZoom(0.1, fill_mode='nearest'),
+        keras.layers.RandomFlip('horizontal')
+    ], name="augmentation")
+
+
+def make_dataset(paths, labels, image_size=(128, 128), batch_size=32, training=False,
+                 shuffle_buffer=10000, seed=42):
+    """
+    Build a streaming tf.data pipeline over image files
+    Files are decoded in parallel on all cores and batches are prefetched, so
+    memory use depends on shuffle_buffer and batch_size, not on the dataset size.
+    Args:
+        paths: Image file paths
+        labels: Labels (1 real, 0 spoof)
+        image_size: Model input size
+        batch_size: Batch size
+        training: Shuffle (reshuffled every epoch) and augment
+        shuffle_buffer: Number of file paths in the shuffle buffer
+        seed: Shuffle seed
+    Returns: tf.data.Dataset of (images, labels) batches
+    """
+    dataset = tf.data.Dataset.from_tensor_slices((list(paths), np.asarray(labels, dtype=np.float32)))
     
-    # Combine
-    X = np.array(real_images + spoof_images, dtype=np.float32) / 255.0
-    y = np.array(real_labels + spoof_labels)
+    if training:
+        # Shuffle paths before decoding: the buffer holds strings, not images
+        dataset = dataset.shuffle(
+            min(shuffle_buffer, len(paths)), seed=seed, reshuffle_each_iteration=True
+        )
+    
+    dataset = dataset.map(
+        lambda path, label: load_image(path, label, image_size),
+        num_parallel_calls=tf.data.AUTOTUNE,
+        deterministic=not training
+    )
+    # Skip unreadable files, as the OpenCV loader did
+    dataset = dataset.ignore_errors()
+    dataset = dataset.batch(batch_size)
+    
+    if training:
+        augmentation = create_augmentation()
+        dataset = dataset.map(
+            lambda images, batch_labels: (augmentation(images, training=True), batch_labels),
+            num_parallel_calls=tf.data.AUTOTUNE
+        )
     
-    return X, y
+    return dataset.prefetch(tf.data.AUTOTUNE)
 
 
-def create_model(input_shape=(128, 128, 3)):
+class ShardReader:
     """
-    Create MobileNetV2-based liveness detection model
+    Read-only view of the .npy shards written by `preprocess_dataset.py shard`
+    Image shards are memory-mapped: only the rows of each batch are read from disk.
+    """
+    def __init__(self, shard_dir):
+        shard_dir = Path(shard_dir)
+        self.shard_dir = shard_dir
+        with open(shard_dir / "manifest.json") as f:
+            self.manifest = json.load(f)
+        
+        self.images = [
+            np.load(shard_dir / shard["images"], mmap_mode="r")
+            for shard in self.manifest["shards"]
+        ]
+        self.labels = np.concatenate([
+            np.load(shard_dir / shard["labels"]) for shard in self.manifest["shards"]
+        ]).astype(np.int32) if self.images else np.zeros(0, dtype=np.int32)
+        
+        # Global index -> (shard, row)
+        counts = [len(images) for images in self.images]
+        self.offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+    
+    def __len__(self):
+        return len(self.labels)
+    
+    @property
+    def image_shape(self):
+        width, height = self.manifest["image_size"]
+        return (height, width, 3)
+    
+    def take(self, indices):
+        """
+        Gather images and labels by global index
+        Args:
+            indices: Sorted array of global indices
+        Returns: (uint8 images, float32 labels)
+        """
+        shard_ids = np.searchsorted(self.offsets, indices, side="right") - 1
+        batch = np.empty((len(indices),) + self.image_shape, dtype=np.uint8)
+        for shard_id in np.unique(shard_ids):
+            mask = shard_ids == shard_id
+            batch[mask] = self.images[shard_id][indices[mask] - self.offsets[shard_id]]
+        return batch, self.labels[indices].astype(np.float32)
+
+
+def make_shard_dataset(reader, indices, batch_size=32, training=False, seed=42):
+    """
+    Build a tf.data pipeline over memory-mapped shards (no JPEG decoding)
+    Args:
+        reader: ShardReader
+        indices: Global indices of the samples in this split
+        batch_size: Batch size
+        training: Shuffle (reshuffled every epoch) and augment
+        seed: Shuffle seed
+    Returns: tf.data.Dataset of (images, labels) batches
+    """
+    dataset = tf.data.Dataset.from_tensor_slices(np.asarray(indices, dtype=np.int64))
+    if training:
+        dataset = dataset.shuffle(max(1, len(indices)), seed=seed, reshuffle_each_iteration=True)
+    dataset = dataset.batch(batch_size)
+    
+    def take(batch_indices):
+        # Sorted within the batch so reads walk each shard forward
+        images, labels = tf.numpy_function(
+            reader.take, [tf.sort(batch_indices)], (tf.uint8, tf.float32)
+        )
+        images.set_shape((None,) + reader.image_shape)
+        labels.set_shape((None,))
+        return tf.cast(images, tf.float32) / 255.0, labels
+    
+    # Index batches are gathered by parallel map calls, unlike from_generator,
+    # which runs one Python generator on one thread
+    dataset = dataset.map(take, num_parallel_calls=tf.data.AUTOTUNE)
+    
+    if training:
+        augmentation = create_augmentation()
+        dataset = dataset.map(
+            lambda images, labels: (augmentation(images, training=True), labels),
+            num_parallel_calls=tf.data.AUTOTUNE
+        )
+    
+    return dataset.prefetch(tf.data.AUTOTUNE)
+
+
+def add_head(x):
+    """
+    Classification head on pooled backbone features
+    """
+    x = Dense(128, activation='relu')(x)
+    x = Dropout(0.5)(x)
+    x = Dense(64, activation='relu')(x)
+    x = Dropout(0.3)(x)
+    return Dense(1, activation='sigmoid')(x)
+
+
+def create_backbone(input_shape=(128, 128, 3)):
+    """
+    Frozen MobileNetV2 feature extractor
     """
     # Load MobileNetV2 as base
     base = MobileNetV2(
@@ -76,70 +238,376 @@ def create_model(input_shape=(128, 128, 3)):
     # Freeze base layers initially (optional - can unfreeze later for fine-tuning)
     base.trainable = False
     
+    return base
+
+
+def create_model(input_shape=(128, 128, 3)):
+    """
+    Create MobileNetV2-based liveness detection model
+    """
+    base = create_backbone(input_shape)
+    
     # Add custom head
     x = base.output
     x = GlobalAveragePooling2D()(x)
-    x = Dense(128, activation='relu')(x)
-    x = Dropout(0.5)(x)
-    x = Dense(64, activation='relu')(x)
-    x = Dropout(0.3)(x)
-    out = Dense(1, activation='sigmoid')(x)
+    out = add_head(x)
     
     model = Model(base.input, out)
     
     return model
 
 
+def create_head(embedding_dim=1280):
+    """
+    Head alone, trained on cached backbone embeddings
+    """
+    inputs = keras.Input(shape=(embedding_dim,))
+    return Model(inputs, add_head(inputs))
+
+
+def attach_head(head, input_shape=(128, 128, 3)):
+    """
+    Build the full model with the weights of a head trained on embeddings
+    """
+    model = create_model(input_shape)
+    model_dense = [layer for layer in model.layers if isinstance(layer, Dense)]
+    head_dense = [layer for layer in head.layers if isinstance(layer, Dense)]
+    for target, source in zip(model_dense, head_dense):
+        target.set_weights(source.get_weights())
+    return model
+
+
+def backbone_fingerprint(base, input_shape):
+    """
+    Hash of the backbone architecture, weights and input size
+    """
+    digest = hashlib.sha256()
+    digest.update(f"{base.name}:{tuple(input_shape)}:{len(base.layers)}".encode())
+    for weight in base.get_weights():
+        digest.update(np.ascontiguousarray(weight).tobytes())
+    return digest.hexdigest()
+
+
+def dataset_fingerprint(paths=None, shard_dir=None):
+    """
+    Hash of the training inputs: the shard manifest, or paths with sizes and mtimes
+    """
+    digest = hashlib.sha256()
+    if shard_dir is not None:
+        digest.update((Path(shard_dir) / "manifest.json").read_bytes())
+    else:
+        for path in paths:
+            stat = os.stat(path)
+            digest.update(f"{path}:{stat.st_size}:{stat.st_mtime}\n".encode())
+    return digest.hexdigest()
+
+
+def _embedding_inputs(paths=None, reader=None, image_size=(128, 128), batch_size=64):
+    """
+    Every sample in order as (images, global indices) batches
+    Unreadable files are skipped; their indices never appear.
+    """
+    if reader is not None:
+        def batches():
+            for start in range(0, len(reader), batch_size):
+                indices = np.arange(start, min(start + batch_size, len(reader)))
+                yield reader.take(indices)[0], indices
+        
+        dataset = tf.data.Dataset.from_generator(
+            batches,
+            output_signature=(
+                tf.TensorSpec((None,) + reader.image_shape, tf.uint8),
+                tf.TensorSpec((None,), tf.int64)
+            )
+        )
+        dataset = dataset.map(
+            lambda images, indices: (tf.cast(images, tf.float32) / 255.0, indices),
+            num_parallel_calls=tf.data.AUTOTUNE
+        )
+    else:
+        dataset = tf.data.Dataset.from_tensor_slices((list(paths), np.arange(len(paths))))
+        dataset = dataset.map(
+            lambda path, index: load_image(path, index, image_size),
+            num_parallel_calls=tf.data.AUTOTUNE
+        )
+        dataset = dataset.ignore_errors().batch(batch_size)
+    
+    return dataset.prefetch(tf.data.AUTOTUNE)
+
+
+def compute_embeddings(cache_dir, paths=None, reader=None, input_shape=(128, 128, 3),
+                       augment_variants=2, batch_size=64, seed=42):
+    """
+    Run the frozen backbone once per image, plus augment_variants augmented copies,
+    and cache the pooled embeddings on disk
+    The cache is reused only while the backbone weights, input size, dataset and
+    augmentation settings are unchanged; otherwise it is recomputed.
+    Args:
+        cache_dir: Cache directory
+        paths: Image paths (when not reading shards)
+        reader: ShardReader (when reading shards)
+        input_shape: Model input shape
+        augment_variants: Augmented embeddings per image
+        batch_size: Backbone batch size
+        seed: Augmentation seed
+    Returns: (clean (N, D) embeddings, list of augment_variants (N, D) embeddings,
+        boolean mask of samples that could be read); arrays are memory-mapped
+    """
+    base = create_backbone(input_shape)
+    embedder = Model(base.input, GlobalAveragePooling2D()(base.output))
+    
+    key = {
+        "backbone": backbone_fingerprint(base, input_shape),
+        "data": dataset_fingerprint(paths, reader.shard_dir if reader is not None else None),
+        "augment_variants": augment_variants,
+        "seed": seed
+    }
+    
+    cache_dir = Path(cache_dir)
+    meta_path = cache_dir / "meta.json"
+    variant_paths = [cache_dir / f"variant_{v}.npy" for v in range(augment_variants)]
+    
+    if meta_path.exists():
+        with open(meta_path) as f:
+            if json.load(f) == key:
+                print(f"Using cached embeddings in {cache_dir}")
+                return (
+                    np.load(cache_dir / "clean.npy", mmap_mode="r"),
+                    [np.load(path, mmap_mode="r") for path in variant_paths],
+                    np.load(cache_dir / "valid.npy")
+                )
+        print("Backbone, input size or dataset changed; recomputing embeddings")
+        meta_path.unlink()
+    
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    num_samples = len(reader) if reader is not None else len(paths)
+    shape = (num_samples, embedder.output_shape[-1])
+    
+    # Written in place batch by batch, so memory stays flat
+    clean = np.lib.format.open_memmap(cache_dir / "clean.npy", "w+", np.float32, shape)
+    variants = [
+        np.lib.format.open_memmap(path, "w+", np.float32, shape) for path in variant_paths
+    ]
+    valid = np.zeros(num_samples, dtype=bool)
+    
+    tf.random.set_seed(seed)
+    augmentation = create_augmentation()
+    inputs = _embedding_inputs(paths, reader, input_shape[:2], batch_size)
+    for images, indices in inputs:
+        indices = indices.numpy()
+        clean[indices] = embedder(images, training=False).numpy()
+        for variant in variants:
+            variant[indices] = embedder(augmentation(images, training=True), training=False).numpy()
+        valid[indices] = True
+        print(f"\rEmbedded {valid.sum()}/{num_samples} images", end="")
+    print()
+    
+    for array in [clean] + variants:
+        array.flush()
+    np.save(cache_dir / "valid.npy", valid)
+    
+    # Written last: the cache only counts as complete with its key
+    with open(meta_path, "w") as f:
+        json.dump(key, f)
+    
+    return clean, variants, valid
+
+
+def make_embedding_dataset(embeddings, rows, labels, batch_size=256, training=False, seed=42):
+    """
+    Stream (embeddings, labels) batches from memory-mapped embedding arrays
+    Only the rows of each batch are read, so a split never has to fit in memory.
+    Args:
+        embeddings: List of (N, D) arrays; each contributes every row in rows
+            (the clean embeddings plus any augmented variants)
+        rows: Sample indices of this split
+        labels: Labels of all N samples
+        batch_size: Batch size
+        training: Shuffle across all arrays (reshuffled every epoch)
+        seed: Shuffle seed
+    Returns: tf.data.Dataset of (embeddings, labels) batches
+    """
+    rows = np.asarray(rows, dtype=np.int64)
+    labels = np.asarray(labels, dtype=np.float32)
+    total = len(rows) * len(embeddings)
+    
+    def take(positions):
+        # Position p is row rows[p % n] of array p // n; sorted so reads walk forward
+        positions = np.sort(positions)
+        arrays, samples = np.divmod(positions, len(rows))
+        batch = np.empty((len(positions), embeddings[0].shape[1]), dtype=np.float32)
+        for array in np.unique(arrays):
+            mask = arrays == array
+            batch[mask] = embeddings[array][rows[samples[mask]]]
+        return batch, labels[rows[samples]]
+    
+    dataset = tf.data.Dataset.range(total)
+    if training:
+        dataset = dataset.shuffle(max(1, total), seed=seed, reshuffle_each_iteration=True)
+    dataset = dataset.batch(batch_size)
+    
+    def gather(positions):
+        batch, batch_labels = tf.numpy_function(take, [positions], (tf.float32, tf.float32))
+        batch.set_shape((None, embeddings[0].shape[1]))
+        batch_labels.set_shape((None,))
+        return batch, batch_labels
+    
+    dataset = dataset.map(gather, num_parallel_calls=tf.data.AUTOTUNE)
+    return dataset.prefetch(tf.data.AUTOTUNE)
+
+
+def train_head_only(
+    labels,
+    paths=None,
+    reader=None,
+    model_save_path="models/liveness_model.h5",
+    epochs=50,
+    batch_size=256,
+    validation_split=0.2,
+    test_split=0.1,
+    augment_variants=2,
+    embedding_cache_dir="models/embedding_cache",
+    input_shape=(128, 128, 3)
+):
+    """
+    Train only the head on cached backbone embeddings, then save the full model
+    The backbone runs once per image (and augmented variant) when the cache is
+    built; later runs train in seconds.
+    """
+    clean, variants, valid = compute_embeddings(
+        embedding_cache_dir, paths, reader, input_shape, augment_variants
+    )
+    
+    indices = np.flatnonzero(valid)
+    (train_idx, _), (val_idx, _), (test_idx, _) = split_files(
+        indices, labels[indices], validation_split, test_split
+    )
+    print(f"Train: {len(train_idx)} (+{augment_variants} augmented each), "
+          f"Val: {len(val_idx)}, Test: {len(test_idx)}")
+    
+    # Batches are read from the memory-mapped cache: clean plus augmented
+    # embeddings of a large dataset would not fit in memory
+    train_dataset = make_embedding_dataset(
+        [clean] + variants, train_idx, labels, batch_size, training=True
+    )
+    val_dataset = make_embedding_dataset([clean], val_idx, labels, batch_size)
+    test_dataset = make_embedding_dataset([clean], test_idx, labels, batch_size)
+    
+    head = create_head(clean.shape[1])
+    head.compile(
+        optimizer=keras.optimizers.Adam(learning_rate=0.001),
+        loss='binary_crossentropy',
+        metrics=['accuracy', 'precision', 'recall']
+    )
+    
+    print("Training head on cached embeddings...")
+    history = head.fit(
+        train_dataset,
+        epochs=epochs,
+        validation_data=val_dataset,
+        callbacks=[
+            keras.callbacks.EarlyStopping(
+                monitor='val_loss',
+                patience=5,
+                restore_best_weights=True
+            ),
+            keras.callbacks.ReduceLROnPlateau(
+                monitor='val_loss',
+                factor=0.5,
+                patience=3,
+                min_lr=1e-7
+            )
+        ],
+        verbose=1
+    )
+    
+    print("\nEvaluating on test set...")
+    test_loss, test_accuracy, test_precision, test_recall = head.evaluate(
+        test_dataset, verbose=1
+    )
+    
+    print("\nTest Results:")
+    print(f"  Accuracy: {test_accuracy:.4f}")
+    print(f"  Precision: {test_precision:.4f}")
+    print(f"  Recall: {test_recall:.4f}")
+    
+    # Full model for inference: frozen backbone + trained head
+    model = attach_head(head, input_shape)
+    model.save(model_save_path)
+    print(f"\nModel saved to {model_save_path}")
+    
+    return model, history
+
+
 def train_model(
     data_dir="datasets",
     model_save_path="models/liveness_model.h5",
     epochs=10,
     batch_size=32,
     validation_split=0.2,
-    test_split=0.1
+    test_split=0.1,
+    shard_dir=None,
+    head_only=False,
+    augment_variants=2,
+    embedding_cache_dir="models/embedding_cache"
 ):
     """
     Train the liveness detection model
+    Args:
+        shard_dir: Read preprocessed shards (preprocess_dataset.py shard) instead of
+            decoding the JPEGs in data_dir
+        head_only: Train only the head on cached embeddings of the frozen backbone
+            (see train_head_only; epochs and batch_size then use its defaults)
+        augment_variants: Augmented embeddings per image for head_only
+        embedding_cache_dir: Embedding cache for head_only
     """
-    print("Loading dataset...")
-    X, y = load_and_preprocess_dataset(data_dir)
+    reader = None
+    if shard_dir is not None:
+        print(f"Opening shards in {shard_dir}...")
+        reader = ShardReader(shard_dir)
+        paths, labels = np.arange(len(reader)), reader.labels
+    else:
+        print("Listing dataset...")
+        paths, labels = list_image_files(data_dir)
     
-    if len(X) == 0:
+    if len(paths) == 0:
         print("Error: No images found in dataset directory!")
         print("Please ensure dataset structure is:")
         print("  datasets/real/*.jpg")
         print("  datasets/spoof/*.jpg")
         return None
     
-    print(f"Loaded {len(X)} images ({np.sum(y)} real, {len(y) - np.sum(y)} spoof)")
+    print(f"Found {len(paths)} images ({np.sum(labels)} real, {len(labels) - np.sum(labels)} spoof)")
     
-    # Split dataset: train/val/test (70/20/10)
-    X_temp, X_test, y_temp, y_test = train_test_split(
-        X, y, test_size=test_split, random_state=42, stratify=y
-    )
+    if head_only:
+        return train_head_only(
+            labels,
+            paths=paths if reader is None else None,
+            reader=reader,
+            model_save_path=model_save_path,
+            validation_split=validation_split,
+            test_split=test_split,
+            augment_variants=augment_variants,
+            embedding_cache_dir=embedding_cache_dir
+        )
     
-    val_size = validation_split / (1 - test_split)
-    X_train, X_val, y_train, y_val = train_test_split(
-        X_temp, y_temp, test_size=val_size, random_state=42, stratify=y_temp
+    # Split file paths: train/val/test (70/20/10)
+    train_files, val_files, test_files = split_files(
+        paths, labels, validation_split, test_split
     )
     
-    print(f"Train: {len(X_train)}, Val: {len(X_val)}, Test: {len(X_test)}")
-    
-    # Data augmentation
-    train_datagen = ImageDataGenerator(
-        rotation_range=15,
-        width_shift_range=0.1,
-        height_shift_range=0.1,
-        shear_range=0.1,
-        zoom_range=0.1,
-        horizontal_flip=True,
-        fill_mode='nearest'
-    )
+    print(f"Train: {len(train_files[0])}, Val: {len(val_files[0])}, Test: {len(test_files[0])}")
     
-    train_generator = train_datagen.flow(
-        X_train, y_train,
-        batch_size=batch_size
-    )
+    # Streaming input pipelines (augmentation on the training set only)
+    if shard_dir is not None:
+        # Splits hold global shard indices instead of paths
+        train_dataset = make_shard_dataset(reader, train_files[0], batch_size, training=True)
+        val_dataset = make_shard_dataset(reader, val_files[0], batch_size)
+        test_dataset = make_shard_dataset(reader, test_files[0], batch_size)
+    else:
+        train_dataset = make_dataset(*train_files, batch_size=batch_size, training=True)
+        val_dataset = make_dataset(*val_files, batch_size=batch_size)
+        test_dataset = make_dataset(*test_files, batch_size=batch_size)
     
     # Create model
     print("Creating model...")
@@ -179,9 +647,9 @@ def train_model(
     # Train
     print("Training model...")
     history = model.fit(
-        train_generator,
+        train_dataset,
         epochs=epochs,
-        validation_data=(X_val, y_val),
+        validation_data=val_dataset,
         callbacks=callbacks,
         verbose=1
     )
@@ -189,7 +657,7 @@ def train_model(
     # Evaluate on test set
     print("\nEvaluating on test set...")
     test_loss, test_accuracy, test_precision, test_recall = model.evaluate(
-        X_test, y_test, verbose=1
+        test_dataset, verbose=1
     )
     
     print(f"\nTest Results:")
@@ -205,14 +673,17 @@ def train_model(
 
 
 if __name__ == "__main__":
+    import sys
+    
     # Create models directory if it doesn't exist
     os.makedirs("models", exist_ok=True)
     
-    # Train model
+    # Train model (--head-only: train the head on cached backbone embeddings)
     model, history = train_model(
         data_dir="datasets",
         model_save_path="models/liveness_model.h5",
         epochs=10,
-        batch_size=32
+        batch_size=32,
+        head_only="--head-only" in sys.argv
     )
 
@@ -0,0 +1,143 @@
+"""
+Pre-fork multi-worker server
+Loads the model once in a master process, then forks uvicorn workers that
+share the read-only model memory copy-on-write. MediaPipe graphs, runtime
+thread pools, the batch scheduler and the inference executor are created in
+each worker after the fork.
+"""
+import argparse
+import os
+import signal
+import socket
+import sys
+import time
+
+import uvicorn
+
+# Importing main opens the log database in this process; main_loop loads the model
+import main
+from utils import pipeline
+from utils.metrics import process_memory
+
+
+def run_worker(sock, args):
+    """Body of a forked worker: rebuild per-process state, then serve on the shared socket"""
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+    main.liveness_detector.after_fork()
+    # Thread executor workers of this process reuse the inherited model
+    pipeline.share_components(main.liveness_detector, main.inference_logger)
+
+    config = uvicorn.Config(main.app, log_level=args.log_level)
+    server = uvicorn.Server(config)
+    server.run(sockets=[sock])
+
+
+def spawn(sock, args):
+    """Fork one worker; returns its pid in the master"""
+    pid = os.fork()
+    if pid == 0:
+        code = 0
+        try:
+            run_worker(sock, args)
+        except Exception as e:
+            print(f"Worker {os.getpid()} failed: {e}", file=sys.stderr)
+            code = 1
+        finally:
+            os._exit(code)
+    return pid
+
+
+def report_memory(workers):
+    """Print RSS, PSS and shared memory of the master and every worker"""
+    def fmt(usage):
+        return " ".join(f"{name}={usage.get(name, 0) / 2**20:.0f}MB" for name in ("rss", "pss", "shared"))
+
+    print(f"[memory] master pid={os.getpid()} {fmt(process_memory())}")
+    for pid in sorted(workers):
+        print(f"[memory] worker pid={pid} {fmt(process_memory(pid))}")
+    total = sum(process_memory(pid).get("pss", 0) for pid in list(workers) + [os.getpid()])
+    print(f"[memory] total pss={total / 2**20:.0f}MB")
+
+
+def main_loop(args):
+    if args.workers <= 1:
+        # Nothing to share: serve in this process
+        uvicorn.run(main.app, host=args.host, port=args.port, log_level=args.log_level)
+        return
+
+    # main creates the detector lazily; load it here so the workers inherit it
+    main.liveness_detector.ensure_loaded()
+    model = main.liveness_detector.model
+    # Keras models, and TFLite models without tflite-runtime (loaded through
+    # tf.lite), bring in TensorFlow: not fork-safe, and a full copy per worker
+    if "tensorflow" in sys.modules:
+        source = f"the {model.name} runtime" if model is not None else "a server module"
+        print(f"Error: {source} imported TensorFlow, which cannot be used in "
+              "forked workers. Export the model to TFLite or ONNX (model/export_model.py) and "
+              "install requirements-serving.txt, or run with --workers 1", file=sys.stderr)
+        sys.exit(1)
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((args.host, args.port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+
+    # Worker pid -> fork time
+    workers = {}
+    for _ in range(args.workers):
+        workers[spawn(sock, args)] = time.monotonic()
+    runtime = model.name if model is not None else "no"
+    print(f"Master {os.getpid()} serving on {args.host}:{args.port} with {args.workers} workers "
+          f"({runtime} model loaded before fork)")
+
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in workers:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    next_report = time.monotonic() + min(args.report_interval, 10) if args.report_interval else None
+    while workers:
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            break
+        if pid:
+            started = workers.pop(pid)
+            if not stopping:
+                print(f"Worker {pid} exited with status {status}; restarting")
+                if time.monotonic() - started < 5.0:
+                    # Failing at startup: avoid a tight fork loop
+                    time.sleep(1.0)
+                workers[spawn(sock, args)] = time.monotonic()
+            continue
+
+        if next_report is not None and time.monotonic() >= next_report:
+            report_memory(workers)
+            next_report = time.monotonic() + args.report_interval
+        time.sleep(0.5)
+
+    sock.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the API with pre-forked workers")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=int(os.environ.get("PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("WEB_WORKERS", "2")),
+                        help="Number of forked worker processes")
+    parser.add_argument("--report-interval", type=float, default=60.0,
+                        help="Seconds between per-worker memory reports (0 disables)")
+    parser.add_argument("--log-level", default="info")
+    main_loop(parser.parse_args())
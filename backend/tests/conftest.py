@@ -0,0 +1,7 @@
+"""
+Shared test setup: import backend modules the way the server does (utils.*)
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
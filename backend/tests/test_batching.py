@@ -0,0 +1,104 @@
+"""
+Tests for the micro-batching scheduler
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from utils.batching import BatchScheduler
+
+
+class RecordingModel:
+    """predict_fn that records batch sizes and returns each input's sum"""
+    def __init__(self, delay=0.0):
+        self.batch_sizes = []
+        self.delay = delay
+
+    def __call__(self, batch):
+        self.batch_sizes.append(len(batch))
+        time.sleep(self.delay)
+        return batch.reshape(len(batch), -1).sum(axis=1)
+
+
+def test_single_input():
+    model = RecordingModel()
+    scheduler = BatchScheduler(model, max_batch_size=8, max_wait_ms=1)
+    assert scheduler.predict(np.full(3, 2.0)) == 6.0
+    scheduler.close()
+    assert model.batch_sizes == [1]
+
+
+def test_concurrent_inputs_are_batched_in_order():
+    model = RecordingModel(delay=0.01)
+    scheduler = BatchScheduler(model, max_batch_size=4, max_wait_ms=50)
+    futures = [scheduler.submit(np.full(2, float(i))) for i in range(10)]
+
+    assert [future.result(timeout=5) for future in futures] == [2.0 * i for i in range(10)]
+    scheduler.close()
+    assert max(model.batch_sizes) <= 4
+    assert sum(model.batch_sizes) == 10
+    assert len(model.batch_sizes) < 10
+    assert (scheduler.batches, scheduler.items) == (len(model.batch_sizes), 10)
+
+
+def test_flushes_after_max_wait():
+    scheduler = BatchScheduler(RecordingModel(), max_batch_size=64, max_wait_ms=20)
+    start = time.monotonic()
+    scheduler.predict(np.zeros(1))
+    assert time.monotonic() - start < 1.0
+    scheduler.close()
+
+
+def test_errors_reach_every_caller():
+    def failing(batch):
+        raise ValueError("model failed")
+
+    scheduler = BatchScheduler(failing, max_batch_size=4, max_wait_ms=20)
+    futures = [scheduler.submit(np.zeros(1)) for _ in range(3)]
+    for future in futures:
+        with pytest.raises(ValueError):
+            future.result(timeout=5)
+
+    # The scheduler keeps running after a failed batch
+    scheduler.predict_fn = RecordingModel()
+    assert scheduler.predict(np.ones(2)) == 2.0
+    scheduler.close()
+
+
+def test_close_flushes_queue_and_rejects_submits():
+    scheduler = BatchScheduler(RecordingModel(delay=0.01), max_batch_size=2, max_wait_ms=1)
+    futures = [scheduler.submit(np.ones(1)) for _ in range(6)]
+    scheduler.close()
+    assert all(future.result(timeout=0) == 1.0 for future in futures)
+
+    with pytest.raises(RuntimeError):
+        scheduler.submit(np.ones(1))
+    scheduler.close()
+
+
+def test_close_races_with_submit():
+    scheduler = BatchScheduler(RecordingModel(), max_batch_size=8, max_wait_ms=1)
+    futures = []
+    rejected = []
+    start = threading.Barrier(9)
+
+    def submit_many():
+        start.wait()
+        for _ in range(100):
+            try:
+                futures.append(scheduler.submit(np.ones(1)))
+            except RuntimeError:
+                rejected.append(1)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        for _ in range(8):
+            pool.submit(submit_many)
+        start.wait()
+        scheduler.close()
+
+    # Every accepted input is answered, none is left waiting
+    assert len(futures) + len(rejected) == 800
+    assert all(future.result(timeout=5) == 1.0 for future in futures)
@@ -0,0 +1,189 @@
+"""
+Tests for the partitioned inference log: global ids, keyset pagination,
+retention and rollups
+"""
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+
+from utils.database import (
+    InferenceLogger, LEGACY_PARTITION, LOGS_SCHEMA, PARTITION_ID_SPAN,
+    normalize_timestamp, partition_base, partition_key, split_id
+)
+
+
+def make_row(timestamp, is_real=True, confidence=0.9, frame_data=None):
+    """Row tuple as built by InferenceLogger._make_row"""
+    return (timestamp, is_real, confidence, True, "", frame_data, None)
+
+
+def write(logger, rows, store=True, count=True):
+    """Write rows with fixed timestamps, bypassing the clock"""
+    logger._write_rows({}, [(row, store, count) for row in rows], keep_open=False)
+
+
+def write_legacy(logger, timestamps):
+    """Rows in the unpartitioned table of older deployments"""
+    conn = sqlite3.connect(logger.db_path)
+    conn.execute(LOGS_SCHEMA)
+    with conn:
+        conn.executemany(
+            "INSERT INTO inference_logs (timestamp, is_real, confidence) VALUES (?, 1, 0.5)",
+            [(timestamp,) for timestamp in timestamps]
+        )
+    conn.close()
+
+
+@pytest.fixture
+def logger(tmp_path):
+    return InferenceLogger(str(tmp_path / "logs.db"), async_writes=False, rollup_retention_days=0)
+
+
+def test_partition_key():
+    assert partition_key("2024-01-31 23:59:59") == 20240131
+
+
+@pytest.mark.parametrize("key", [19700102, 20240131, 20240301, 29991231])
+def test_global_id_round_trip(key):
+    base = partition_base(key)
+    assert split_id(base + 1) == (key, 1)
+    assert split_id(base + PARTITION_ID_SPAN - 1) == (key, PARTITION_ID_SPAN - 1)
+    # Exact as JavaScript numbers
+    assert base + PARTITION_ID_SPAN - 1 < 2 ** 53
+
+
+def test_legacy_ids():
+    assert partition_base(LEGACY_PARTITION) == 0
+    assert split_id(42) == (LEGACY_PARTITION, 42)
+    assert partition_base(19700102) >= PARTITION_ID_SPAN
+
+
+def test_normalize_timestamp():
+    assert normalize_timestamp("2024-01-31") == "2024-01-31 00:00:00"
+    assert normalize_timestamp("2024-01-31T12:30") == "2024-01-31 12:30:00"
+    assert normalize_timestamp(None) is None
+    with pytest.raises(ValueError):
+        normalize_timestamp("yesterday")
+
+
+def test_ids_follow_partitions(logger):
+    write(logger, [make_row("2024-01-30 10:00:00")])
+    write(logger, [make_row("2024-01-31 10:00:00")])
+
+    newer, older = logger.get_logs()
+    assert split_id(newer["id"]) == (20240131, 1)
+    assert split_id(older["id"]) == (20240130, 1)
+
+
+def test_cursor_pagination_across_partitions(logger):
+    write_legacy(logger, ["2023-12-31 10:00:00", "2023-12-31 11:00:00"])
+    write(logger, [make_row(f"2024-01-30 10:00:0{i}") for i in range(3)])
+    write(logger, [make_row(f"2024-01-31 10:00:0{i}") for i in range(3)])
+
+    pages = []
+    before_id = None
+    while True:
+        page = logger.get_logs(before_id=before_id, limit=3)
+        if not page:
+            break
+        pages.append(page)
+        before_id = page[-1]["id"]
+
+    assert [len(page) for page in pages] == [3, 3, 2]
+    logs = [log for page in pages for log in page]
+    ids = [log["id"] for log in logs]
+    assert ids == sorted(ids, reverse=True)
+    assert len(set(ids)) == 8
+    timestamps = [log["timestamp"] for log in logs]
+    assert timestamps == sorted(timestamps, reverse=True)
+    # Legacy rows come last, with their original ids
+    assert ids[-2:] == [2, 1]
+
+
+def test_time_window(logger):
+    write(logger, [make_row("2024-01-30 10:00:00"), make_row("2024-01-30 23:00:00")])
+    write(logger, [make_row("2024-01-31 10:00:00")])
+
+    logs = logger.get_logs(since="2024-01-30 12:00:00", until="2024-01-31")
+    assert [log["timestamp"] for log in logs] == ["2024-01-30 23:00:00"]
+
+    with pytest.raises(ValueError):
+        logger.get_logs(since="yesterday")
+
+
+def test_logs_exclude_thumbnails(logger):
+    write(logger, [make_row("2024-01-31 10:00:00", frame_data=b"jpeg")])
+
+    log, = logger.get_logs()
+    assert "frame_data" not in log
+    assert logger.get_thumbnail(log["id"]) == b"jpeg"
+    assert logger.get_thumbnail(log["id"] + 1) is None
+    assert logger.get_thumbnail(partition_base(20200101) + 1) is None
+
+
+def test_retention_deletes_old_partitions(tmp_path):
+    now = datetime.utcnow()
+    old = (now - timedelta(days=10)).strftime('%Y-%m-%d %H:%M:%S')
+    recent = (now - timedelta(days=1)).strftime('%Y-%m-%d %H:%M:%S')
+
+    db_path = str(tmp_path / "logs.db")
+    logger = InferenceLogger(db_path, async_writes=False)
+    write(logger, [make_row(old), make_row(recent)])
+    write_legacy(logger, [old, recent])
+    assert len(logger.partitions()) == 3
+
+    logger = InferenceLogger(db_path, async_writes=False, retention_days=7, startup_retention=False)
+    assert logger.apply_retention() == 1
+    assert logger.partitions() == [partition_key(recent), LEGACY_PARTITION]
+    assert not logger.partition_path(partition_key(old)).exists()
+    assert sorted(log["timestamp"] for log in logger.get_logs()) == [recent, recent]
+
+
+def test_retention_keeps_everything_by_default(logger):
+    write(logger, [make_row("2000-01-01 00:00:00")])
+    assert logger.apply_retention() == 0
+    assert len(logger.get_logs()) == 1
+
+
+def test_rollups(logger):
+    write(logger, [
+        make_row("2024-01-31 10:00:10", is_real=True, confidence=0.8),
+        make_row("2024-01-31 10:00:20", is_real=False, confidence=0.4),
+        make_row("2024-01-31 10:01:00", is_real=True, confidence=0.6)
+    ])
+
+    minutes = logger.get_rollups()
+    assert [(m["bucket"], m["frames"], m["real_count"], m["spoof_count"]) for m in minutes] == [
+        ("2024-01-31 10:00", 2, 1, 1),
+        ("2024-01-31 10:01", 1, 1, 0)
+    ]
+    assert minutes[0]["mean_confidence"] == pytest.approx(0.6)
+
+    hour, = logger.get_rollups(resolution="hour")
+    assert (hour["bucket"], hour["frames"]) == ("2024-01-31 10", 3)
+    assert logger.get_rollups(since="2024-01-31 10:01") == minutes[1:]
+
+
+def test_rollups_count_frames_not_rows(logger):
+    timestamp = "2024-01-31 10:00:00"
+    # Logged frame, frame only counted, reservoir row counted when observed
+    write(logger, [make_row(timestamp)])
+    write(logger, [make_row(timestamp)], store=False)
+    write(logger, [make_row(timestamp)], count=False)
+
+    minute, = logger.get_rollups()
+    assert minute["frames"] == 2
+    assert len(logger.get_logs()) == 2
+
+
+def test_async_writes_flush(tmp_path):
+    logger = InferenceLogger(str(tmp_path / "logs.db"), flush_interval_ms=1)
+    for _ in range(5):
+        assert logger.log_inference({"is_real": True, "confidence": 0.9})
+    logger.count_frame({"is_real": False, "confidence": 0.1})
+    logger.flush()
+
+    assert len(logger.get_logs()) == 5
+    assert sum(m["frames"] for m in logger.get_rollups()) == 6
+    logger.close()
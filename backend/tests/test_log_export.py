@@ -0,0 +1,86 @@
+"""
+Tests for streaming log export: chunked iteration, read-only access and encoders
+"""
+import csv
+import io
+import json
+import tarfile
+
+import pytest
+
+from utils.database import InferenceLogger
+from utils.log_export import csv_chunks, export_chunks, ndjson_chunks, with_thumbnail_sidecar
+
+
+def write(logger, timestamps):
+    rows = [(ts, True, 0.9, True, "", b"jpeg", json.dumps({"n": i})) for i, ts in enumerate(timestamps)]
+    logger._write_rows({}, [(row, True, True) for row in rows], keep_open=False)
+
+
+@pytest.fixture
+def logger(tmp_path):
+    logger = InferenceLogger(str(tmp_path / "logs.db"), async_writes=False)
+    write(logger, ["2024-01-30 10:00:00", "2024-01-30 11:00:00", "2024-01-30 12:00:00"])
+    write(logger, ["2024-01-31 10:00:00", "2024-01-31 11:00:00"])
+    return logger
+
+
+def test_iter_logs_oldest_first_in_chunks(logger):
+    logs = list(logger.iter_logs(chunk_size=2))
+    timestamps = [log["timestamp"] for log in logs]
+    assert len(logs) == 5
+    assert timestamps == sorted(timestamps)
+    assert [log["id"] for log in logs] == sorted(log["id"] for log in logs)
+
+    window = logger.iter_logs(since="2024-01-30 11:00:00", until="2024-01-31 11:00:00", chunk_size=1)
+    assert [log["timestamp"] for log in window] == timestamps[1:4]
+
+
+def test_read_only_export(logger, tmp_path):
+    files = sorted(p.name for p in tmp_path.rglob("*.db"))
+
+    reader = InferenceLogger(logger.db_path, read_only=True)
+    assert len(list(reader.iter_logs())) == 5
+    assert sorted(p.name for p in tmp_path.rglob("*.db")) == files
+    with pytest.raises(RuntimeError):
+        reader.log_inference({"is_real": True, "confidence": 0.9})
+
+
+def test_read_only_missing_database(tmp_path):
+    reader = InferenceLogger(str(tmp_path / "missing.db"), read_only=True)
+    assert list(reader.iter_logs()) == []
+    assert not any(tmp_path.iterdir())
+
+
+def test_ndjson_chunks(logger):
+    chunks = list(ndjson_chunks(logger.iter_logs(), rows_per_chunk=2))
+    assert len(chunks) == 3
+    rows = [json.loads(line) for chunk in chunks for line in chunk.splitlines()]
+    assert [row["metadata"]["n"] for row in rows] == [0, 1, 2, 0, 1]
+    assert rows[0]["is_real"] is True
+    assert "frame_data" not in rows[0]
+
+
+def test_csv_chunks(logger):
+    text = "".join(csv_chunks(logger.iter_logs(), rows_per_chunk=2))
+    header, *rows = list(csv.reader(io.StringIO(text)))
+    assert header[0] == "id"
+    assert len(rows) == 5
+
+
+def test_unknown_format():
+    with pytest.raises(ValueError):
+        export_chunks([], "xml")
+
+
+def test_thumbnail_sidecar(logger):
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w") as tar_file:
+        logs = list(with_thumbnail_sidecar(logger.iter_logs(include_thumbnails=True), tar_file))
+    assert all("frame_data" not in log for log in logs)
+
+    buffer.seek(0)
+    with tarfile.open(fileobj=buffer) as tar_file:
+        names = tar_file.getnames()
+        assert names == [f"{log['id']}.jpg" for log in logs]
+        assert tar_file.extractfile(names[0]).read() == b"jpeg"
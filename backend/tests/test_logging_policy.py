@@ -0,0 +1,105 @@
+"""
+Tests for the per-session logging policy: sampling modes, reservoir and summary
+"""
+import random
+
+import pytest
+
+from utils.logging_policy import LoggingPolicy
+
+
+def result(is_real=True, confidence=0.9, active_check_passed=True):
+    return {"is_real": is_real, "confidence": confidence, "active_check_passed": active_check_passed}
+
+
+def test_unknown_mode():
+    with pytest.raises(ValueError):
+        LoggingPolicy(modes=("all", "sometimes"))
+
+
+def test_all():
+    policy = LoggingPolicy(modes=("all",))
+    assert [policy.observe(result())[0] for _ in range(3)] == [["all"]] * 3
+
+
+def test_every_n():
+    policy = LoggingPolicy(modes=("every_n",), every_n=3)
+    logged = [i for i in range(10) if policy.observe(result())[0]]
+    assert logged == [0, 3, 6, 9]
+
+
+def test_verdict_change():
+    policy = LoggingPolicy(modes=("verdict_change",))
+    frames = [result(), result(), result(is_real=False), result(is_real=False),
+              result(is_real=False, active_check_passed=False), result()]
+    logged = [i for i, frame in enumerate(frames) if policy.observe(frame)[0]]
+    assert logged == [0, 2, 4, 5]
+
+
+def test_low_confidence():
+    policy = LoggingPolicy(modes=("low_confidence",), low_confidence=0.7)
+    assert policy.observe(result(confidence=0.9)) == ([], None)
+    assert policy.observe(result(confidence=0.5)) == (["low_confidence"], None)
+
+
+def test_reasons_combine():
+    policy = LoggingPolicy(modes=("every_n", "verdict_change", "low_confidence"), every_n=10)
+    reasons, _ = policy.observe(result(confidence=0.1))
+    assert reasons == ["every_n", "verdict_change", "low_confidence"]
+    assert policy.logged == 1
+
+
+def test_summary():
+    policy = LoggingPolicy(modes=("summary",))
+    assert policy.finish() == []
+
+    for frame in [result(confidence=0.8), result(confidence=0.6), result(is_real=False, confidence=0.4)]:
+        assert policy.observe(frame) == ([], None)
+
+    (summary_result, frame_data, metadata), = policy.finish()
+    assert frame_data is None
+    assert metadata["log_reasons"] == ["summary"]
+    assert metadata["summary"]["frames"] == 3
+    assert metadata["summary"]["real_frames"] == 2
+    assert metadata["summary"]["min_confidence"] == pytest.approx(0.4)
+    assert summary_result["is_real"] is True
+    assert summary_result["confidence"] == pytest.approx(0.6)
+
+
+def run_reservoir(policy, frames, thumbnail=b"x" * 100):
+    """Feed frames through observe/add_to_reservoir as the pipeline does"""
+    for i in range(frames):
+        reasons, key = policy.observe(result())
+        if key is not None:
+            policy.add_to_reservoir(key, result(), thumbnail, {"frame": i})
+
+
+def test_reservoir_stays_within_budget():
+    random.seed(0)
+    policy = LoggingPolicy(modes=("reservoir",), reservoir_bytes=1000)
+    run_reservoir(policy, 500)
+
+    rows = policy.finish()
+    assert 1 <= len(rows) <= 10
+    assert all(metadata["log_reasons"] == ["reservoir"] for _, _, metadata in rows)
+    assert all("captured_at" in metadata for _, _, metadata in rows)
+    # Kept in arrival order, and emptied by finish
+    frames = [metadata["frame"] for _, _, metadata in rows]
+    assert frames == sorted(frames)
+    assert policy.finish() == []
+
+
+def test_reservoir_samples_whole_session():
+    random.seed(1)
+    late = 0
+    for _ in range(50):
+        policy = LoggingPolicy(modes=("reservoir",), reservoir_bytes=500)
+        run_reservoir(policy, 200)
+        late += sum(metadata["frame"] >= 100 for _, _, metadata in policy.finish())
+    # Uniform sample: about half of 50 x 5 kept frames come from the second half
+    assert 75 < late < 175
+
+
+def test_reservoir_skips_logged_frames():
+    policy = LoggingPolicy(modes=("all", "reservoir"))
+    assert policy.observe(result()) == (["all"], None)
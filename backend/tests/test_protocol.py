@@ -0,0 +1,97 @@
+"""
+Tests for the binary WebSocket protocol
+"""
+import struct
+
+import pytest
+
+from utils import protocol
+from utils.protocol import HEADER, RESULT_BODY, ProtocolError, decode_message, encode_response
+
+
+def test_decode_frame():
+    payload = b"\xff\xd8jpeg"
+    message = HEADER.pack(protocol.MSG_FRAME, 7, 1700000000123) + payload
+
+    msg_type, seq, timestamp, body = decode_message(message)
+    assert (msg_type, seq, timestamp) == ("frame", 7, 1700000000123)
+    assert isinstance(body, memoryview)
+    assert bytes(body) == payload
+
+
+@pytest.mark.parametrize("msg_type, name", [
+    (protocol.MSG_PING, "ping"),
+    (protocol.MSG_RESET_ACTIVE_CHECK, "reset_active_check")
+])
+def test_decode_control(msg_type, name):
+    decoded = decode_message(HEADER.pack(msg_type, 1, 2))
+    assert decoded[:3] == (name, 1, 2)
+    assert len(decoded[3]) == 0
+
+
+def test_decode_malformed():
+    with pytest.raises(ProtocolError):
+        decode_message(b"\x01\x00")
+    with pytest.raises(ProtocolError):
+        decode_message(HEADER.pack(0x7f, 0, 0))
+    # Server message types are not accepted from clients
+    with pytest.raises(ProtocolError):
+        decode_message(HEADER.pack(protocol.MSG_RESULT, 0, 0))
+    with pytest.raises(ProtocolError, match="Frame without payload"):
+        decode_message(HEADER.pack(protocol.MSG_FRAME, 0, 0))
+
+
+def test_empty_frame_does_not_decode():
+    pytest.importorskip("cv2")
+    from utils.pipeline import decode_frame
+
+    assert decode_frame(b"") is None
+    assert decode_frame(memoryview(b"")) is None
+    assert decode_frame(b"not an image") is None
+
+
+def test_encode_result():
+    response = {
+        "type": "result",
+        "face_detected": True,
+        "is_real": True,
+        "confidence": 0.875,
+        "active_check_passed": False,
+        "active_check_message": "Blink",
+        "bbox": (10, 20, 30, 40),
+        "reused": True
+    }
+    message = encode_response(response, seq=9, timestamp=123)
+
+    assert HEADER.unpack_from(message) == (protocol.MSG_RESULT, 9, 123)
+    flags, confidence, x, y, width, height, length = RESULT_BODY.unpack_from(message, HEADER.size)
+    assert flags == protocol.FLAG_FACE_DETECTED | protocol.FLAG_IS_REAL | protocol.FLAG_REUSED
+    assert confidence == 0.875
+    assert (x, y, width, height) == (10, 20, 30, 40)
+    assert message[HEADER.size + RESULT_BODY.size:] == b"Blink"
+    assert length == 5
+
+
+def test_encode_no_face():
+    message = encode_response({"type": "result", "face_detected": False, "message": "No face detected"})
+    flags, confidence, *bbox, length = RESULT_BODY.unpack_from(message, HEADER.size)
+    assert flags == 0
+    assert bbox == [0, 0, 0, 0]
+    assert message[-length:] == b"No face detected"
+
+
+def test_encode_error_and_pong():
+    message = encode_response({"type": "error", "message": "bad frame"}, seq=3)
+    assert HEADER.unpack_from(message) == (protocol.MSG_ERROR, 3, 0)
+    length, = struct.unpack_from("!H", message, HEADER.size)
+    assert message[HEADER.size + 2:] == b"bad frame"
+    assert length == 9
+
+    assert encode_response({"type": "pong"}, seq=4, timestamp=5) == HEADER.pack(protocol.MSG_PONG, 4, 5)
+
+
+def test_encode_truncates_long_messages():
+    message = encode_response({"type": "error", "message": "x" * 70000})
+    length, = struct.unpack_from("!H", message, HEADER.size)
+    assert length == 0xFFFF
+    assert len(message) == HEADER.size + 2 + 0xFFFF
@@ -0,0 +1,116 @@
+"""
+Dynamic micro-batching for model inference
+Gathers single inputs from concurrent callers into one batched forward pass
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+
+class BatchScheduler:
+    def __init__(self, predict_fn, max_batch_size=16, max_wait_ms=5.0):
+        """
+        Initialize batch scheduler
+        Args:
+            predict_fn: Callable taking a stacked batch (N, ...) and returning N outputs
+            max_batch_size: Flush as soon as this many inputs are queued
+            max_wait_ms: Flush at the latest this long after the first input arrived
+        """
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+
+        self._queue = queue.Queue()
+        self._closed = False
+        # Orders submit against close, so nothing is queued behind the stop sentinel
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(
+            target=self._run, name="batch-scheduler", daemon=True
+        )
+        self._thread.start()
+
+        # Counters for batch size statistics
+        self.batches = 0
+        self.items = 0
+
+    def submit(self, item):
+        """
+        Queue one input for the next batch
+        Returns: concurrent.futures.Future resolving to this input's output
+        """
+        future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("BatchScheduler is closed")
+            self._queue.put((item, future))
+        return future
+
+    def predict(self, item):
+        """Queue one input and block until its output is ready"""
+        return self.submit(item).result()
+
+    def _collect(self):
+        """Block for the first input, then gather more until full or timed out"""
+        first = self._queue.get()
+        if first is None:
+            return None
+
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                entry = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if entry is None:
+                # Close requested: finish this batch, then stop
+                self._queue.put(None)
+                break
+            batch.append(entry)
+        return batch
+
+    def _run(self):
+        """Scheduler loop: flush batches and hand each result to its caller"""
+        while True:
+            batch = self._collect()
+            if batch is None:
+                return
+
+            items = [item for item, _ in batch]
+            futures = [future for _, future in batch]
+            try:
+                outputs = self.predict_fn(np.stack(items))
+            except Exception as e:
+                for future in futures:
+                    future.set_exception(e)
+                continue
+
+            for future, output in zip(futures, outputs):
+                future.set_result(output)
+
+            self.batches += 1
+            self.items += len(batch)
+
+    def close(self):
+        """Flush queued inputs and stop the scheduler thread"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(None)
+        self._thread.join()
+
+        # Fail anything submitted while the scheduler was shutting down
+        while True:
+            try:
+                entry = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if entry is not None:
+                entry[1].set_exception(RuntimeError("BatchScheduler is closed"))
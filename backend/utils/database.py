@@ -1,88 +1,690 @@
 """
 Database utilities for storing inference logs
+
+Rows are stored in one SQLite file per UTC day (<db name>_partitions/YYYYMMDD.db),
+so expiring old data is a file delete instead of a huge DELETE. The main database
+file keeps the per-minute rollup table and the legacy, unpartitioned
+inference_logs table of older deployments.
+
+Log ids are global: days since 1970-01-01 * PARTITION_ID_SPAN + the row id inside
+its daily file. They grow with time across partitions, name the file a row lives
+in and stay below 2**53, so JavaScript clients can use them as numbers. Legacy
+rows keep their original (smaller) ids.
 """
-from datetime import datetime
+from datetime import date, datetime, timedelta
+from pathlib import Path
+import atexit
+import os
+import queue
 import sqlite3
+import threading
+import time
 from typing import Optional
 import json
 
 
+# Queue sentinel asking the writer thread to stop
+_STOP = object()
+
+# Columns returned by log queries; frame_data (thumbnail BLOB) is fetched separately
+LOG_COLUMNS = (
+    "id", "timestamp", "is_real", "confidence",
+    "active_check_passed", "active_check_message", "metadata"
+)
+
+# Maximum rows per daily partition; global id = days since epoch * span + local id
+# (below 2**53 for dates before the year 4400)
+PARTITION_ID_SPAN = 10 ** 10
+
+_EPOCH = date(1970, 1, 1)
+
+# Partition key of the legacy inference_logs table in the main database
+LEGACY_PARTITION = 0
+
+LOGS_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS inference_logs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+        is_real BOOLEAN,
+        confidence REAL,
+        active_check_passed BOOLEAN,
+        active_check_message TEXT,
+        frame_data BLOB,
+        metadata TEXT
+    )
+"""
+
+LOGS_INDEX = """
+    CREATE INDEX IF NOT EXISTS idx_inference_logs_timestamp_id
+    ON inference_logs (timestamp, id)
+"""
+
+ROLLUPS_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS inference_rollups (
+        minute TEXT PRIMARY KEY,
+        frames INTEGER NOT NULL,
+        real_count INTEGER NOT NULL,
+        spoof_count INTEGER NOT NULL,
+        confidence_sum REAL NOT NULL,
+        active_check_passed INTEGER NOT NULL
+    )
+"""
+
+
+def partition_key(timestamp: str) -> int:
+    """Partition key (YYYYMMDD) of a 'YYYY-MM-DD HH:MM:SS' timestamp"""
+    return int(timestamp[:10].replace("-", ""))
+
+
+def normalize_timestamp(value: Optional[str]) -> Optional[str]:
+    """
+    Parse a query timestamp ('YYYY-MM-DD', 'YYYY-MM-DD HH:MM[:SS]' or ISO 8601 with 'T')
+    Returns: 'YYYY-MM-DD HH:MM:SS', or None for None
+    Raises: ValueError if value is not a timestamp
+    """
+    if value is None:
+        return None
+    return datetime.fromisoformat(value.replace("T", " ")).strftime('%Y-%m-%d %H:%M:%S')
+
+
+def partition_base(key: int) -> int:
+    """Global id of local row id 0 in a partition"""
+    if key == LEGACY_PARTITION:
+        return 0
+    day = datetime.strptime(str(key), '%Y%m%d').date()
+    return (day - _EPOCH).days * PARTITION_ID_SPAN
+
+
+def split_id(log_id: int):
+    """
+    Partition key and local row id of a global log id
+    Returns: (key, local id); ids below one span belong to the legacy table
+    """
+    days, local_id = divmod(log_id, PARTITION_ID_SPAN)
+    if days <= 0:
+        return LEGACY_PARTITION, log_id
+    day = _EPOCH + timedelta(days=days)
+    return int(day.strftime('%Y%m%d')), local_id
+
+
 class InferenceLogger:
-    def __init__(self, db_path="backend/inference_logs.db"):
+    def __init__(self, db_path="backend/inference_logs.db", async_writes=True,
+                 batch_size=100, flush_interval_ms=200, max_queue=10000, overflow="drop",
+                 retention_days=0, rollup_retention_days=365, startup_retention=True,
+                 read_only=False):
         """
         Initialize inference logger with SQLite database
         Args:
-            db_path: Path to SQLite database file
+            db_path: Path to the main SQLite database file
+            async_writes: Queue rows for a background writer instead of writing inline
+            batch_size: Writer commits after this many queued rows...
+            flush_interval_ms: ...or this long after the first row of a batch arrived
+            max_queue: Maximum number of rows waiting for the writer
+            overflow: What log_inference does when the queue is full:
+                "drop" the row or "block" until there is room
+            retention_days: Delete daily partitions older than this (0 keeps everything)
+            rollup_retention_days: Delete per-minute rollups older than this (0 keeps everything)
+            startup_retention: Apply retention here; when False the caller runs
+                apply_retention later (the writer also runs it hourly)
+            read_only: Only query existing files (exports): no schema setup, no
+                retention, connections opened with mode=ro
         """
+        if overflow not in ("drop", "block"):
+            raise ValueError(f"Unknown overflow policy: {overflow}")
+        
         self.db_path = db_path
+        self.partition_dir = Path(db_path).with_name(Path(db_path).stem + "_partitions")
+        self.async_writes = async_writes
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000.0
+        self.overflow = overflow
+        self.retention_days = retention_days
+        self.rollup_retention_days = rollup_retention_days
+        
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._writer = None
+        self._writer_pid = None
+        self._writer_lock = threading.Lock()
+        self.dropped = 0
+        self.read_only = read_only
+        
+        if read_only:
+            return
         self.init_database()
+        if startup_retention:
+            self.apply_retention()
+        if async_writes:
+            atexit.register(self.close)
+    
+    def _connect(self, path=None):
+        """Open a connection in WAL mode so readers never block the writer"""
+        conn = sqlite3.connect(str(path or self.db_path))
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+    
+    def _connect_read(self, path=None):
+        """Open a connection for queries (read-only for read_only loggers)"""
+        path = Path(path or self.db_path)
+        if self.read_only:
+            return sqlite3.connect(f"{path.resolve().as_uri()}?mode=ro", uri=True)
+        return sqlite3.connect(str(path))
     
     def init_database(self):
         """Initialize database schema"""
-        conn = sqlite3.connect(self.db_path)
+        self.partition_dir.mkdir(parents=True, exist_ok=True)
+        
+        conn = self._connect()
         cursor = conn.cursor()
         
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS inference_logs (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-                is_real BOOLEAN,
-                confidence REAL,
-                active_check_passed BOOLEAN,
-                active_check_message TEXT,
-                frame_data BLOB,
-                metadata TEXT
-            )
-        """)
+        cursor.execute(LOGS_SCHEMA)
+        cursor.execute(LOGS_INDEX)
+        cursor.execute(ROLLUPS_SCHEMA)
         
         conn.commit()
         conn.close()
     
-    def log_inference(self, result: dict, frame_data: Optional[bytes] = None, metadata: Optional[dict] = None):
+    def partition_path(self, key: int):
+        """Database file of one partition"""
+        if key == LEGACY_PARTITION:
+            return Path(self.db_path)
+        return self.partition_dir / f"{key}.db"
+    
+    def _open_partition(self, key: int):
+        """Open (creating if needed) a daily partition for writing"""
+        conn = self._connect(self.partition_path(key))
+        conn.execute(LOGS_SCHEMA)
+        conn.execute(LOGS_INDEX)
+        conn.commit()
+        return conn
+    
+    def partitions(self):
+        """
+        Existing partition keys, newest first
+        The legacy table (LEGACY_PARTITION) is always last.
+        """
+        keys = []
+        for path in self.partition_dir.glob("*.db"):
+            if path.stem.isdigit():
+                keys.append(int(path.stem))
+        return sorted(keys, reverse=True) + [LEGACY_PARTITION]
+    
+    def log_inference(self, result: dict, frame_data: Optional[bytes] = None, metadata: Optional[dict] = None,
+                      count_frame: bool = True):
         """
         Log inference result to database
+        With async_writes the row is only queued; the background writer stores it.
         Args:
             result: Detection result dictionary
             frame_data: Optional frame bytes
             metadata: Optional additional metadata
+            count_frame: Also count the row as an analyzed frame in the rollups; False
+                for rows that were already counted (reservoir samples) or are not
+                frames (session summaries)
+        Returns: False if the row was dropped because the queue was full, else True
         """
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            INSERT INTO inference_logs 
-            (is_real, confidence, active_check_passed, active_check_message, frame_data, metadata)
-            VALUES (?, ?, ?, ?, ?, ?)
-        """, (
-            result.get('is_real', False),
-            result.get('confidence', 0.0),
-            result.get('active_check_passed', False),
+        return self._enqueue((self._make_row(result, frame_data, metadata), True, count_frame))
+    
+    def count_frame(self, result: dict):
+        """
+        Count an analyzed frame in the rollups without storing a log row
+        (frames the logging policy does not keep), so rollups cover every frame
+        Args:
+            result: Detection result dictionary
+        Returns: False if the count was dropped because the queue was full, else True
+        """
+        return self._enqueue((self._make_row(result), False, True))
+    
+    @staticmethod
+    def _make_row(result, frame_data=None, metadata=None):
+        """Row tuple in inference_logs column order (without id)"""
+        return (
+            # Same format as CURRENT_TIMESTAMP, taken now rather than at flush time
+            datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S'),
+            bool(result.get('is_real', False)),
+            float(result.get('confidence', 0.0)),
+            bool(result.get('active_check_passed', False)),
             result.get('active_check_message', ''),
             frame_data,
             json.dumps(metadata) if metadata else None
-        ))
+        )
+    
+    def _enqueue(self, entry):
+        """Write an entry inline or queue it for the writer thread"""
+        if self.read_only:
+            raise RuntimeError("Cannot log to a read-only InferenceLogger")
         
-        conn.commit()
+        if not self.async_writes:
+            self._write_rows({}, [entry], keep_open=False)
+            return True
+        
+        self._ensure_writer()
+        if self.overflow == "block":
+            self._queue.put(entry)
+            return True
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            self.dropped += 1
+            return False
+        return True
+    
+    def _write_rows(self, conns, rows, keep_open=True):
+        """
+        Insert rows into their daily partitions and update the rollups
+        Args:
+            conns: Open connections by partition key, reused and extended here
+            rows: (row tuple, store, count) entries as queued by log_inference and count_frame
+            keep_open: Leave connections in conns open for the next batch
+        """
+        by_partition = {}
+        for row, store, _ in rows:
+            if store:
+                by_partition.setdefault(partition_key(row[0]), []).append(row)
+        
+        for key, partition_rows in by_partition.items():
+            conn = conns.get(key)
+            if conn is None:
+                conn = conns[key] = self._open_partition(key)
+            with conn:
+                conn.executemany("""
+                    INSERT INTO inference_logs
+                    (timestamp, is_real, confidence, active_check_passed, active_check_message, frame_data, metadata)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                """, partition_rows)
+        
+        main_conn = conns.get(LEGACY_PARTITION)
+        if main_conn is None:
+            main_conn = conns[LEGACY_PARTITION] = self._connect()
+        self._update_rollups(main_conn, [row for row, _, count in rows if count])
+        
+        if not keep_open:
+            for conn in conns.values():
+                conn.close()
+            conns.clear()
+    
+    def _update_rollups(self, conn, rows):
+        """Add rows to the per-minute rollup counts"""
+        minutes = {}
+        for timestamp, is_real, confidence, active_passed, _, _, _ in rows:
+            counts = minutes.setdefault(timestamp[:16], [0, 0, 0, 0.0, 0])
+            counts[0] += 1
+            counts[1 if is_real else 2] += 1
+            counts[3] += confidence
+            counts[4] += 1 if active_passed else 0
+        
+        with conn:
+            conn.executemany("""
+                INSERT INTO inference_rollups
+                (minute, frames, real_count, spoof_count, confidence_sum, active_check_passed)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (minute) DO UPDATE SET
+                    frames = frames + excluded.frames,
+                    real_count = real_count + excluded.real_count,
+                    spoof_count = spoof_count + excluded.spoof_count,
+                    confidence_sum = confidence_sum + excluded.confidence_sum,
+                    active_check_passed = active_check_passed + excluded.active_check_passed
+            """, [(minute, *counts) for minute, counts in minutes.items()])
+    
+    def apply_retention(self, conns=None):
+        """
+        Delete partitions and rollups past their retention period
+        Args:
+            conns: Writer connections by partition key; expired ones are closed
+        Returns: Number of partitions deleted
+        """
+        now = datetime.utcnow()
+        deleted = 0
+        
+        if self.retention_days > 0:
+            cutoff = now - timedelta(days=self.retention_days)
+            cutoff_key = int(cutoff.strftime('%Y%m%d'))
+            
+            for key in self.partitions():
+                if key == LEGACY_PARTITION or key >= cutoff_key:
+                    continue
+                if conns is not None and key in conns:
+                    conns.pop(key).close()
+                path = self.partition_path(key)
+                for suffix in ("", "-wal", "-shm"):
+                    try:
+                        os.remove(f"{path}{suffix}")
+                    except FileNotFoundError:
+                        pass
+                deleted += 1
+            
+            # Legacy rows predate partitioning and still need a DELETE
+            conn = self._connect()
+            with conn:
+                conn.execute(
+                    "DELETE FROM inference_logs WHERE timestamp < ?",
+                    (cutoff.strftime('%Y-%m-%d 00:00:00'),)
+                )
+            conn.close()
+        
+        if self.rollup_retention_days > 0:
+            cutoff = now - timedelta(days=self.rollup_retention_days)
+            conn = self._connect()
+            with conn:
+                conn.execute(
+                    "DELETE FROM inference_rollups WHERE minute < ?",
+                    (cutoff.strftime('%Y-%m-%d %H:%M'),)
+                )
+            conn.close()
+        
+        return deleted
+    
+    def _ensure_writer(self):
+        """Start the writer thread (again, after a fork) if it is not running"""
+        if self._writer_pid == os.getpid():
+            return
+        with self._writer_lock:
+            if self._writer_pid == os.getpid():
+                return
+            if self._writer_pid is not None:
+                # Forked child: the parent's queue and writer thread did not come along
+                self._queue = queue.Queue(maxsize=self._queue.maxsize)
+            self._writer = threading.Thread(
+                target=self._run_writer, name="inference-log-writer", daemon=True
+            )
+            self._writer.start()
+            self._writer_pid = os.getpid()
+    
+    def _collect(self, timeout=None):
+        """
+        Wait for the first row, then gather more until the batch is full or times out
+        Returns: (rows, stop requested)
+        """
+        try:
+            first = self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return [], False
+        if first is _STOP:
+            return [], True
+        
+        rows = [first]
+        deadline = time.monotonic() + self.flush_interval
+        while len(rows) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                row = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if row is _STOP:
+                return rows, True
+            rows.append(row)
+        return rows, False
+    
+    def _run_writer(self):
+        """Writer loop: long-lived connections, one transaction per partition and batch"""
+        conns = {}
+        retention_interval = 3600.0
+        next_retention = time.monotonic() + retention_interval
+        stop = False
+        
+        while not stop:
+            rows, stop = self._collect(timeout=retention_interval)
+            if rows:
+                try:
+                    self._write_rows(conns, rows)
+                except sqlite3.Error as e:
+                    print(f"Warning: Failed to write {len(rows)} inference logs: {e}")
+                    self.dropped += len(rows)
+            for _ in range(len(rows) + (1 if stop else 0)):
+                self._queue.task_done()
+            
+            # Only today's partition keeps receiving rows
+            today = int(datetime.utcnow().strftime('%Y%m%d'))
+            for key in [k for k in conns if k not in (today, LEGACY_PARTITION)]:
+                conns.pop(key).close()
+            
+            if time.monotonic() >= next_retention:
+                next_retention = time.monotonic() + retention_interval
+                try:
+                    self.apply_retention(conns)
+                except (sqlite3.Error, OSError) as e:
+                    print(f"Warning: Log retention failed: {e}")
+        
+        for conn in conns.values():
+            conn.close()
+    
+    @property
+    def queue_depth(self):
+        """Rows waiting for the writer"""
+        return self._queue.qsize()
+    
+    def flush(self):
+        """Block until every row queued so far has been written"""
+        if self._writer_pid == os.getpid():
+            self._queue.join()
+    
+    def close(self):
+        """Drain the queue and stop the writer thread"""
+        with self._writer_lock:
+            if self._writer_pid != os.getpid() or self._writer is None:
+                return
+            self._queue.put(_STOP)
+            self._writer.join()
+            self._writer = None
+            self._writer_pid = None
+    
+    def get_logs(self, before_id: Optional[int] = None, limit: int = 100,
+                 is_real: Optional[bool] = None,
+                 min_confidence: Optional[float] = None, max_confidence: Optional[float] = None,
+                 since: Optional[str] = None, until: Optional[str] = None,
+                 include_thumbnails: bool = False):
+        """
+        Retrieve inference logs, newest first, one keyset page at a time
+        Args:
+            before_id: Only return rows with a smaller id (cursor from the previous page)
+            limit: Maximum number of logs to retrieve
+            is_real: Only real (True) or spoof (False) results
+            min_confidence: Minimum confidence (inclusive)
+            max_confidence: Maximum confidence (inclusive)
+            since: Earliest timestamp, 'YYYY-MM-DD HH:MM:SS' UTC (inclusive)
+            until: Latest timestamp, 'YYYY-MM-DD HH:MM:SS' UTC (exclusive)
+            include_thumbnails: Also load the frame_data BLOBs
+        Returns: List of log entries
+        Raises: ValueError if since or until is not a timestamp
+        """
+        since = normalize_timestamp(since)
+        until = normalize_timestamp(until)
+        
+        logs = []
+        for key in self.partitions():
+            if len(logs) >= limit:
+                break
+            if key != LEGACY_PARTITION:
+                # Skip whole days outside the cursor or time window
+                if before_id is not None and partition_base(key) >= before_id:
+                    continue
+                if since is not None and key < partition_key(since):
+                    continue
+                if until is not None and key > partition_key(until):
+                    continue
+            
+            logs.extend(self._query_partition(
+                key, limit - len(logs), before_id, is_real,
+                min_confidence, max_confidence, since, until, include_thumbnails
+            ))
+        
+        return logs
+    
+    def iter_logs(self, since: Optional[str] = None, until: Optional[str] = None,
+                  is_real: Optional[bool] = None,
+                  min_confidence: Optional[float] = None, max_confidence: Optional[float] = None,
+                  include_thumbnails: bool = False, chunk_size: int = 1000):
+        """
+        Walk all matching logs, oldest first, in keyset chunks
+        Each chunk is a short query continuing after the last id seen, so memory
+        stays constant and no read transaction is held open between chunks.
+        Args:
+            since: Earliest timestamp, 'YYYY-MM-DD HH:MM:SS' UTC (inclusive)
+            until: Latest timestamp, 'YYYY-MM-DD HH:MM:SS' UTC (exclusive)
+            is_real: Only real (True) or spoof (False) results
+            min_confidence: Minimum confidence (inclusive)
+            max_confidence: Maximum confidence (inclusive)
+            include_thumbnails: Also load the frame_data BLOBs
+            chunk_size: Rows fetched per query
+        Yields: Log entries
+        Raises: ValueError if since or until is not a timestamp
+        """
+        since = normalize_timestamp(since)
+        until = normalize_timestamp(until)
+        
+        for key in reversed(self.partitions()):
+            if key != LEGACY_PARTITION:
+                if since is not None and key < partition_key(since):
+                    continue
+                if until is not None and key > partition_key(until):
+                    continue
+            
+            after_id = None
+            while True:
+                chunk = self._query_partition(
+                    key, chunk_size, None, is_real, min_confidence, max_confidence,
+                    since, until, include_thumbnails, after_id=after_id, ascending=True
+                )
+                yield from chunk
+                if len(chunk) < chunk_size:
+                    break
+                after_id = chunk[-1]["id"]
+    
+    def _query_partition(self, key, limit, before_id, is_real, min_confidence, max_confidence,
+                         since, until, include_thumbnails, after_id=None, ascending=False):
+        """
+        Run a log query against one partition, translating ids to global ids
+        Newest first, or oldest first with ascending.
+        """
+        path = self.partition_path(key)
+        if not path.exists():
+            return []
+        
+        base = partition_base(key)
+        columns = LOG_COLUMNS + ("frame_data",) if include_thumbnails else LOG_COLUMNS
+        conditions = []
+        params = []
+        
+        if before_id is not None:
+            conditions.append("id < ?")
+            params.append(before_id - base)
+        if after_id is not None:
+            conditions.append("id > ?")
+            params.append(after_id - base)
+        if is_real is not None:
+            conditions.append("is_real = ?")
+            params.append(bool(is_real))
+        if min_confidence is not None:
+            conditions.append("confidence >= ?")
+            params.append(min_confidence)
+        if max_confidence is not None:
+            conditions.append("confidence <= ?")
+            params.append(max_confidence)
+        if since is not None:
+            conditions.append("timestamp >= ?")
+            params.append(since)
+        if until is not None:
+            conditions.append("timestamp < ?")
+            params.append(until)
+        
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        order = "ASC" if ascending else "DESC"
+        
+        conn = self._connect_read(path)
+        conn.row_factory = sqlite3.Row
+        cursor = conn.cursor()
+        
+        # ids grow with time, so id order is timestamp order and walks the rowid b-tree
+        try:
+            cursor.execute(f"""
+                SELECT {', '.join(columns)} FROM inference_logs
+                {where}
+                ORDER BY id {order}
+                LIMIT ?
+            """, (*params, limit))
+            logs = [dict(row) for row in cursor.fetchall()]
+        except sqlite3.OperationalError:
+            # Partition created but not initialized yet
+            logs = []
         conn.close()
+        
+        for log in logs:
+            log["id"] += base
+        return logs
     
     def get_recent_logs(self, limit: int = 100):
         """
-        Retrieve recent inference logs
+        Retrieve recent inference logs (without thumbnails)
         Args:
             limit: Maximum number of logs to retrieve
         Returns: List of log entries
         """
-        conn = sqlite3.connect(self.db_path)
+        return self.get_logs(limit=limit)
+    
+    def get_thumbnail(self, log_id: int):
+        """
+        Retrieve the stored thumbnail of one log entry
+        Args:
+            log_id: Log entry id
+        Returns: JPEG bytes, or None if the entry or its thumbnail does not exist
+        """
+        key, local_id = split_id(log_id)
+        
+        path = self.partition_path(key)
+        if not path.exists():
+            return None
+        
+        conn = self._connect_read(path)
+        cursor = conn.cursor()
+        
+        cursor.execute("SELECT frame_data FROM inference_logs WHERE id = ?", (local_id,))
+        row = cursor.fetchone()
+        conn.close()
+        
+        return row[0] if row is not None else None
+    
+    def get_rollups(self, since: Optional[str] = None, until: Optional[str] = None,
+                    resolution: str = "minute"):
+        """
+        Retrieve pre-aggregated counts for dashboards
+        Args:
+            since: Earliest minute, 'YYYY-MM-DD HH:MM' UTC (inclusive)
+            until: Latest minute, 'YYYY-MM-DD HH:MM' UTC (exclusive)
+            resolution: "minute", "hour" or "day"
+        Returns: List of buckets, oldest first
+        Raises: ValueError if since or until is not a timestamp
+        """
+        width = {"minute": 16, "hour": 13, "day": 10}[resolution]
+        conditions = []
+        params = []
+        if since is not None:
+            conditions.append("minute >= ?")
+            params.append(normalize_timestamp(since)[:16])
+        if until is not None:
+            conditions.append("minute < ?")
+            params.append(normalize_timestamp(until)[:16])
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        
+        conn = self._connect_read()
         conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
         
-        cursor.execute("""
-            SELECT * FROM inference_logs
-            ORDER BY timestamp DESC
-            LIMIT ?
-        """, (limit,))
+        cursor.execute(f"""
+            SELECT substr(minute, 1, {width}) AS bucket,
+                   SUM(frames) AS frames,
+                   SUM(real_count) AS real_count,
+                   SUM(spoof_count) AS spoof_count,
+                   SUM(confidence_sum) / SUM(frames) AS mean_confidence,
+                   SUM(active_check_passed) AS active_check_passed
+            FROM inference_rollups
+            {where}
+            GROUP BY bucket
+            ORDER BY bucket
+        """, params)
         
-        logs = [dict(row) for row in cursor.fetchall()]
+        rollups = [dict(row) for row in cursor.fetchall()]
         conn.close()
         
-        return logs
+        return rollups
@@ -0,0 +1,75 @@
+"""
+Executor layer for running CPU-bound pipeline stages off the asyncio event loop
+"""
+import asyncio
+import functools
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+
+class InferenceExecutor:
+    def __init__(self, kind="thread", max_workers=None, max_inflight=None,
+                 initializer=None, initargs=()):
+        """
+        Initialize executor
+        Args:
+            kind: "thread" for a thread pool, "process" for a process pool
+            max_workers: Number of pool workers (defaults to CPU count)
+            max_inflight: Maximum number of jobs handed to the pool at once;
+                further callers wait for a free slot (defaults to 2 * max_workers)
+            initializer: Optional callable run once in every worker
+            initargs: Arguments passed to initializer
+        """
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unknown executor kind: {kind}")
+
+        self.kind = kind
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_inflight = max_inflight or 2 * self.max_workers
+
+        if kind == "process":
+            # spawn: TensorFlow and MediaPipe are not fork-safe once initialized
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=initializer,
+                initargs=initargs
+            )
+        else:
+            self._pool = ThreadPoolExecutor(
+                max_workers=self.max_workers,
+                thread_name_prefix="inference",
+                initializer=initializer,
+                initargs=initargs
+            )
+
+        self._slots = asyncio.Semaphore(self.max_inflight)
+        self.inflight = 0
+        self.waiting = 0
+
+    async def run(self, fn, *args, **kwargs):
+        """
+        Run fn(*args, **kwargs) on the pool without blocking the event loop
+        Waits for a free in-flight slot first, so bursts queue here instead
+        of piling up unbounded work inside the pool.
+        """
+        self.waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.waiting -= 1
+
+        self.inflight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self._pool, functools.partial(fn, *args, **kwargs)
+            )
+        finally:
+            self.inflight -= 1
+            self._slots.release()
+
+    def shutdown(self, wait=True):
+        """Shut down the worker pool"""
+        self._pool.shutdown(wait=wait, cancel_futures=True)
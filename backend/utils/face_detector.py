@@ -1,29 +1,85 @@
 """
 Face Detection and Alignment using OpenCV and MediaPipe
 """
+import threading
+
 import cv2
 import numpy as np
-import mediapipe as mp
+
+
+# Face mesh landmark indices (MediaPipe)
+LEFT_EYE = (159, 145, 33, 133)  # top, bottom, left, right
+RIGHT_EYE = (386, 374, 362, 263)
+NOSE_TIP = 4
+
+# Extra margin around the detected bbox for the face mesh crop (fraction of bbox size)
+MESH_CROP_PADDING = 0.25
+
+
+class FrameAnalysis:
+    """
+    Per-frame face analysis shared by all landmark-based checks
+    The face mesh runs at most once per frame, on first access, and only on
+    the detected face crop when a bounding box is known.
+    """
+    def __init__(self, face_detector, frame, bbox=None):
+        self.face_detector = face_detector
+        self.frame = frame
+        self.bbox = bbox
+        self._landmarks = None
+        self._computed = False
+    
+    @property
+    def landmarks(self):
+        """(478, 3) array of x, y, z normalized to the full frame, or None if no face"""
+        if not self._computed:
+            self._landmarks = self.face_detector.compute_landmarks(self.frame, self.bbox)
+            self._computed = True
+        return self._landmarks
 
 
 class FaceDetector:
+    """
+    MediaPipe face detection and face mesh
+    Both graphs are built on first use: the import of mediapipe and the graph
+    setup are paid by the first frame that needs them, and the face mesh only
+    when a landmark-based (active) check runs.
+    """
     def __init__(self):
-        self.mp_face_detection = mp.solutions.face_detection
-        self.mp_face_mesh = mp.solutions.face_mesh
-        self.mp_drawing = mp.solutions.drawing_utils
-        
-        self.face_detection = self.mp_face_detection.FaceDetection(
-            model_selection=1,  # Full range model for better accuracy
-            min_detection_confidence=0.5
-        )
-        
-        self.face_mesh = self.mp_face_mesh.FaceMesh(
-            static_image_mode=False,
-            max_num_faces=1,
-            refine_landmarks=True,
-            min_detection_confidence=0.5,
-            min_tracking_confidence=0.5
-        )
+        self._face_detection = None
+        self._face_mesh = None
+        self._lock = threading.Lock()
+    
+    @property
+    def face_detection(self):
+        """MediaPipe FaceDetection graph, built on first access"""
+        if self._face_detection is None:
+            with self._lock:
+                if self._face_detection is None:
+                    import mediapipe as mp
+                    
+                    self._face_detection = mp.solutions.face_detection.FaceDetection(
+                        model_selection=1,  # Full range model for better accuracy
+                        min_detection_confidence=0.5
+                    )
+        return self._face_detection
+    
+    @property
+    def face_mesh(self):
+        """MediaPipe FaceMesh graph, built on first access"""
+        if self._face_mesh is None:
+            with self._lock:
+                if self._face_mesh is None:
+                    import mediapipe as mp
+                    
+                    self._face_mesh = mp.solutions.face_mesh.FaceMesh(
+                        static_image_mode=False,
+                        max_num_faces=1,
+                        refine_landmarks=True,
+                        min_detection_confidence=0.5,
+                        min_tracking_confidence=0.5
+                    )
+        return self._face_mesh
     
     def detect_face(self, frame):
         """
@@ -84,69 +140,128 @@ class FaceDetector:
         face_roi = cv2.resize(face_roi, (128, 128))
         return face_roi
     
-    def detect_blink(self, frame):
+    def analyze(self, frame, bbox=None):
         """
-        Detect blink using facial landmarks
-        Returns: True if blink detected, False otherwise
+        Create the shared per-frame analysis for landmark-based checks
+        Args:
+            frame: Input frame
+            bbox: Optional face bounding box from detect_face
+        Returns: FrameAnalysis
         """
-        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        results = self.face_mesh.process(rgb_frame)
+        return FrameAnalysis(self, frame, bbox)
+    
+    def compute_landmarks(self, frame, bbox=None):
+        """
+        Run the face mesh once and return its landmarks as an array
+        Args:
+            frame: Input frame
+            bbox: Optional bounding box; the mesh then only sees the padded face crop
+        Returns: (478, 3) float32 array of x, y, z normalized to the full frame, or None
+        """
+        h, w = frame.shape[:2]
+        x_start, y_start, x_end, y_end = 0, 0, w, h
         
-        if not results.multi_face_landmarks:
-            return False
+        if bbox is not None:
+            x, y, bw, bh = bbox
+            pad_x = int(bw * MESH_CROP_PADDING)
+            pad_y = int(bh * MESH_CROP_PADDING)
+            x_start = max(0, x - pad_x)
+            y_start = max(0, y - pad_y)
+            x_end = min(w, x + bw + pad_x)
+            y_end = min(h, y + bh + pad_y)
         
-        landmarks = results.multi_face_landmarks[0]
+        crop = frame[y_start:y_end, x_start:x_end]
+        if crop.size == 0:
+            return None
         
-        # Left eye landmarks (MediaPipe indices)
-        left_eye_top = landmarks.landmark[159].y
-        left_eye_bottom = landmarks.landmark[145].y
-        left_eye_left = landmarks.landmark[33].x
-        left_eye_right = landmarks.landmark[133].x
+        rgb_crop = cv2.cvtColor(crop, cv2.COLOR_BGR2RGB)
+        results = self.face_mesh.process(rgb_crop)
         
-        # Right eye landmarks
-        right_eye_top = landmarks.landmark[386].y
-        right_eye_bottom = landmarks.landmark[374].y
-        right_eye_left = landmarks.landmark[362].x
-        right_eye_right = landmarks.landmark[263].x
+        if not results.multi_face_landmarks:
+            return None
         
-        # Calculate eye aspect ratios (EAR)
-        left_ear = abs(left_eye_top - left_eye_bottom) / abs(left_eye_left - left_eye_right)
-        right_ear = abs(right_eye_top - right_eye_bottom) / abs(right_eye_right - right_eye_left)
+        points = np.array(
+            [(lm.x, lm.y, lm.z) for lm in results.multi_face_landmarks[0].landmark],
+            dtype=np.float32
+        )
         
-        avg_ear = (left_ear + right_ear) / 2.0
+        # Map crop-normalized coordinates back to the full frame
+        crop_w = x_end - x_start
+        crop_h = y_end - y_start
+        points[:, 0] = (x_start + points[:, 0] * crop_w) / w
+        points[:, 1] = (y_start + points[:, 1] * crop_h) / h
+        points[:, 2] = points[:, 2] * crop_w / w
+        
+        return points
+    
+    @staticmethod
+    def eye_aspect_ratio(landmarks):
+        """
+        Average eye aspect ratio (EAR) of both eyes
+        Args:
+            landmarks: Landmark array from compute_landmarks
+        Returns: EAR (lower = more closed)
+        """
+        ratios = []
+        for top, bottom, left, right in (LEFT_EYE, RIGHT_EYE):
+            height = abs(landmarks[top, 1] - landmarks[bottom, 1])
+            width = abs(landmarks[left, 0] - landmarks[right, 0])
+            ratios.append(height / width)
+        return float(sum(ratios) / 2.0)
+    
+    def detect_blink(self, frame, analysis=None):
+        """
+        Detect blink using facial landmarks
+        Args:
+            frame: Input frame
+            analysis: Optional FrameAnalysis to reuse landmarks already computed for this frame
+        Returns: True if blink detected, False otherwise
+        """
+        if analysis is None:
+            analysis = self.analyze(frame)
+        
+        landmarks = analysis.landmarks
+        if landmarks is None:
+            return False
         
         # Threshold for blink detection (lower EAR = more closed)
         blink_threshold = 0.25
-        return avg_ear < blink_threshold
+        return self.eye_aspect_ratio(landmarks) < blink_threshold
     
-    def detect_head_movement(self, frame, prev_landmarks=None):
+    def detect_head_movement(self, frame, prev_landmarks=None, analysis=None):
         """
         Detect head movement/turn
+        Args:
+            frame: Input frame
+            prev_landmarks: Nose tip position (x, y) from the previous call
+            analysis: Optional FrameAnalysis to reuse landmarks already computed for this frame
         Returns: (has_movement: bool, current_landmarks)
         """
-        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        results = self.face_mesh.process(rgb_frame)
+        if analysis is None:
+            analysis = self.analyze(frame)
         
-        if not results.multi_face_landmarks:
+        landmarks = analysis.landmarks
+        if landmarks is None:
             return False, None
         
-        landmarks = results.multi_face_landmarks[0]
-        nose_tip = landmarks.landmark[4]  # Nose tip
+        nose_tip = (float(landmarks[NOSE_TIP, 0]), float(landmarks[NOSE_TIP, 1]))
         
         if prev_landmarks is None:
-            return False, (nose_tip.x, nose_tip.y)
+            return False, nose_tip
         
         # Calculate movement
         movement = np.sqrt(
-            (nose_tip.x - prev_landmarks[0])**2 + 
-            (nose_tip.y - prev_landmarks[1])**2
+            (nose_tip[0] - prev_landmarks[0])**2 + 
+            (nose_tip[1] - prev_landmarks[1])**2
         )
         
         movement_threshold = 0.02
-        return movement > movement_threshold, (nose_tip.x, nose_tip.y)
+        return movement > movement_threshold, nose_tip
     
     def release(self):
         """Release resources"""
-        self.face_detection.close()
-        self.face_mesh.close()
+        if self._face_detection is not None:
+            self._face_detection.close()
+        if self._face_mesh is not None:
+            self._face_mesh.close()
 
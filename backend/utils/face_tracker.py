@@ -0,0 +1,106 @@
+"""
+Lightweight face tracking between detector keyframes
+Carries the face bounding box forward with template matching so the full
+MediaPipe detector only runs every few frames or when tracking is lost.
+"""
+import cv2
+
+
+class FaceTracker:
+    # Templates are matched at this width (pixels) to keep matching cheap
+    TEMPLATE_WIDTH = 32
+
+    def __init__(self, keyframe_interval=10, min_score=0.6, search_margin=0.5):
+        """
+        Initialize per-session face tracker
+        Args:
+            keyframe_interval: Run full detection at least every N frames
+            min_score: Re-detect when the normalized match score drops below this
+            search_margin: Search window around the last bbox, as a fraction of its size
+        """
+        self.keyframe_interval = keyframe_interval
+        self.min_score = min_score
+        self.search_margin = search_margin
+        self.reset()
+
+        # Counters for keyframe/tracked ratio
+        self.keyframes = 0
+        self.tracked_frames = 0
+
+    def reset(self):
+        """Drop the current track; the next frame runs full detection"""
+        self.bbox = None
+        self.template = None
+        self.scale = 1.0
+        self.frames_since_keyframe = 0
+
+    def update(self, frame, face_detector):
+        """
+        Locate the face in a new frame
+        Args:
+            frame: Input frame
+            face_detector: FaceDetector used on keyframes
+        Returns: (x, y, width, height) or None if no face detected
+        """
+        if self.bbox is None or self.frames_since_keyframe >= self.keyframe_interval:
+            return self._keyframe(frame, face_detector)
+
+        bbox, score = self._track(frame)
+        if bbox is None or score < self.min_score:
+            # Drift or loss: fall back to the detector
+            return self._keyframe(frame, face_detector)
+
+        self.bbox = bbox
+        self.frames_since_keyframe += 1
+        self.tracked_frames += 1
+        return bbox
+
+    def _keyframe(self, frame, face_detector):
+        """Run full detection and refresh the template"""
+        self.reset()
+        self.keyframes += 1
+
+        bbox = face_detector.detect_face(frame)
+        if bbox is None or bbox[2] <= 0 or bbox[3] <= 0:
+            return bbox
+
+        x, y, w, h = bbox
+        self.scale = self.TEMPLATE_WIDTH / float(w)
+        self.template = self._gray_scaled(frame[y:y + h, x:x + w])
+        self.bbox = bbox
+        return bbox
+
+    def _gray_scaled(self, region):
+        """Grayscale region resized by the tracker scale"""
+        gray = cv2.cvtColor(region, cv2.COLOR_BGR2GRAY)
+        return cv2.resize(gray, None, fx=self.scale, fy=self.scale,
+                          interpolation=cv2.INTER_AREA)
+
+    def _track(self, frame):
+        """
+        Match the keyframe template inside a window around the last bbox
+        Returns: (bbox, score) or (None, 0.0)
+        """
+        frame_h, frame_w = frame.shape[:2]
+        x, y, w, h = self.bbox
+        margin_x = int(w * self.search_margin)
+        margin_y = int(h * self.search_margin)
+
+        x_start = max(0, x - margin_x)
+        y_start = max(0, y - margin_y)
+        x_end = min(frame_w, x + w + margin_x)
+        y_end = min(frame_h, y + h + margin_y)
+
+        window = self._gray_scaled(frame[y_start:y_end, x_start:x_end])
+        t_h, t_w = self.template.shape[:2]
+        if window.shape[0] < t_h or window.shape[1] < t_w:
+            return None, 0.0
+
+        scores = cv2.matchTemplate(window, self.template, cv2.TM_CCOEFF_NORMED)
+        _, score, _, (loc_x, loc_y) = cv2.minMaxLoc(scores)
+
+        new_x = x_start + int(round(loc_x / self.scale))
+        new_y = y_start + int(round(loc_y / self.scale))
+        new_w = min(w, frame_w - new_x)
+        new_h = min(h, frame_h - new_y)
+        return (new_x, new_y, new_w, new_h), float(score)
@@ -0,0 +1,257 @@
+"""
+Pluggable inference runtimes for the liveness model
+Keras (.h5), TFLite (.tflite) and ONNX (.onnx) models behind one predict() call
+"""
+import threading
+from pathlib import Path
+
+import numpy as np
+
+# Model input: RGB face crop normalized to [0, 1]
+INPUT_SHAPE = (128, 128, 3)
+
+
+def bucket_size(batch_size):
+    """Smallest power of two >= batch_size"""
+    return 1 << max(0, batch_size - 1).bit_length()
+
+
+class KerasBackend:
+    name = "keras"
+
+    def __init__(self, model_path, jit_compile=False):
+        import tensorflow as tf
+        from tensorflow import keras
+
+        self.model = keras.models.load_model(model_path)
+        self.jit_compile = jit_compile
+        self.input_shape = tuple(self.model.input_shape[1:])
+
+        # model.predict builds a data adapter and step loop on every call, which
+        # costs more than the network itself for small batches. A traced function
+        # with a fixed signature is built once and then only executes the graph.
+        self._infer = tf.function(
+            lambda batch: self.model(batch, training=False),
+            input_signature=[tf.TensorSpec((None,) + self.input_shape, tf.float32)],
+            jit_compile=jit_compile
+        )
+
+    def after_fork(self):
+        """TensorFlow cannot be used in a child forked after it was initialized"""
+        raise RuntimeError(
+            "The Keras runtime cannot be shared with forked workers; "
+            "export the model to TFLite or ONNX (model/export_model.py)"
+        )
+
+    def predict(self, batch):
+        """
+        Args:
+            batch: float32 array (N, 128, 128, 3) normalized to [0, 1]
+        Returns: Array of N probabilities of being real
+        """
+        batch = np.asarray(batch, dtype=np.float32)
+        size = batch.shape[0]
+        if self.jit_compile and bucket_size(size) != size:
+            # XLA compiles once per input shape: pad to a power-of-two bucket
+            padding = np.zeros((bucket_size(size) - size,) + batch.shape[1:], dtype=np.float32)
+            batch = np.concatenate([batch, padding])
+        return self._infer(batch).numpy()[:size, 0]
+
+    def warm_up(self, max_batch_size=1):
+        """Trace the inference function (and with XLA, compile every batch bucket) up front"""
+        if self.jit_compile:
+            sizes = sorted({bucket_size(n) for n in range(1, max_batch_size + 1)})
+        else:
+            sizes = sorted({1, max_batch_size})
+        for size in sizes:
+            self.predict(np.zeros((size,) + self.input_shape, dtype=np.float32))
+
+
+class TFLiteBackend:
+    name = "tflite"
+
+    def __init__(self, model_path, num_threads=None):
+        # The interpreter reads weights from this buffer in place, so forked
+        # workers share it copy-on-write (see after_fork)
+        self.model_content = Path(model_path).read_bytes()
+        self.num_threads = num_threads
+
+        # One interpreter per power-of-two batch bucket, allocated once: resizing
+        # a single interpreter reallocates every tensor whenever the batch size changes
+        self._interpreters = {}
+
+        # Interpreters are not thread-safe; batching usually leaves one caller anyway
+        self._lock = threading.Lock()
+
+        # Created here so a missing runtime fails load_backend, which then tries the next format
+        self._interpreter(1)
+
+    def _interpreter(self, batch_size):
+        """(interpreter, input detail, output detail) for one batch bucket, created on first use"""
+        if batch_size not in self._interpreters:
+            try:
+                from tflite_runtime.interpreter import Interpreter
+            except ImportError:
+                from tensorflow.lite import Interpreter
+
+            interpreter = Interpreter(model_content=self.model_content, num_threads=self.num_threads)
+            input_detail = interpreter.get_input_details()[0]
+            if input_detail["shape"][0] != batch_size:
+                shape = list(input_detail["shape"])
+                shape[0] = batch_size
+                interpreter.resize_tensor_input(input_detail["index"], shape)
+            interpreter.allocate_tensors()
+            self._interpreters[batch_size] = (
+                interpreter,
+                interpreter.get_input_details()[0],
+                interpreter.get_output_details()[0]
+            )
+        return self._interpreters[batch_size]
+
+    def after_fork(self):
+        """New interpreters (and thread pools) over the model buffer inherited from the parent"""
+        self._interpreters = {}
+        self._lock = threading.Lock()
+
+    def warm_up(self, max_batch_size=1):
+        """Allocate and run the interpreter of every batch bucket up to max_batch_size"""
+        for size in sorted({bucket_size(n) for n in range(1, max_batch_size + 1)}):
+            self.predict(np.zeros((size,) + INPUT_SHAPE, dtype=np.float32))
+
+    def predict(self, batch):
+        """
+        Args:
+            batch: float32 array (N, 128, 128, 3) normalized to [0, 1]
+        Returns: Array of N probabilities of being real
+        """
+        size = batch.shape[0]
+        if bucket_size(size) != size:
+            padding = np.zeros((bucket_size(size) - size,) + batch.shape[1:], dtype=np.float32)
+            batch = np.concatenate([batch, padding])
+
+        with self._lock:
+            interpreter, input_detail, output_detail = self._interpreter(batch.shape[0])
+
+            # Fully-quantized models take integer input
+            input_dtype = input_detail["dtype"]
+            if np.issubdtype(input_dtype, np.integer):
+                scale, zero_point = input_detail["quantization"]
+                batch = np.round(batch / scale + zero_point).astype(input_dtype)
+
+            interpreter.set_tensor(input_detail["index"], batch.astype(input_dtype, copy=False))
+            interpreter.invoke()
+            output = interpreter.get_tensor(output_detail["index"])
+
+            if np.issubdtype(output.dtype, np.integer):
+                scale, zero_point = output_detail["quantization"]
+                output = (output.astype(np.float32) - zero_point) * scale
+
+        return output[:size, 0]
+
+
+class ONNXBackend:
+    name = "onnx"
+
+    def __init__(self, model_path):
+        self.model_path = str(model_path)
+        self._create_session()
+
+    def _create_session(self):
+        import onnxruntime
+
+        self.session = onnxruntime.InferenceSession(
+            self.model_path, providers=["CPUExecutionProvider"]
+        )
+        self.input_name = self.session.get_inputs()[0].name
+
+    def after_fork(self):
+        """ONNX Runtime thread pools do not survive fork: reload the session"""
+        self._create_session()
+
+    def warm_up(self, max_batch_size=1):
+        """Run the largest batch in use once, so its buffers are allocated"""
+        for size in sorted({1, max_batch_size}):
+            self.predict(np.zeros((size,) + INPUT_SHAPE, dtype=np.float32))
+
+    def predict(self, batch):
+        """
+        Args:
+            batch: float32 array (N, 128, 128, 3) normalized to [0, 1]
+        Returns: Array of N probabilities of being real
+        """
+        output = self.session.run(None, {self.input_name: batch.astype(np.float32)})[0]
+        return output[:, 0]
+
+
+BACKENDS = {
+    ".h5": KerasBackend,
+    ".keras": KerasBackend,
+    ".tflite": TFLiteBackend,
+    ".onnx": ONNXBackend
+}
+
+# Exported variants looked up next to the Keras model (file names written by
+# model/export_model.py). int8 changes accuracy, so "auto" never picks it: it
+# has to be asked for with runtime "tflite-int8".
+EXPORT_SUFFIXES = {
+    "tflite": ["_fp16.tflite"],
+    "tflite-int8": ["_int8.tflite"],
+    "onnx": [".onnx"],
+    "keras": []
+}
+
+
+def candidate_paths(model_path, runtime="auto"):
+    """
+    Model files to try for a runtime, in order of preference
+    Args:
+        model_path: Path to the Keras model (or directly to an exported model)
+        runtime: "auto", "keras", "tflite", "tflite-int8" or "onnx"
+    Returns: List of paths
+    """
+    model_path = Path(model_path)
+    if model_path.suffix in (".tflite", ".onnx"):
+        return [model_path]
+
+    runtimes = ["tflite", "onnx", "keras"] if runtime == "auto" else [runtime]
+    candidates = []
+    for name in runtimes:
+        for suffix in EXPORT_SUFFIXES[name]:
+            candidates.append(model_path.with_name(model_path.stem + suffix))
+    if "keras" in runtimes:
+        candidates.append(model_path)
+    return candidates
+
+
+def load_backend(model_path, runtime="auto", jit_compile=False):
+    """
+    Load the first available model file with a usable runtime
+    Args:
+        model_path: Path to the Keras model (or directly to an exported model)
+        runtime: "auto" prefers float16 TFLite, then ONNX, then Keras
+        jit_compile: XLA-compile the Keras inference function (ignored by other runtimes)
+    Returns: (backend, path)
+    Raises: FileNotFoundError if no candidate file exists, or the last load error
+    """
+    model_path = Path(model_path)
+    source_mtime = model_path.stat().st_mtime if model_path.exists() else None
+    last_error = None
+    for path in candidate_paths(model_path, runtime):
+        if not path.exists():
+            continue
+        if path != model_path and source_mtime is not None and path.stat().st_mtime < source_mtime:
+            # Exported before the Keras model was retrained
+            print(f"Skipping {path}: older than {model_path}; re-run model/export_model.py")
+            continue
+        try:
+            backend_class = BACKENDS[path.suffix]
+            if backend_class is KerasBackend:
+                return backend_class(path, jit_compile=jit_compile), path
+            return backend_class(path), path
+        except ImportError as e:
+            # Runtime not installed: try the next format
+            last_error = e
+
+    if last_error is not None:
+        raise last_error
+    raise FileNotFoundError(f"No model found for {model_path} (runtime={runtime})")
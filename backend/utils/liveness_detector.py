@@ -2,39 +2,87 @@
 Liveness Detection using MobileNetV2-based CNN
 Implements passive and active liveness checks
 """
+import threading
+import time
+
 import cv2
 import numpy as np
-from tensorflow import keras
+
+from utils.batching import BatchScheduler
+from utils.inference_backend import load_backend
 
 
 class LivenessDetector:
-    def __init__(self, model_path="models/liveness_model.h5"):
+    def __init__(self, model_path="models/liveness_model.h5", runtime="auto", lazy=False,
+                 jit_compile=False):
         """
         Initialize liveness detector
         Args:
             model_path: Path to trained MobileNetV2 model
+            runtime: "auto" (exported TFLite/ONNX model next to model_path if
+                present, else Keras), "keras", "tflite" or "onnx"
+            lazy: Defer loading the model to warm_up or the first passive check
+            jit_compile: XLA-compile the Keras inference function
         """
         self.model = None
         self.model_path = model_path
-        self.load_model()
+        self.runtime = runtime
+        self.jit_compile = jit_compile
+        self.batch_scheduler = None
+        self.loaded = False
+        self._load_lock = threading.Lock()
+        self._batching = None
+        if not lazy:
+            self.load_model()
         
         # Active liveness state
-        self.active_check_state = {
-            'blink_detected': False,
-            'head_moved': False,
-            'blink_count': 0,
-            'previous_landmarks': None
-        }
+        self.active_check_state = self.new_active_check_state()
     
     def load_model(self):
-        """Load the trained liveness detection model"""
+        """Load the trained liveness detection model with the selected runtime"""
         try:
-            self.model = keras.models.load_model(self.model_path)
-            print(f"Model loaded successfully from {self.model_path}")
+            self.model, path = load_backend(self.model_path, self.runtime, self.jit_compile)
+            print(f"Model loaded successfully from {path} ({self.model.name} runtime)")
         except Exception as e:
             print(f"Warning: Could not load model from {self.model_path}: {e}")
             print("Using default model initialization (requires training)")
             self.model = None
+        self.loaded = True
+        
+        # Batching requested before the model was there
+        if self._batching is not None:
+            self.enable_batching(*self._batching)
+    
+    def ensure_loaded(self):
+        """Load the model if this detector was created lazily (once, thread-safe)"""
+        if not self.loaded:
+            with self._load_lock:
+                if not self.loaded:
+                    self.load_model()
+    
+    def warm_up(self, max_batch_size=1):
+        """
+        Load the model and run dummy forward passes for the batch sizes in use
+        (up to the micro-batch size), so the first real frames do not pay for
+        tracing, compilation or runtime initialization
+        Args:
+            max_batch_size: Largest batch other callers send (e.g. images per /predict request)
+        Returns: Dict of stage timings in seconds
+        """
+        timings = {}
+        
+        start = time.perf_counter()
+        self.ensure_loaded()
+        timings["model_load"] = time.perf_counter() - start
+        
+        if self.model is not None:
+            if self._batching is not None:
+                max_batch_size = max(max_batch_size, self._batching[0])
+            start = time.perf_counter()
+            self.model.warm_up(max(1, max_batch_size))
+            timings["model_warm_up"] = time.perf_counter() - start
+        
+        return timings
     
     def preprocess_frame(self, face_roi):
         """
@@ -61,6 +109,56 @@ class LivenessDetector:
         
         return face_batch
     
+    def predict_scores(self, batch):
+        """
+        Run the model on a preprocessed batch
+        Args:
+            batch: Array of shape (N, 128, 128, 3), normalized to [0, 1]
+        Returns: Array of N probabilities of being real
+        """
+        return self.model.predict(batch)
+    
+    def enable_batching(self, max_batch_size=16, max_wait_ms=5.0):
+        """
+        Route passive checks from concurrent callers through a shared BatchScheduler
+        Args:
+            max_batch_size: Largest batch sent to the model
+            max_wait_ms: Longest time a face waits for others to join its batch
+        """
+        self._batching = (max_batch_size, max_wait_ms)
+        if not self.loaded:
+            # Started by load_model
+            return
+        if self.model is None or max_batch_size <= 1:
+            return
+        self.disable_batching()
+        self.batch_scheduler = BatchScheduler(
+            self.predict_scores,
+            max_batch_size=max_batch_size,
+            max_wait_ms=max_wait_ms
+        )
+    
+    def after_fork(self):
+        """
+        Rebuild per-process state in a worker forked from the process that loaded the model
+        Model weights stay shared with the parent; runtime thread pools and the
+        batch scheduler thread do not survive fork and are recreated.
+        """
+        if self.model is not None:
+            self.model.after_fork()
+        
+        if self.batch_scheduler is not None:
+            # The parent's scheduler thread does not exist here; drop it without closing
+            scheduler = self.batch_scheduler
+            self.batch_scheduler = None
+            self.enable_batching(scheduler.max_batch_size, scheduler.max_wait * 1000.0)
+    
+    def disable_batching(self):
+        """Stop the batch scheduler, if any, and go back to per-call inference"""
+        if self.batch_scheduler is not None:
+            self.batch_scheduler.close()
+            self.batch_scheduler = None
+    
     def passive_check(self, face_roi):
         """
         Passive liveness check: Analyze texture, color, and depth cues using CNN
@@ -68,6 +166,7 @@ class LivenessDetector:
             face_roi: Face region of interest
         Returns: (is_real: bool, confidence: float)
         """
+        self.ensure_loaded()
         if self.model is None:
             # Fallback: simple heuristic if model not loaded
             return self._heuristic_check(face_roi), 0.5
@@ -76,14 +175,38 @@ class LivenessDetector:
         if preprocessed is None:
             return False, 0.0
         
-        # Predict
-        prediction = self.model.predict(preprocessed, verbose=0)[0][0]
+        # Predict (batched with other sessions when a scheduler is running)
+        if self.batch_scheduler is not None:
+            prediction = self.batch_scheduler.predict(preprocessed[0])
+        else:
+            prediction = self.predict_scores(preprocessed)[0]
         
+        return self._verdict(prediction)
+    
+    @staticmethod
+    def _verdict(prediction):
+        """Turn a model probability into (is_real, confidence)"""
         # prediction > 0.5 means real, < 0.5 means spoof
         is_real = prediction > 0.5
         confidence = prediction if is_real else 1.0 - prediction
         
-        return is_real, float(confidence)
+        return bool(is_real), float(confidence)
+    
+    def passive_check_batch(self, face_rois):
+        """
+        Passive liveness check for many faces in one model call (offline scoring)
+        Args:
+            face_rois: List of face regions of interest
+        Returns: List of (is_real: bool, confidence: float)
+        """
+        if not face_rois:
+            return []
+        self.ensure_loaded()
+        if self.model is None:
+            return [(self._heuristic_check(face_roi), 0.5) for face_roi in face_rois]
+        
+        batch = np.concatenate([self.preprocess_frame(face_roi) for face_roi in face_rois])
+        return [self._verdict(prediction) for prediction in self.predict_scores(batch)]
     
     def _heuristic_check(self, face_roi):
         """
@@ -103,18 +226,24 @@ class LivenessDetector:
         # Threshold can be adjusted based on testing
         return laplacian_var > 100
     
-    def active_check(self, frame, face_detector):
+    def active_check(self, frame, face_detector, state=None, bbox=None):
         """
         Active liveness check: Require user actions (blink, head movement)
         Args:
             frame: Current frame
             face_detector: FaceDetector instance
+            state: Optional per-session state (defaults to self.active_check_state)
+            bbox: Optional face bounding box; the face mesh then runs on the face crop
         Returns: (passed: bool, status_message: str)
         """
-        state = self.active_check_state
+        if state is None:
+            state = self.active_check_state
+        
+        # One face mesh pass shared by all landmark-based checks
+        analysis = face_detector.analyze(frame, bbox)
         
         # Check for blink
-        if face_detector.detect_blink(frame):
+        if face_detector.detect_blink(frame, analysis):
             if not state['blink_detected']:
                 state['blink_count'] += 1
                 state['blink_detected'] = True
@@ -123,7 +252,7 @@ class LivenessDetector:
         
         # Check for head movement
         has_movement, landmarks = face_detector.detect_head_movement(
-            frame, state['previous_landmarks']
+            frame, state['previous_landmarks'], analysis
         )
         if has_movement:
             state['head_moved'] = True
@@ -142,16 +271,22 @@ class LivenessDetector:
         else:
             return False, "Please blink and turn your head"
     
-    def reset_active_check(self):
-        """Reset active liveness check state"""
-        self.active_check_state = {
+    @staticmethod
+    def new_active_check_state():
+        """Create a fresh active liveness check state"""
+        return {
             'blink_detected': False,
             'head_moved': False,
             'blink_count': 0,
             'previous_landmarks': None
         }
     
-    def detect(self, face_roi, frame=None, face_detector=None, use_active_check=False):
+    def reset_active_check(self):
+        """Reset active liveness check state"""
+        self.active_check_state = self.new_active_check_state()
+    
+    def detect(self, face_roi, frame=None, face_detector=None, use_active_check=False,
+               active_state=None, bbox=None, result_cache=None, timings=None):
         """
         Complete liveness detection pipeline
         Args:
@@ -159,28 +294,55 @@ class LivenessDetector:
             frame: Full frame (for active check)
             face_detector: FaceDetector instance (for active check)
             use_active_check: Whether to perform active liveness check
+            active_state: Optional per-session active check state
+            bbox: Optional face bounding box in frame (for active check)
+            result_cache: Optional per-session PassiveResultCache; the previous
+                passive score is reused while the ROI is unchanged
+            timings: Optional dict; receives "inference" and "active_check" durations (s)
         Returns: {
             'is_real': bool,
             'confidence': float,
             'active_check_passed': bool,
-            'active_check_message': str
+            'active_check_message': str,
+            'reused': bool
         }
         """
         result = {
             'is_real': False,
             'confidence': 0.0,
             'active_check_passed': False,
-            'active_check_message': ''
+            'active_check_message': '',
+            'reused': False
         }
         
-        # Passive check (always performed)
-        is_real, confidence = self.passive_check(face_roi)
+        # Passive check (always performed, unless a recent score can be reused)
+        start = time.perf_counter()
+        cached = None
+        if result_cache is not None:
+            signature = result_cache.signature(face_roi)
+            cached = result_cache.lookup(signature)
+        
+        if cached is not None:
+            is_real, confidence = cached
+            result['reused'] = True
+        else:
+            is_real, confidence = self.passive_check(face_roi)
+            if result_cache is not None:
+                result_cache.store(signature, is_real, confidence)
+        if timings is not None:
+            timings['inference'] = time.perf_counter() - start
+        
         result['is_real'] = is_real
         result['confidence'] = confidence
         
         # Active check (if enabled)
         if use_active_check and frame is not None and face_detector is not None:
-            active_passed, active_message = self.active_check(frame, face_detector)
+            start = time.perf_counter()
+            active_passed, active_message = self.active_check(
+                frame, face_detector, active_state, bbox
+            )
+            if timings is not None:
+                timings['active_check'] = time.perf_counter() - start
             result['active_check_passed'] = active_passed
             result['active_check_message'] = active_message
             
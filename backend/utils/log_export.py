@@ -0,0 +1,89 @@
+"""
+Streaming export of inference logs
+Turns InferenceLogger.iter_logs into NDJSON or CSV text chunks with constant memory
+"""
+import csv
+import io
+import json
+import tarfile
+import time
+
+from utils.database import LOG_COLUMNS
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv"
+}
+
+
+def _json_row(log):
+    """Log entry as a JSON-ready dict with metadata decoded"""
+    row = {column: log[column] for column in LOG_COLUMNS}
+    row["is_real"] = bool(row["is_real"])
+    row["active_check_passed"] = bool(row["active_check_passed"])
+    row["metadata"] = json.loads(row["metadata"]) if row["metadata"] else None
+    return row
+
+
+def ndjson_chunks(logs, rows_per_chunk=500):
+    """
+    Encode logs as newline-delimited JSON
+    Yields: Text chunks of up to rows_per_chunk lines
+    """
+    lines = []
+    for log in logs:
+        lines.append(json.dumps(_json_row(log)))
+        if len(lines) >= rows_per_chunk:
+            yield "\n".join(lines) + "\n"
+            lines = []
+    if lines:
+        yield "\n".join(lines) + "\n"
+
+
+def csv_chunks(logs, rows_per_chunk=500):
+    """
+    Encode logs as CSV with a header row
+    Yields: Text chunks of up to rows_per_chunk rows
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(LOG_COLUMNS)
+
+    count = 0
+    for log in logs:
+        writer.writerow([log[column] for column in LOG_COLUMNS])
+        count += 1
+        if count >= rows_per_chunk:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            count = 0
+    yield buffer.getvalue()
+
+
+def export_chunks(logs, export_format):
+    """Encode logs in the given format ("ndjson" or "csv")"""
+    if export_format == "ndjson":
+        return ndjson_chunks(logs)
+    if export_format == "csv":
+        return csv_chunks(logs)
+    raise ValueError(f"Unknown export format: {export_format}")
+
+
+def with_thumbnail_sidecar(logs, tar_file):
+    """
+    Pass logs through, writing each thumbnail to a tar archive as <id>.jpg
+    Logs must include frame_data; it is removed before the entry is passed on.
+    Args:
+        logs: Iterable of log entries with frame_data
+        tar_file: tarfile.TarFile opened for writing
+    Yields: Log entries without frame_data
+    """
+    for log in logs:
+        thumbnail = log.pop("frame_data", None)
+        if thumbnail:
+            info = tarfile.TarInfo(f"{log['id']}.jpg")
+            info.size = len(thumbnail)
+            info.mtime = int(time.time())
+            tar_file.addfile(info, io.BytesIO(thumbnail))
+        yield log
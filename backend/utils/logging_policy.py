@@ -0,0 +1,157 @@
+"""
+Sampling policy for inference logging
+Decides per frame whether a session's result is worth a thumbnail and a database row,
+so near-identical frames skip the JPEG encode and the insert
+"""
+import heapq
+import random
+import time
+from datetime import datetime
+
+# Modes that can be combined in one policy
+POLICY_MODES = ("all", "every_n", "verdict_change", "low_confidence", "summary", "reservoir")
+
+
+class LoggingPolicy:
+    def __init__(self, modes=("verdict_change", "low_confidence", "every_n", "summary"),
+                 every_n=30, low_confidence=0.7, reservoir_bytes=65536):
+        """
+        Initialize per-session logging policy
+        Args:
+            modes: Enabled modes (see POLICY_MODES); a frame is logged if any mode keeps it
+                - all: every frame with a face
+                - every_n: every every_n-th frame
+                - verdict_change: first frame and whenever is_real or the active check flips
+                - low_confidence: frames with confidence below low_confidence
+                - summary: one aggregate row when the session ends
+                - reservoir: uniform random sample of frames, logged when the session
+                  ends, whose thumbnails fit in reservoir_bytes
+            every_n: Interval for every_n
+            low_confidence: Confidence threshold for low_confidence
+            reservoir_bytes: Thumbnail byte budget for reservoir
+        """
+        unknown = set(modes) - set(POLICY_MODES)
+        if unknown:
+            raise ValueError(f"Unknown logging policy modes: {sorted(unknown)}")
+
+        self.modes = frozenset(modes)
+        self.every_n = max(1, every_n)
+        self.low_confidence = low_confidence
+        self.reservoir_bytes = reservoir_bytes
+
+        # Session statistics
+        self.frames = 0
+        self.real_frames = 0
+        self.confidence_sum = 0.0
+        self.min_confidence = None
+        self.logged = 0
+        self.started_at = time.time()
+        self._last_verdict = None
+        self._last_result = None
+
+        # Reservoir as a min-heap of (key, tiebreak, row); keeps the highest random keys
+        self._reservoir = []
+        self._reservoir_size = 0
+        self._tiebreak = 0
+
+    def observe(self, result):
+        """
+        Record a frame result and decide what to do with it
+        Args:
+            result: Detection result dictionary
+        Returns: (reasons, reservoir_key); log the frame now if reasons is non-empty,
+            offer it to add_to_reservoir if reservoir_key is not None. Thumbnails are
+            only needed when either is set.
+        """
+        self.frames += 1
+        confidence = float(result.get("confidence", 0.0))
+        if result.get("is_real"):
+            self.real_frames += 1
+        self.confidence_sum += confidence
+        if self.min_confidence is None or confidence < self.min_confidence:
+            self.min_confidence = confidence
+        self._last_result = result
+
+        verdict = (bool(result.get("is_real")), result.get("active_check_passed", True))
+        verdict_changed = verdict != self._last_verdict
+        self._last_verdict = verdict
+
+        reasons = []
+        if "all" in self.modes:
+            reasons.append("all")
+        if "every_n" in self.modes and (self.frames - 1) % self.every_n == 0:
+            reasons.append("every_n")
+        if "verdict_change" in self.modes and verdict_changed:
+            reasons.append("verdict_change")
+        if "low_confidence" in self.modes and confidence < self.low_confidence:
+            reasons.append("low_confidence")
+        if reasons:
+            self.logged += 1
+
+        reservoir_key = None
+        if "reservoir" in self.modes and not reasons:
+            key = random.random()
+            if not self._reservoir_full() or key > self._reservoir[0][0]:
+                reservoir_key = key
+
+        return reasons, reservoir_key
+
+    def _reservoir_full(self):
+        """Whether another thumbnail of average size would exceed the budget"""
+        if not self._reservoir:
+            return False
+        average = self._reservoir_size / len(self._reservoir)
+        return self._reservoir_size + average > self.reservoir_bytes
+
+    def add_to_reservoir(self, key, result, frame_data, metadata):
+        """
+        Keep a frame in the reservoir, evicting the lowest keys while over budget
+        Args:
+            key: reservoir_key returned by observe
+            result: Detection result dictionary
+            frame_data: Encoded thumbnail
+            metadata: Log metadata
+        """
+        metadata = dict(metadata, captured_at=datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S'))
+        size = len(frame_data) if frame_data else 0
+        self._tiebreak += 1
+        heapq.heappush(self._reservoir, (key, self._tiebreak, (result, frame_data, metadata)))
+        self._reservoir_size += size
+
+        while self._reservoir_size > self.reservoir_bytes and len(self._reservoir) > 1:
+            _, _, (_, evicted, _) = heapq.heappop(self._reservoir)
+            self._reservoir_size -= len(evicted) if evicted else 0
+
+    def summary(self):
+        """Aggregate statistics of the session so far"""
+        return {
+            "frames": self.frames,
+            "real_frames": self.real_frames,
+            "logged_frames": self.logged,
+            "mean_confidence": round(self.confidence_sum / self.frames, 4) if self.frames else 0.0,
+            "min_confidence": self.min_confidence,
+            "duration_s": round(time.time() - self.started_at, 1)
+        }
+
+    def finish(self):
+        """
+        Rows to log when the session ends: sampled reservoir frames and the summary
+        Returns: List of (result, frame_data, metadata) tuples for InferenceLogger.log_inference
+        """
+        rows = []
+        for _, _, (result, frame_data, metadata) in sorted(self._reservoir, key=lambda e: e[1]):
+            rows.append((result, frame_data, dict(metadata, log_reasons=["reservoir"])))
+        self._reservoir = []
+        self._reservoir_size = 0
+
+        if "summary" in self.modes and self.frames:
+            summary = self.summary()
+            last = self._last_result or {}
+            rows.append(({
+                "is_real": self.real_frames * 2 >= self.frames,
+                "confidence": summary["mean_confidence"],
+                "active_check_passed": last.get("active_check_passed", True),
+                "active_check_message": "Session summary"
+            }, None, {"summary": summary, "log_reasons": ["summary"]}))
+
+        return rows
@@ -0,0 +1,406 @@
+"""
+Per-frame inference pipeline
+Runs on InferenceExecutor workers, away from the asyncio event loop
+"""
+import multiprocessing.util
+import os
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from utils.face_detector import FaceDetector
+from utils.liveness_detector import LivenessDetector
+from utils.database import InferenceLogger
+
+
+# MediaPipe graphs are stateful and not thread-safe: one FaceDetector per worker
+_worker = threading.local()
+
+# Liveness model and logger are shared by all workers of one process
+_shared = {}
+_shared_pid = None
+
+# Captures of video uploads between segments: path -> (capture, next frame index, last use)
+_videos = {}
+_videos_lock = threading.Lock()
+VIDEO_IDLE_SECONDS = 60.0
+
+
+class SessionState:
+    """
+    Per-session state carried through process_frame
+    Passed to the worker with each frame and returned updated, so it also
+    works with process pools where workers only see a copy.
+    """
+    def __init__(self, active_state, tracker=None, result_cache=None, log_policy=None):
+        """
+        Args:
+            active_state: Active check state (see LivenessDetector.new_active_check_state)
+            tracker: Optional FaceTracker; None runs full detection on every frame
+            result_cache: Optional PassiveResultCache; None runs the CNN on every frame
+            log_policy: Optional LoggingPolicy; None logs every frame with a face
+        """
+        self.active_state = active_state
+        self.tracker = tracker
+        self.result_cache = result_cache
+        self.log_policy = log_policy
+
+
+def share_components(liveness_detector, inference_logger):
+    """
+    Register components already built in this process so thread workers
+    reuse them instead of loading another copy of the model
+    """
+    global _shared, _shared_pid
+    _shared = {
+        "liveness_detector": liveness_detector,
+        "inference_logger": inference_logger
+    }
+    _shared_pid = os.getpid()
+
+
+def init_worker(model_path="models/liveness_model.h5", db_path="backend/inference_logs.db",
+                model_runtime="auto", logger_options=None, model_jit_compile=False):
+    """
+    Executor initializer: build the components owned by one worker
+    Args:
+        model_path: Model to load when this process has no shared detector
+        db_path: SQLite database used when this process has no shared logger
+        model_runtime: Inference runtime for a detector built here
+        logger_options: InferenceLogger keyword arguments for a logger built here
+        model_jit_compile: XLA-compile the Keras model of a detector built here
+    """
+    _worker.face_detector = FaceDetector()
+
+    if _shared_pid != os.getpid():
+        # Fresh worker process: nothing to share yet. No micro-batching: the
+        # process runs one job at a time, so every face would wait out
+        # max_wait for a batch of one
+        liveness_detector = LivenessDetector(model_path, model_runtime, jit_compile=model_jit_compile)
+        inference_logger = InferenceLogger(db_path, **(logger_options or {}))
+        share_components(liveness_detector, inference_logger)
+
+        # Pool processes skip atexit handlers; drain queued logs on worker exit
+        multiprocessing.util.Finalize(
+            inference_logger, inference_logger.close, exitpriority=10
+        )
+
+
+def warm_up(max_batch_size=1):
+    """
+    Pay one-time initialization costs before the first frame does
+    Loads the model and runs a dummy forward pass, builds this worker's face
+    detection graph and applies log retention. The face mesh stays lazy: it
+    is only needed once active check is enabled.
+    Args:
+        max_batch_size: Largest batch to prepare the model for (besides micro-batches)
+    Returns: Dict of stage timings in seconds
+    """
+    timings = _shared["liveness_detector"].warm_up(max_batch_size)
+    
+    start = time.perf_counter()
+    _worker.face_detector.detect_face(np.zeros((128, 128, 3), dtype=np.uint8))
+    timings["face_detection"] = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    _shared["inference_logger"].apply_retention()
+    timings["log_retention"] = time.perf_counter() - start
+    
+    return timings
+
+
+def model_runtime():
+    """Runtime name of the model this worker loaded, or None without a model"""
+    model = _shared["liveness_detector"].model
+    return model.name if model is not None else None
+
+
+def finish_session(session):
+    """
+    Log the rows a session's policy held back until the end (reservoir samples, summary)
+    Runs on an executor worker, with that worker's logger.
+    Returns: Number of rows logged
+    """
+    if session.log_policy is None:
+        return 0
+    inference_logger = _shared["inference_logger"]
+    rows = session.log_policy.finish()
+    for result, frame_data, metadata in rows:
+        # Reservoir frames were counted when observed; summaries are not frames
+        inference_logger.log_inference(
+            result, frame_data=frame_data, metadata=metadata, count_frame=False
+        )
+    return len(rows)
+
+
+def decode_frame(image_data):
+    """
+    Decode encoded image bytes (JPEG/PNG/WebP) into a BGR frame
+    Returns: Frame array or None if decoding failed
+    """
+    # cv2.imdecode raises on an empty buffer instead of returning None
+    if not image_data:
+        return None
+    nparr = np.frombuffer(image_data, dtype=np.uint8)
+    return cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+
+
+def process_frame(image_data, active_check_enabled, session):
+    """
+    Run decode, face detection, liveness detection and logging for one frame
+    Args:
+        image_data: Encoded image bytes
+        active_check_enabled: Whether to run the active liveness check
+        session: SessionState of the connection the frame belongs to
+    Returns: (response message dict, updated session, stage timings in seconds)
+    """
+    timings = {}
+
+    start = time.perf_counter()
+    frame = decode_frame(image_data)
+    timings["decode"] = time.perf_counter() - start
+
+    if frame is None:
+        return {
+            "type": "error",
+            "message": "Failed to decode frame"
+        }, session, timings
+
+    response, session = analyze_frame(frame, active_check_enabled, session, timings)
+    return response, session, timings
+
+
+def analyze_frame(frame, active_check_enabled, session, timings):
+    """
+    Run face detection, liveness detection and logging for one decoded frame
+    Args:
+        frame: BGR frame
+        active_check_enabled: Whether to run the active liveness check
+        session: SessionState the frame belongs to
+        timings: Dict that receives stage timings in seconds
+    Returns: (response message dict, updated session)
+    """
+    face_detector = _worker.face_detector
+    liveness_detector = _shared["liveness_detector"]
+    inference_logger = _shared["inference_logger"]
+
+    # Detect face (tracked between keyframes when the session has a tracker)
+    start = time.perf_counter()
+    if session.tracker is not None:
+        bbox = session.tracker.update(frame, face_detector)
+    else:
+        bbox = face_detector.detect_face(frame)
+    timings["detection"] = time.perf_counter() - start
+
+    if bbox is None:
+        return {
+            "type": "result",
+            "face_detected": False,
+            "message": "No face detected"
+        }, session
+
+    # Extract face ROI
+    start = time.perf_counter()
+    face_roi = face_detector.extract_face_roi(frame, bbox)
+    timings["roi"] = time.perf_counter() - start
+
+    if face_roi is None:
+        return {
+            "type": "result",
+            "face_detected": False,
+            "message": "Failed to extract face"
+        }, session
+
+    # Perform liveness detection
+    result = liveness_detector.detect(
+        face_roi,
+        frame=frame if active_check_enabled else None,
+        face_detector=face_detector if active_check_enabled else None,
+        use_active_check=active_check_enabled,
+        active_state=session.active_state,
+        bbox=bbox,
+        result_cache=session.result_cache,
+        timings=timings
+    )
+
+    # Log inference (store small thumbnail) for the frames the policy keeps
+    if session.log_policy is not None:
+        reasons, reservoir_key = session.log_policy.observe(result)
+    else:
+        reasons, reservoir_key = ["all"], None
+
+    if not reasons:
+        # Rollups count every analyzed frame, whether or not it is logged
+        inference_logger.count_frame(result)
+
+    if reasons or reservoir_key is not None:
+        start = time.perf_counter()
+        _, buffer = cv2.imencode('.jpg', face_roi, [cv2.IMWRITE_JPEG_QUALITY, 50])
+        thumbnail_bytes = buffer.tobytes()
+        timings["thumbnail"] = time.perf_counter() - start
+        
+        metadata = {
+            "bbox": bbox,
+            "active_check_enabled": active_check_enabled,
+            "reused": result["reused"]
+        }
+        start = time.perf_counter()
+        if reasons:
+            inference_logger.log_inference(
+                result,
+                frame_data=thumbnail_bytes,
+                metadata=dict(metadata, log_reasons=reasons)
+            )
+        else:
+            session.log_policy.add_to_reservoir(reservoir_key, result, thumbnail_bytes, metadata)
+        timings["db_write"] = time.perf_counter() - start
+
+    return {
+        "type": "result",
+        "face_detected": True,
+        "is_real": bool(result["is_real"]),
+        "confidence": round(result["confidence"], 3),
+        "active_check_passed": result.get("active_check_passed", True),
+        "active_check_message": result.get("active_check_message", ""),
+        "bbox": bbox,
+        "reused": result["reused"]
+    }, session
+
+
+def detect_image(image_data):
+    """
+    Decode one uploaded image and extract its face (first stage of POST /predict)
+    Args:
+        image_data: Encoded image bytes
+    Returns: Dict with face_detected and, when a face was found, bbox and face_roi;
+        or with error if the image could not be decoded
+    """
+    face_detector = _worker.face_detector
+    
+    frame = decode_frame(image_data)
+    if frame is None:
+        return {"face_detected": False, "error": "Failed to decode image"}
+    
+    bbox = face_detector.detect_face(frame)
+    face_roi = face_detector.extract_face_roi(frame, bbox) if bbox is not None else None
+    if face_roi is None:
+        return {"face_detected": False, "message": "No face detected"}
+    
+    return {"face_detected": True, "bbox": bbox, "face_roi": face_roi}
+
+
+def predict_faces(face_rois, bboxes):
+    """
+    Score face ROIs in one batched forward pass and log them (second stage of POST /predict)
+    Args:
+        face_rois: Face ROIs from detect_image
+        bboxes: Matching face bounding boxes
+    Returns: List of (is_real, confidence)
+    """
+    liveness_detector = _shared["liveness_detector"]
+    inference_logger = _shared["inference_logger"]
+    
+    results = liveness_detector.passive_check_batch(face_rois)
+    
+    for face_roi, bbox, (is_real, confidence) in zip(face_rois, bboxes, results):
+        _, buffer = cv2.imencode('.jpg', face_roi, [cv2.IMWRITE_JPEG_QUALITY, 50])
+        inference_logger.log_inference(
+            {"is_real": is_real, "confidence": confidence, "active_check_passed": True},
+            frame_data=buffer.tobytes(),
+            metadata={"bbox": bbox, "source": "predict"}
+        )
+    
+    return results
+
+
+def _open_video(video_path, frame_index):
+    """
+    Capture positioned at frame_index, reusing the one the previous segment of
+    this upload left open in this process
+    Returns: cv2.VideoCapture, or None if the video cannot be opened
+    """
+    now = time.monotonic()
+    with _videos_lock:
+        entry = _videos.pop(video_path, None)
+        # Uploads whose client went away without close_video reaching this process
+        for path in [p for p, (_, _, used) in _videos.items() if now - used > VIDEO_IDLE_SECONDS]:
+            _videos.pop(path)[0].release()
+
+    if entry is not None:
+        capture, position, _ = entry
+        if position == frame_index:
+            return capture
+        capture.release()
+
+    capture = cv2.VideoCapture(video_path)
+    if not capture.isOpened():
+        return None
+    # Capture released as idle: skip ahead frame by frame, since
+    # CAP_PROP_POS_FRAMES seeks are not frame-accurate
+    for _ in range(frame_index):
+        if not capture.grab():
+            break
+    return capture
+
+
+def close_video(video_path):
+    """Release the capture an upload left open in this process, if any"""
+    with _videos_lock:
+        entry = _videos.pop(video_path, None)
+    if entry is not None:
+        entry[0].release()
+
+
+def process_video_segment(video_path, frame_index, sample_fps, max_samples,
+                          active_check_enabled, session):
+    """
+    Analyze the next sampled frames of a video file (one job of a video upload)
+    Videos are processed in short segments so each executor job stays small and
+    per-frame results can be streamed while the rest of the video is pending.
+    The capture stays open between segments, so the video is demuxed and
+    decoded once, sequentially; call close_video when the upload is done.
+    Captures are per process: with a process pool, run the whole video in one
+    job (max_samples None).
+    Args:
+        video_path: Video file on local disk
+        frame_index: Frame to continue from
+        sample_fps: Frames per second of video to analyze (None or 0: every frame)
+        max_samples: Maximum analyzed frames in this segment (None: to the end)
+        active_check_enabled: Whether to run the active liveness check
+        session: SessionState of the upload
+    Returns: (list of per-frame responses, updated session, next frame index or
+        None when the video has ended)
+    """
+    capture = _open_video(video_path, frame_index)
+    if capture is None:
+        return [{"type": "error", "message": "Failed to open video"}], session, None
+
+    video_fps = capture.get(cv2.CAP_PROP_FPS) or 0
+    stride = max(1, round(video_fps / sample_fps)) if sample_fps and video_fps > 0 else 1
+
+    responses = []
+    try:
+        while max_samples is None or len(responses) < max_samples:
+            # Frames between samples are only grabbed, not decoded
+            if not capture.grab():
+                capture.release()
+                return responses, session, None
+            if frame_index % stride == 0:
+                ok, frame = capture.retrieve()
+                if not ok:
+                    capture.release()
+                    return responses, session, None
+                response, session = analyze_frame(frame, active_check_enabled, session, {})
+                response["frame"] = frame_index
+                response["time_s"] = round(frame_index / video_fps, 3) if video_fps > 0 else None
+                responses.append(response)
+            frame_index += 1
+    except BaseException:
+        capture.release()
+        raise
+
+    with _videos_lock:
+        _videos[video_path] = (capture, frame_index, time.monotonic())
+    return responses, session, frame_index
@@ -0,0 +1,117 @@
+"""
+Binary WebSocket frame protocol
+Compact alternative to the base64-in-JSON messages, negotiated per connection
+
+Every binary message starts with a fixed 13-byte big-endian header:
+    type (uint8) | sequence number (uint32) | timestamp in ms (uint64)
+
+Client -> server: a FRAME message carries raw JPEG/PNG/WebP bytes after the
+header; PING and RESET_ACTIVE_CHECK carry no payload.
+Server -> client: responses echo the sequence number and timestamp of the
+message they answer, followed by a struct-packed body (see encode_response).
+"""
+import struct
+
+HEADER = struct.Struct("!BIQ")
+
+# Client -> server message types
+MSG_FRAME = 0x01
+MSG_PING = 0x02
+MSG_RESET_ACTIVE_CHECK = 0x03
+
+# Server -> client message types
+MSG_RESULT = 0x81
+MSG_PONG = 0x82
+MSG_ACTIVE_CHECK_RESET = 0x83
+MSG_ERROR = 0x84
+
+# Result body: flags, confidence, bbox (x, y, width, height), message length
+RESULT_BODY = struct.Struct("!BfHHHHH")
+FLAG_FACE_DETECTED = 0x01
+FLAG_IS_REAL = 0x02
+FLAG_ACTIVE_CHECK_PASSED = 0x04
+FLAG_REUSED = 0x08
+
+# Error body: message length
+ERROR_BODY = struct.Struct("!H")
+
+_CLIENT_TYPES = {
+    MSG_FRAME: "frame",
+    MSG_PING: "ping",
+    MSG_RESET_ACTIVE_CHECK: "reset_active_check"
+}
+
+_SERVER_TYPES = {
+    "result": MSG_RESULT,
+    "pong": MSG_PONG,
+    "active_check_reset": MSG_ACTIVE_CHECK_RESET,
+    "error": MSG_ERROR
+}
+
+
+class ProtocolError(ValueError):
+    """Raised for malformed binary messages"""
+
+
+def decode_message(data):
+    """
+    Parse a binary client message without copying its payload
+    Args:
+        data: Raw bytes of one binary WebSocket message
+    Returns: (message type name, sequence number, timestamp ms, payload memoryview)
+    """
+    if len(data) < HEADER.size:
+        raise ProtocolError("Message shorter than header")
+
+    msg_type, seq, timestamp = HEADER.unpack_from(data)
+    if msg_type not in _CLIENT_TYPES:
+        raise ProtocolError(f"Unknown message type: {msg_type:#04x}")
+    if msg_type == MSG_FRAME and len(data) == HEADER.size:
+        raise ProtocolError("Frame without payload")
+
+    return _CLIENT_TYPES[msg_type], seq, timestamp, memoryview(data)[HEADER.size:]
+
+
+def _encode_text(text):
+    """UTF-8 encode text, truncated to fit a uint16 length prefix"""
+    return text.encode("utf-8")[:0xFFFF]
+
+
+def encode_response(response, seq=0, timestamp=0):
+    """
+    Pack a response dict (as sent on the JSON protocol) into a binary message
+    Args:
+        response: Response dict with a "type" key
+        seq: Sequence number of the message being answered
+        timestamp: Timestamp of the message being answered
+    Returns: bytes
+    """
+    msg_type = _SERVER_TYPES[response["type"]]
+    header = HEADER.pack(msg_type, seq, timestamp)
+
+    if msg_type == MSG_RESULT:
+        flags = 0
+        if response.get("face_detected"):
+            flags |= FLAG_FACE_DETECTED
+        if response.get("is_real"):
+            flags |= FLAG_IS_REAL
+        if response.get("active_check_passed"):
+            flags |= FLAG_ACTIVE_CHECK_PASSED
+        if response.get("reused"):
+            flags |= FLAG_REUSED
+
+        x, y, width, height = response.get("bbox") or (0, 0, 0, 0)
+        message = _encode_text(
+            response.get("active_check_message") or response.get("message") or ""
+        )
+        body = RESULT_BODY.pack(
+            flags, response.get("confidence", 0.0),
+            x, y, width, height, len(message)
+        )
+        return header + body + message
+
+    if msg_type == MSG_ERROR:
+        message = _encode_text(response.get("message", ""))
+        return header + ERROR_BODY.pack(len(message)) + message
+
+    return header
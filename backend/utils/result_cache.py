@@ -0,0 +1,74 @@
+"""
+Temporal reuse of passive liveness results
+Skips the CNN when a session's face ROI has not changed since the last scored frame
+"""
+import time
+
+import cv2
+import numpy as np
+
+
+class PassiveResultCache:
+    def __init__(self, max_diff=3.0, max_age_ms=1000, signature_size=16):
+        """
+        Initialize per-session result cache
+        Args:
+            max_diff: Reuse the previous score while the mean absolute difference
+                of the downsampled ROI (0-255 scale) stays below this
+            max_age_ms: Never reuse a score older than this
+            signature_size: Side length of the downsampled grayscale signature
+        """
+        self.max_diff = max_diff
+        self.max_age = max_age_ms / 1000.0
+        self.signature_size = signature_size
+
+        self._signature = None
+        self._result = None
+        self._scored_at = 0.0
+
+        # Counters for hit rate
+        self.lookups = 0
+        self.hits = 0
+
+    def signature(self, face_roi):
+        """Downsampled grayscale signature of a face ROI"""
+        gray = cv2.cvtColor(face_roi, cv2.COLOR_BGR2GRAY)
+        small = cv2.resize(
+            gray, (self.signature_size, self.signature_size),
+            interpolation=cv2.INTER_AREA
+        )
+        return small.astype(np.int16)
+
+    def lookup(self, signature):
+        """
+        Find a reusable passive result
+        Args:
+            signature: Signature of the current ROI
+        Returns: (is_real, confidence) or None if the CNN must run
+        """
+        self.lookups += 1
+        if self._result is None:
+            return None
+        if time.monotonic() - self._scored_at > self.max_age:
+            return None
+        if np.abs(signature - self._signature).mean() >= self.max_diff:
+            return None
+
+        self.hits += 1
+        return self._result
+
+    def store(self, signature, is_real, confidence):
+        """Remember the passive result computed for this signature"""
+        self._signature = signature
+        self._result = (is_real, confidence)
+        self._scored_at = time.monotonic()
+
+    def reset(self):
+        """Forget the cached result"""
+        self._signature = None
+        self._result = None
+
+    @property
+    def hit_rate(self):
+        """Fraction of lookups served from the cache"""
+        return self.hits / self.lookups if self.lookups else 0.0
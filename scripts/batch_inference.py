@@ -0,0 +1,397 @@
+"""
+Offline batch inference over stored images and videos
+Scores archives as a throughput job: decoding on reader threads, face ROIs
+batched into the CNN, work spread over processes, results streamed to
+CSV/NDJSON/Parquet with a resumable checkpoint
+"""
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from pathlib import Path
+
+import cv2
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'backend'))
+
+from extract_faces import VIDEO_EXTENSIONS, frame_stride_for
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".webp")
+COLUMNS = ["source", "frame", "face_detected", "is_real", "confidence", "bbox"]
+
+# Components owned by one worker process, created by _init_worker
+_worker = {}
+
+
+def _init_worker(model_path, runtime, reader_threads):
+    """Process pool initializer: load the model and MediaPipe inside each worker"""
+    from utils.face_detector import FaceDetector
+    from utils.liveness_detector import LivenessDetector
+
+    _worker["face_detector"] = FaceDetector()
+    _worker["liveness_detector"] = LivenessDetector(model_path, runtime)
+    # cv2 releases the GIL while decoding, so reader threads overlap with detection
+    _worker["readers"] = ThreadPoolExecutor(max_workers=reader_threads)
+
+
+def find_media(inputs):
+    """
+    Expand files and directories into (path, kind) items, kind "image" or "video"
+    """
+    items = []
+    for entry in inputs:
+        entry = Path(entry)
+        paths = sorted(p for p in entry.rglob("*") if p.is_file()) if entry.is_dir() else [entry]
+        for path in paths:
+            suffix = path.suffix.lower()
+            if suffix in IMAGE_EXTENSIONS:
+                items.append((str(path), "image"))
+            elif suffix in VIDEO_EXTENSIONS:
+                items.append((str(path), "video"))
+    return items
+
+
+def _video_frames(path, frame_stride, sample_fps, max_frames):
+    """Yield (frame index, frame) for the sampled frames of a video"""
+    capture = cv2.VideoCapture(path)
+    if not capture.isOpened():
+        return
+    stride = frame_stride_for(capture, frame_stride, sample_fps)
+    frame_index = -1
+    sampled = 0
+    try:
+        while max_frames is None or sampled < max_frames:
+            if not capture.grab():
+                break
+            frame_index += 1
+            if frame_index % stride:
+                continue
+            ok, frame = capture.retrieve()
+            if not ok:
+                break
+            sampled += 1
+            yield frame_index, frame
+    finally:
+        capture.release()
+
+
+def score_chunk(items, batch_size=32, frame_stride=5, sample_fps=None, max_frames=None):
+    """
+    Score a chunk of media files (runs in a worker process)
+    Args:
+        items: List of (path, kind)
+        batch_size: Face ROIs per model call
+        frame_stride: Score every frame_stride-th video frame
+        sample_fps: Score this many frames per second of video instead
+        max_frames: Maximum scored frames per video
+    Returns: (result rows, number of frames decoded)
+    """
+    face_detector = _worker["face_detector"]
+    liveness_detector = _worker["liveness_detector"]
+
+    rows = []
+    pending = []
+    frames = 0
+
+    def flush():
+        results = liveness_detector.passive_check_batch([roi for _, roi in pending])
+        for (row, _), (is_real, confidence) in zip(pending, results):
+            row["is_real"] = is_real
+            row["confidence"] = round(confidence, 4)
+        pending.clear()
+
+    def add(source, frame_index, frame):
+        row = {"source": source, "frame": frame_index, "face_detected": False,
+               "is_real": None, "confidence": None, "bbox": None}
+        rows.append(row)
+        if frame is None:
+            return
+        bbox = face_detector.detect_face(frame)
+        face_roi = face_detector.extract_face_roi(frame, bbox) if bbox else None
+        if face_roi is None:
+            return
+        row["face_detected"] = True
+        row["bbox"] = list(bbox)
+        pending.append((row, face_roi))
+        if len(pending) >= batch_size:
+            flush()
+
+    images = [path for path, kind in items if kind == "image"]
+    for path, frame in zip(images, _worker["readers"].map(cv2.imread, images)):
+        frames += frame is not None
+        add(path, None, frame)
+
+    for path, kind in items:
+        if kind == "video":
+            for frame_index, frame in _video_frames(path, frame_stride, sample_fps, max_frames):
+                frames += 1
+                add(path, frame_index, frame)
+
+    if pending:
+        flush()
+    return rows, frames
+
+
+class ResultWriter:
+    """
+    Stream result rows to CSV, NDJSON or Parquet
+    write and close return the work items whose rows are safely on disk; only
+    those may be recorded in the checkpoint.
+    """
+
+    def __init__(self, path, output_format, append=False, part_rows=100000):
+        """
+        Args:
+            path: Output file
+            output_format: "csv", "ndjson" or "parquet"
+            append: Continue an interrupted run instead of starting over
+            part_rows: Rows per Parquet part file (a part is only readable once closed)
+        """
+        self.path = Path(path)
+        self.format = output_format
+        self._parquet = None
+
+        if output_format == "parquet":
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            self._pa = pa
+            self._pq = pq
+            self._part_rows = part_rows
+            self._part_path = None
+            self._part_size = 0
+            self._pending = []
+            self._schema = pa.schema([
+                ("source", pa.string()), ("frame", pa.int64()), ("face_detected", pa.bool_()),
+                ("is_real", pa.bool_()), ("confidence", pa.float64()), ("bbox", pa.string())
+            ])
+
+            # Parquet files cannot be appended to: every part is a separate file,
+            # written under a .tmp name and renamed once its footer is written.
+            # Unfinished parts of a crashed run are unreadable and their work
+            # items were never checkpointed.
+            stale = list(self.path.parent.glob(self.path.name + "*.tmp"))
+            stale += self.path.parent.glob(self.path.stem + ".part*.parquet.tmp")
+            if not append:
+                stale += [self.path] + list(self.path.parent.glob(self.path.stem + ".part*.parquet"))
+            for old in stale:
+                if old.exists():
+                    old.unlink()
+            return
+
+        exists = append and self.path.exists() and self.path.stat().st_size > 0
+        self._file = open(self.path, "a" if append else "w", newline="")
+        if output_format == "csv":
+            self._csv = csv.DictWriter(self._file, fieldnames=COLUMNS)
+            if not exists:
+                self._csv.writeheader()
+
+    def _next_part_path(self):
+        """Final name of the next Parquet part: the output path, then <stem>.partN.parquet"""
+        if not self.path.exists():
+            return self.path
+        part = 1
+        while self.path.with_suffix(f".part{part}.parquet").exists():
+            part += 1
+        return self.path.with_suffix(f".part{part}.parquet")
+
+    def _close_part(self):
+        """Finish the open Parquet part; returns the items it holds"""
+        if self._parquet is None:
+            done, self._pending = self._pending, []
+            return done
+        self._parquet.close()
+        self._parquet = None
+        os.replace(f"{self._part_path}.tmp", self._part_path)
+        self._part_size = 0
+        done, self._pending = self._pending, []
+        return done
+
+    def write(self, rows, items):
+        """
+        Write the rows of finished work items
+        Returns: Items whose rows are durable (possibly from earlier calls)
+        """
+        if self.format == "parquet":
+            if rows:
+                if self._parquet is None:
+                    self._part_path = self._next_part_path()
+                    self._parquet = self._pq.ParquetWriter(f"{self._part_path}.tmp", self._schema)
+                table = self._pa.Table.from_pylist(
+                    [dict(row, bbox=json.dumps(row["bbox"]) if row["bbox"] else None) for row in rows],
+                    schema=self._schema
+                )
+                self._parquet.write_table(table)
+                self._part_size += len(rows)
+            self._pending.extend(items)
+            if self._part_size >= self._part_rows:
+                return self._close_part()
+            return []
+
+        if self.format == "csv":
+            self._csv.writerows(
+                dict(row, bbox=json.dumps(row["bbox"]) if row["bbox"] else "") for row in rows
+            )
+        else:
+            self._file.writelines(json.dumps(row) + "\n" for row in rows)
+        # On disk before the checkpoint says so, or a resume would repeat the rows
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        return items
+
+    def close(self):
+        """
+        Finish the output
+        Returns: Items that became durable on close
+        """
+        if self.format == "parquet":
+            return self._close_part()
+        self._file.close()
+        return []
+
+
+def make_chunks(items, chunk_size):
+    """Group images into chunks of chunk_size; every video is its own chunk"""
+    chunks = []
+    images = [item for item in items if item[1] == "image"]
+    for start in range(0, len(images), chunk_size):
+        chunks.append(images[start:start + chunk_size])
+    chunks.extend([item] for item in items if item[1] == "video")
+    return chunks
+
+
+def run(inputs, output, output_format=None, model_path="models/liveness_model.h5", runtime="auto",
+        workers=None, reader_threads=4, batch_size=32, chunk_size=256, frame_stride=5,
+        sample_fps=None, max_frames=None, restart=False, part_rows=100000):
+    """
+    Score all media under inputs and stream the results to output
+    Completed files are appended to <output>.checkpoint; an interrupted run
+    continues from there unless restart is set.
+    Returns: Number of result rows written in this run
+    """
+    output_format = output_format or Path(output).suffix.lstrip(".").replace("jsonl", "ndjson")
+    if output_format not in ("csv", "ndjson", "parquet"):
+        raise ValueError(f"Unknown output format: {output_format}")
+
+    checkpoint_path = Path(f"{output}.checkpoint")
+    done = set()
+    if checkpoint_path.exists() and not restart:
+        done = set(checkpoint_path.read_text().splitlines())
+        print(f"Resuming: {len(done)} files already scored", file=sys.stderr)
+    resuming = bool(done)
+
+    items = [item for item in find_media(inputs) if item[0] not in done]
+    chunks = make_chunks(items, chunk_size)
+    print(f"Scoring {len(items)} files in {len(chunks)} chunks", file=sys.stderr)
+
+    writer = ResultWriter(output, output_format, append=resuming, part_rows=part_rows)
+    checkpoint = open(checkpoint_path, "a" if resuming else "w")
+
+    def record_done(items):
+        checkpoint.writelines(path + "\n" for path, _ in items)
+        checkpoint.flush()
+
+    workers = workers or os.cpu_count() or 1
+    started = time.perf_counter()
+    last_report = started
+    files_done = rows_written = frames_done = faces_done = 0
+
+    # spawn: TensorFlow and MediaPipe are not fork-safe once initialized
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(model_path, runtime, reader_threads)
+    ) as pool:
+        queued = iter(chunks)
+        running = {}
+        try:
+            while True:
+                # Keep at most two chunks per worker in flight, so memory stays flat
+                while len(running) < 2 * workers:
+                    chunk = next(queued, None)
+                    if chunk is None:
+                        break
+                    future = pool.submit(score_chunk, chunk, batch_size, frame_stride,
+                                         sample_fps, max_frames)
+                    running[future] = chunk
+                if not running:
+                    break
+
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    chunk = running.pop(future)
+                    rows, frames = future.result()
+                    # Checkpoint only the files whose rows are durable
+                    record_done(writer.write(rows, chunk))
+
+                    files_done += len(chunk)
+                    rows_written += len(rows)
+                    frames_done += frames
+                    faces_done += sum(1 for row in rows if row["face_detected"])
+
+                now = time.perf_counter()
+                if now - last_report >= 2.0:
+                    last_report = now
+                    elapsed = now - started
+                    print(f"  {files_done}/{len(items)} files, {frames_done / elapsed:.1f} frames/s, "
+                          f"{faces_done / elapsed:.1f} faces/s", file=sys.stderr)
+        finally:
+            record_done(writer.close())
+            checkpoint.close()
+
+    elapsed = time.perf_counter() - started
+    print(f"Scored {files_done} files ({frames_done} frames, {faces_done} faces) in {elapsed:.1f}s: "
+          f"{frames_done / max(elapsed, 1e-9):.1f} frames/s", file=sys.stderr)
+    return rows_written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score stored images and videos offline")
+    parser.add_argument("inputs", nargs="+",
+                        help="Image/video files or directories")
+    parser.add_argument("--output", required=True,
+                        help="Result file (.csv, .ndjson or .parquet)")
+    parser.add_argument("--format", choices=["csv", "ndjson", "parquet"], default=None,
+                        help="Output format (default: from the output extension)")
+    parser.add_argument("--model", default="models/liveness_model.h5",
+                        help="Model path")
+    parser.add_argument("--runtime", default="auto",
+                        help="Inference runtime (auto, keras, tflite, tflite-int8, onnx)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Worker processes (default: CPU count)")
+    parser.add_argument("--reader-threads", type=int, default=4,
+                        help="Image decoding threads per worker")
+    parser.add_argument("--batch-size", type=int, default=32,
+                        help="Face ROIs per model call")
+    parser.add_argument("--chunk-size", type=int, default=256,
+                        help="Images per work unit (and checkpoint step)")
+    parser.add_argument("--frame-stride", type=int, default=5,
+                        help="Score every N-th video frame")
+    parser.add_argument("--sample-fps", type=float, default=None,
+                        help="Score this many frames per second of video instead of --frame-stride")
+    parser.add_argument("--max-frames", type=int, default=None,
+                        help="Maximum scored frames per video")
+    parser.add_argument("--part-rows", type=int, default=100000,
+                        help="Rows per Parquet part file; the checkpoint advances per closed part")
+    parser.add_argument("--restart", action="store_true",
+                        help="Ignore an existing checkpoint and start over")
+    args = parser.parse_args()
+
+    run(
+        args.inputs, args.output, args.format,
+        model_path=args.model, runtime=args.runtime, workers=args.workers,
+        reader_threads=args.reader_threads, batch_size=args.batch_size,
+        chunk_size=args.chunk_size, frame_stride=args.frame_stride,
+        sample_fps=args.sample_fps, max_frames=args.max_frames, restart=args.restart,
+        part_rows=args.part_rows
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,285 @@
+"""
+Stage-level latency benchmark for the detection pipeline
+Times every stage of a WebSocket frame separately and reports p50/p95/p99
+and throughput as JSON, so runs can be compared and regressions caught
+"""
+import argparse
+import base64
+import contextlib
+import json
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'backend'))
+
+from model.preprocess_dataset import create_synthetic_dataset
+from utils.face_detector import FaceDetector
+from utils.liveness_detector import LivenessDetector
+from utils.database import InferenceLogger
+
+
+DEFAULT_RESOLUTIONS = ["320x240", "640x480", "1280x720"]
+DEFAULT_BATCH_SIZES = [1, 4, 16]
+
+
+def time_stage(fn, inputs, iterations, warmup=3, items_per_call=1):
+    """
+    Time fn over inputs (cycled) and summarize latencies
+    Args:
+        fn: Callable taking one input
+        inputs: Inputs to cycle through
+        iterations: Number of timed calls
+        warmup: Untimed calls before measuring
+        items_per_call: Items processed per call (batch size), for throughput
+    Returns: Summary dict (milliseconds per call, items per second)
+    """
+    for i in range(warmup):
+        fn(inputs[i % len(inputs)])
+
+    latencies = np.empty(iterations)
+    for i in range(iterations):
+        item = inputs[i % len(inputs)]
+        start = time.perf_counter()
+        fn(item)
+        latencies[i] = time.perf_counter() - start
+
+    latencies_ms = latencies * 1000.0
+    return {
+        "iterations": iterations,
+        "mean_ms": round(float(latencies_ms.mean()), 4),
+        "p50_ms": round(float(np.percentile(latencies_ms, 50)), 4),
+        "p95_ms": round(float(np.percentile(latencies_ms, 95)), 4),
+        "p99_ms": round(float(np.percentile(latencies_ms, 99)), 4),
+        "throughput_per_s": round(items_per_call * iterations / float(latencies.sum()), 2)
+    }
+
+
+def load_face_images(frames_dir=None, num_images=20):
+    """
+    Face-sized images to paste into frames
+    Uses recorded images from frames_dir, or builds a synthetic set with
+    model.preprocess_dataset.create_synthetic_dataset in a temporary directory
+    """
+    synthetic_dir = None
+    if frames_dir is None:
+        frames_dir = synthetic_dir = Path(tempfile.mkdtemp(prefix="liveness_bench_"))
+        create_synthetic_dataset(str(frames_dir), num_samples=num_images // 2)
+
+    try:
+        images = []
+        for img_path in sorted(Path(frames_dir).rglob("*.jpg"))[:num_images]:
+            img = cv2.imread(str(img_path))
+            if img is not None:
+                images.append(img)
+        return images
+    finally:
+        if synthetic_dir is not None:
+            shutil.rmtree(synthetic_dir, ignore_errors=True)
+
+
+def make_frames(face_images, resolution):
+    """
+    Build encoded frames at a resolution, each with a face image in the center
+    Returns: (list of base64 JPEG strings, face bbox)
+    """
+    width, height = (int(v) for v in resolution.split("x"))
+    face_size = min(width, height) // 2
+    x, y = (width - face_size) // 2, (height - face_size) // 2
+
+    frames = []
+    for face in face_images:
+        frame = np.full((height, width, 3), 127, dtype=np.uint8)
+        frame[y:y + face_size, x:x + face_size] = cv2.resize(face, (face_size, face_size))
+        _, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 80])
+        frames.append(base64.b64encode(buffer.tobytes()).decode("ascii"))
+    return frames, (x, y, face_size, face_size)
+
+
+def decode(encoded):
+    """Base64 decode and cv2.imdecode, as in the WebSocket handler"""
+    image_data = base64.b64decode(encoded)
+    return cv2.imdecode(np.frombuffer(image_data, dtype=np.uint8), cv2.IMREAD_COLOR)
+
+
+def run_benchmarks(face_images, resolutions, batch_sizes, iterations,
+                   model_path="models/liveness_model.h5", runtime="auto", jit_compile=False):
+    """
+    Benchmark every pipeline stage
+    Returns: List of result dicts, one per (stage, resolution, batch size)
+    """
+    face_detector = FaceDetector()
+    liveness_detector = LivenessDetector(model_path, runtime, jit_compile=jit_compile)
+    db_dir = tempfile.mkdtemp(prefix="liveness_bench_db_")
+    # Synchronous writes: the log_inference stage times the SQLite insert, not a queue put
+    inference_logger = InferenceLogger(str(Path(db_dir) / "bench.db"), async_writes=False)
+
+    results = []
+
+    def record(stage, resolution, summary, batch_size=1):
+        summary.update({"stage": stage, "resolution": resolution, "batch_size": batch_size})
+        results.append(summary)
+        print(f"  {stage:<20} {resolution:>10} batch={batch_size:<3} "
+              f"p50={summary['p50_ms']:.3f}ms p95={summary['p95_ms']:.3f}ms "
+              f"p99={summary['p99_ms']:.3f}ms", file=sys.stderr)
+
+    for resolution in resolutions:
+        encoded_frames, fallback_bbox = make_frames(face_images, resolution)
+        frames = [decode(encoded) for encoded in encoded_frames]
+
+        # Synthetic faces are not always detected; fall back to the pasted bbox
+        bboxes = [face_detector.detect_face(frame) or fallback_bbox for frame in frames]
+        rois = [face_detector.extract_face_roi(frame, bbox) for frame, bbox in zip(frames, bboxes)]
+        pairs = list(zip(frames, bboxes))
+
+        record("decode", resolution, time_stage(decode, encoded_frames, iterations))
+        record("detect_face", resolution,
+               time_stage(face_detector.detect_face, frames, iterations))
+        record("extract_face_roi", resolution,
+               time_stage(lambda pair: face_detector.extract_face_roi(*pair), pairs, iterations))
+        record("preprocess_frame", resolution,
+               time_stage(liveness_detector.preprocess_frame, rois, iterations))
+        record("passive_check", resolution,
+               time_stage(liveness_detector.passive_check, rois, iterations))
+
+        if liveness_detector.model is not None:
+            preprocessed = np.concatenate([liveness_detector.preprocess_frame(roi) for roi in rois])
+            for batch_size in batch_sizes:
+                batches = [
+                    np.resize(np.roll(preprocessed, -i, axis=0), (batch_size,) + preprocessed.shape[1:])
+                    for i in range(len(preprocessed))
+                ]
+                compiled = time_stage(liveness_detector.predict_scores, batches, iterations,
+                                      items_per_call=batch_size)
+                record("model_batch", resolution, compiled, batch_size=batch_size)
+
+                if liveness_detector.model.name == "keras":
+                    # The same batches through keras model.predict, which pays for a
+                    # data adapter and step loop on every call
+                    keras_model = liveness_detector.model.model
+                    legacy = time_stage(lambda batch: keras_model.predict(batch, verbose=0),
+                                        batches, iterations, items_per_call=batch_size)
+                    record("keras_predict", resolution, legacy, batch_size=batch_size)
+                    print(f"  {'':<20} {'':>10} batch={batch_size:<3} per-call overhead removed: "
+                          f"{legacy['p50_ms'] - compiled['p50_ms']:.3f}ms at p50", file=sys.stderr)
+
+        state = liveness_detector.new_active_check_state()
+        record("active_check", resolution,
+               time_stage(lambda pair: liveness_detector.active_check(
+                   pair[0], face_detector, state, pair[1]), pairs, iterations))
+
+        record("thumbnail_encode", resolution,
+               time_stage(lambda roi: cv2.imencode('.jpg', roi, [cv2.IMWRITE_JPEG_QUALITY, 50]),
+                          rois, iterations))
+
+        thumbnails = [cv2.imencode('.jpg', roi, [cv2.IMWRITE_JPEG_QUALITY, 50])[1].tobytes()
+                      for roi in rois]
+        result = {"is_real": True, "confidence": 0.9, "active_check_passed": True,
+                  "active_check_message": ""}
+        record("log_inference", resolution,
+               time_stage(lambda thumbnail: inference_logger.log_inference(
+                   result, frame_data=thumbnail, metadata={"bbox": fallback_bbox}),
+                   thumbnails, iterations))
+
+    face_detector.release()
+    inference_logger.close()
+    shutil.rmtree(db_dir, ignore_errors=True)
+    return results
+
+
+def compare_reports(results, baseline, tolerance):
+    """
+    Find stages whose p95 latency got worse than the baseline by more than tolerance
+    Returns: List of regression descriptions
+    """
+    key = lambda r: (r["stage"], r["resolution"], r["batch_size"])
+    baseline_by_key = {key(r): r for r in baseline["results"]}
+
+    regressions = []
+    for result in results:
+        base = baseline_by_key.get(key(result))
+        if base is None or base["p95_ms"] <= 0:
+            continue
+        change = result["p95_ms"] / base["p95_ms"] - 1.0
+        if change > tolerance:
+            regressions.append(
+                f"{result['stage']} @ {result['resolution']} batch={result['batch_size']}: "
+                f"p95 {base['p95_ms']:.3f}ms -> {result['p95_ms']:.3f}ms (+{change * 100:.0f}%)"
+            )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark detection pipeline stages")
+    parser.add_argument("--resolutions", nargs="+", default=DEFAULT_RESOLUTIONS,
+                        help="Frame resolutions as WIDTHxHEIGHT")
+    parser.add_argument("--batch-sizes", nargs="+", type=int, default=DEFAULT_BATCH_SIZES,
+                        help="Batch sizes for the model stage")
+    parser.add_argument("--iterations", type=int, default=200,
+                        help="Timed iterations per stage")
+    parser.add_argument("--frames-dir", type=str, default=None,
+                        help="Directory of recorded face images (default: synthetic)")
+    parser.add_argument("--model", type=str, default="models/liveness_model.h5",
+                        help="Model path")
+    parser.add_argument("--runtime", type=str, default="auto",
+                        help="Inference runtime (auto, keras, tflite, tflite-int8, onnx)")
+    parser.add_argument("--xla", action="store_true",
+                        help="XLA-compile the Keras inference function")
+    parser.add_argument("--output", type=str, default=None,
+                        help="Write the JSON report here (default: stdout)")
+    parser.add_argument("--baseline", type=str, default=None,
+                        help="Earlier JSON report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="Allowed p95 slowdown versus baseline (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    # Progress, including what the dataset and model code print, goes to stderr
+    # so the JSON report on stdout stays parseable
+    with contextlib.redirect_stdout(sys.stderr):
+        face_images = load_face_images(args.frames_dir)
+        if not face_images:
+            print("No images found to build frames from")
+            sys.exit(1)
+
+        print("Benchmarking pipeline stages...")
+        results = run_benchmarks(
+            face_images, args.resolutions, args.batch_sizes, args.iterations,
+            model_path=args.model, runtime=args.runtime, jit_compile=args.xla
+        )
+
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "config": vars(args),
+        "results": results
+    }
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.output}", file=sys.stderr)
+    else:
+        print(json.dumps(report, indent=2))
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare_reports(results, baseline, args.tolerance)
+        if regressions:
+            print("\nRegressions:", file=sys.stderr)
+            for regression in regressions:
+                print(f"  {regression}", file=sys.stderr)
+            sys.exit(1)
+        print("\nNo regressions against baseline", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,13 +2,22 @@
 Dataset Download Helper Script
 Downloads and prepares datasets for face liveness detection training
 """
-import os
+import sys
 import requests
 import zipfile
 import tarfile
 from pathlib import Path
 import argparse
 
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'backend'))
+
+from model.preprocess_dataset import organize_files
+from extract_faces import extract_faces, find_videos
+
+# CASIA-FASD genuine videos per subject; all other clips are attacks
+CASIA_REAL_VIDEOS = {"1", "2", "HR_1"}
+
 
 def download_file(url, destination):
     """Download a file with progress bar"""
@@ -44,16 +53,12 @@ def extract_archive(archive_path, extract_to):
     print(f"Extracted to {extract_to}")
 
 
-def organize_casia_fasd(source_dir, target_dir):
+def organize_casia_fasd(source_dir, target_dir, frame_stride=5, workers=None):
     """Organize CASIA-FASD dataset structure"""
     print("Organizing CASIA-FASD dataset...")
     source = Path(source_dir)
-    target = Path(target_dir)
-    
-    target_real = target / "real"
-    target_spoof = target / "spoof"
-    target_real.mkdir(parents=True, exist_ok=True)
-    target_spoof.mkdir(parents=True, exist_ok=True)
+    files = []
+    videos = []
     
     # CASIA-FASD structure: train_release/ or test_release/
     for subdir in ['train_release', 'test_release']:
@@ -67,33 +72,29 @@ def organize_casia_fasd(source_dir, target_dir):
                 
             folder_name = folder.name.lower()
             
-            # Copy based on folder name
+            # Label based on folder name
             if '1' in folder_name or 'real' in folder_name or 'live' in folder_name:
                 # Real faces
-                for img in folder.glob("*.jpg"):
-                    target_real.mkdir(parents=True, exist_ok=True)
-                    import shutil
-                    shutil.copy(img, target_real / img.name)
+                files.extend((img, "real") for img in folder.glob("*.jpg"))
             elif '2' in folder_name or '3' in folder_name or 'attack' in folder_name:
                 # Spoof faces
-                for img in folder.glob("*.jpg"):
-                    target_spoof.mkdir(parents=True, exist_ok=True)
-                    import shutil
-                    shutil.copy(img, target_spoof / img.name)
+                files.extend((img, "spoof") for img in folder.glob("*.jpg"))
+            
+            # Raw release: one folder per subject, clips labeled by file name
+            for video in find_videos(folder):
+                videos.append((video, "real" if video.stem in CASIA_REAL_VIDEOS else "spoof"))
+    
+    if videos:
+        extract_faces(videos, target_dir, workers, frame_stride=frame_stride)
+    return organize_files(files, target_dir)
 
 
-def organize_replay_attack(source_dir, target_dir):
+def organize_replay_attack(source_dir, target_dir, frame_stride=5, workers=None):
     """Organize Replay-Attack dataset structure"""
     print("Organizing Replay-Attack dataset...")
     source = Path(source_dir)
-    target = Path(target_dir)
-    
-    target_real = target / "real"
-    target_spoof = target / "spoof"
-    target_real.mkdir(parents=True, exist_ok=True)
-    target_spoof.mkdir(parents=True, exist_ok=True)
-    
-    import shutil
+    files = []
+    videos = []
     
     # Replay-Attack structure: train/ or test/
     for split in ['train', 'test']:
@@ -108,11 +109,15 @@ def organize_replay_attack(source_dir, target_dir):
             folder_name = folder.name.lower()
             
             if 'real' in folder_name or 'live' in folder_name:
-                for img in folder.glob("*.jpg"):
-                    shutil.copy(img, target_real / f"{split}_{img.name}")
+                files.extend((img, "real") for img in folder.glob("*.jpg"))
+                videos.extend((video, "real") for video in find_videos(folder))
             elif 'attack' in folder_name or 'spoof' in folder_name:
-                for img in folder.glob("*.jpg"):
-                    shutil.copy(img, target_spoof / f"{split}_{img.name}")
+                files.extend((img, "spoof") for img in folder.glob("*.jpg"))
+                videos.extend((video, "spoof") for video in find_videos(folder))
+    
+    if videos:
+        extract_faces(videos, target_dir, workers, frame_stride=frame_stride)
+    return organize_files(files, target_dir)
 
 
 def main():
@@ -123,6 +128,10 @@ def main():
                        help='Directory containing downloaded dataset')
     parser.add_argument('--target-dir', type=str, default='datasets',
                        help='Target directory for organized dataset')
+    parser.add_argument('--frame-stride', type=int, default=5,
+                       help='Extract faces from every N-th video frame')
+    parser.add_argument('--workers', type=int, default=None,
+                       help='Video decoding processes (default: CPU count)')
     
     args = parser.parse_args()
     
@@ -137,7 +146,7 @@ def main():
         print("   python scripts/download_dataset.py --dataset casia --source-dir <extracted_path>")
         
         if args.source_dir:
-            organize_casia_fasd(args.source_dir, args.target_dir)
+            organize_casia_fasd(args.source_dir, args.target_dir, args.frame_stride, args.workers)
             print(f"\nDataset organized in {args.target_dir}/")
             print(f"Real images: {len(list((Path(args.target_dir) / 'real').glob('*.jpg')))}")
             print(f"Spoof images: {len(list((Path(args.target_dir) / 'spoof').glob('*.jpg')))}")
@@ -153,7 +162,7 @@ def main():
         print("   python scripts/download_dataset.py --dataset replay --source-dir <extracted_path>")
         
         if args.source_dir:
-            organize_replay_attack(args.source_dir, args.target_dir)
+            organize_replay_attack(args.source_dir, args.target_dir, args.frame_stride, args.workers)
             print(f"\nDataset organized in {args.target_dir}/")
             print(f"Real images: {len(list((Path(args.target_dir) / 'real').glob('*.jpg')))}")
             print(f"Spoof images: {len(list((Path(args.target_dir) / 'spoof').glob('*.jpg')))}")
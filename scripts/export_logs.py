@@ -0,0 +1,99 @@
+"""
+Inference log export script
+Streams logs from the SQLite partitions to NDJSON or CSV with constant memory,
+optionally writing thumbnails to a sidecar tar archive
+"""
+import argparse
+import sys
+import tarfile
+from pathlib import Path
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'backend'))
+
+from utils.database import InferenceLogger
+from utils.log_export import export_chunks, with_thumbnail_sidecar
+
+
+def export_logs(db_path, output, export_format="ndjson", thumbnails=None,
+                since=None, until=None, is_real=None, chunk_size=1000):
+    """
+    Export logs to a file (or stdout)
+    Args:
+        db_path: Main inference log database
+        output: Output path, or "-" for stdout
+        export_format: "ndjson" or "csv"
+        thumbnails: Optional tar path for <id>.jpg thumbnails
+        since: Earliest timestamp, 'YYYY-MM-DD HH:MM:SS' UTC
+        until: Latest timestamp (exclusive)
+        is_real: Only real (True) or spoof (False) results
+        chunk_size: Rows fetched per database query
+    Returns: Number of exported rows
+    """
+    # Read-only: an export never creates files or applies retention
+    inference_logger = InferenceLogger(db_path, async_writes=False, read_only=True)
+    logs = inference_logger.iter_logs(
+        since=since,
+        until=until,
+        is_real=is_real,
+        include_thumbnails=thumbnails is not None,
+        chunk_size=chunk_size
+    )
+
+    tar_file = tarfile.open(thumbnails, "w") if thumbnails else None
+    if tar_file is not None:
+        logs = with_thumbnail_sidecar(logs, tar_file)
+
+    count = 0
+
+    def counted(entries):
+        nonlocal count
+        for entry in entries:
+            count += 1
+            yield entry
+
+    out = sys.stdout if output == "-" else open(output, "w", newline="")
+    try:
+        for chunk in export_chunks(counted(logs), export_format):
+            out.write(chunk)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+        if tar_file is not None:
+            tar_file.close()
+
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export inference logs")
+    parser.add_argument("--db", default="backend/inference_logs.db",
+                        help="Main inference log database")
+    parser.add_argument("--format", choices=["ndjson", "csv"], default="ndjson",
+                        help="Output format")
+    parser.add_argument("--output", default="-",
+                        help="Output file (default: stdout)")
+    parser.add_argument("--thumbnails", default=None,
+                        help="Also write thumbnails to this tar archive")
+    parser.add_argument("--since", default=None,
+                        help="Earliest timestamp, 'YYYY-MM-DD HH:MM:SS' UTC")
+    parser.add_argument("--until", default=None,
+                        help="Latest timestamp (exclusive)")
+    parser.add_argument("--real-only", action="store_const", const=True, dest="is_real",
+                        help="Only export real results")
+    parser.add_argument("--spoof-only", action="store_const", const=False, dest="is_real",
+                        help="Only export spoof results")
+    parser.add_argument("--chunk-size", type=int, default=1000,
+                        help="Rows fetched per database query")
+    args = parser.parse_args()
+
+    count = export_logs(
+        args.db, args.output, args.format, args.thumbnails,
+        since=args.since, until=args.until, is_real=args.is_real,
+        chunk_size=args.chunk_size
+    )
+    print(f"Exported {count} logs", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
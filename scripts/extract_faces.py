@@ -0,0 +1,217 @@
+"""
+Video to face-crop extraction
+Decodes dataset videos across a process pool, samples frames, detects faces and
+writes the crops into real/ and spoof/ with per-video provenance
+"""
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import cv2
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'backend'))
+
+VIDEO_EXTENSIONS = (".avi", ".mov", ".mp4", ".mkv")
+
+# Provenance of extracted crops, kept in the dataset root next to real/ and spoof/
+EXTRACT_MANIFEST = "extract_manifest.json"
+
+# One FaceDetector per worker process, created by _init_worker
+_face_detector = None
+
+
+def _init_worker():
+    """Process pool initializer: MediaPipe is created inside each worker"""
+    global _face_detector
+    from utils.face_detector import FaceDetector
+
+    _face_detector = FaceDetector()
+
+
+def frame_stride_for(capture, frame_stride=1, sample_fps=None):
+    """Frames to advance between samples (sample_fps overrides frame_stride)"""
+    if sample_fps:
+        video_fps = capture.get(cv2.CAP_PROP_FPS) or 0
+        if video_fps > 0:
+            return max(1, round(video_fps / sample_fps))
+    return max(1, frame_stride)
+
+
+def extract_video(video_path, class_name, target_dir, frame_stride=5, sample_fps=None,
+                  max_frames=None, jpeg_quality=95):
+    """
+    Extract face crops from one video (runs in a worker process)
+    Skipped frames are only grabbed, not decoded, so sparse sampling is cheap.
+    Crops are named by content hash, like model/preprocess_dataset.organize_files.
+    Args:
+        video_path: Video file
+        class_name: "real" or "spoof"
+        target_dir: Dataset directory
+        frame_stride: Sample every frame_stride-th frame
+        sample_fps: Sample this many frames per second of video instead
+        max_frames: Stop after this many sampled frames
+        jpeg_quality: JPEG quality of the crops
+    Returns: Provenance dict for the manifest
+    """
+    capture = cv2.VideoCapture(str(video_path))
+    if not capture.isOpened():
+        return {"class": class_name, "error": "Could not open video", "crops": []}
+
+    stride = frame_stride_for(capture, frame_stride, sample_fps)
+    class_dir = Path(target_dir) / class_name
+    crops = []
+    frame_index = -1
+    sampled = 0
+
+    try:
+        while max_frames is None or sampled < max_frames:
+            if not capture.grab():
+                break
+            frame_index += 1
+            if frame_index % stride:
+                continue
+
+            ok, frame = capture.retrieve()
+            if not ok:
+                break
+            sampled += 1
+
+            bbox = _face_detector.detect_face(frame)
+            face_roi = _face_detector.extract_face_roi(frame, bbox) if bbox else None
+            if face_roi is None:
+                continue
+
+            _, buffer = cv2.imencode('.jpg', face_roi, [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality])
+            data = buffer.tobytes()
+            name = f"{hashlib.sha256(data).hexdigest()}.jpg"
+            crop_path = class_dir / name
+            if not crop_path.exists():
+                crop_path.write_bytes(data)
+            crops.append({"file": f"{class_name}/{name}", "frame": frame_index, "bbox": list(bbox)})
+    finally:
+        capture.release()
+
+    return {
+        "class": class_name,
+        "frame_stride": stride,
+        "frames_read": frame_index + 1,
+        "frames_sampled": sampled,
+        "crops": crops
+    }
+
+
+def extract_faces(videos, target_dir, workers=None, frame_stride=5, sample_fps=None,
+                  max_frames=None):
+    """
+    Extract face crops from many videos in parallel
+    Videos already in target_dir/extract_manifest.json are skipped, so an
+    interrupted run can be resumed.
+    Args:
+        videos: Iterable of (video path, class name) pairs
+        target_dir: Dataset directory
+        workers: Worker processes (default: CPU count)
+        frame_stride: Sample every frame_stride-th frame
+        sample_fps: Sample this many frames per second of video instead
+        max_frames: Maximum sampled frames per video
+    Returns: Number of crops written in this run
+    """
+    target_path = Path(target_dir)
+    manifest_path = target_path / EXTRACT_MANIFEST
+    if manifest_path.exists():
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+    else:
+        manifest = {"videos": {}}
+
+    tasks = [(str(video), class_name) for video, class_name in videos
+             if str(video) not in manifest["videos"]]
+    for class_name in {class_name for _, class_name in tasks}:
+        (target_path / class_name).mkdir(parents=True, exist_ok=True)
+
+    print(f"Extracting faces from {len(tasks)} videos "
+          f"({len(manifest['videos'])} already done)...")
+
+    total_crops = 0
+    # spawn: MediaPipe is not fork-safe once initialized
+    with ProcessPoolExecutor(
+        max_workers=workers or os.cpu_count(),
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker
+    ) as pool:
+        futures = {
+            pool.submit(extract_video, video, class_name, str(target_path),
+                        frame_stride, sample_fps, max_frames): video
+            for video, class_name in tasks
+        }
+        for done, future in enumerate(as_completed(futures), 1):
+            video = futures[future]
+            try:
+                provenance = future.result()
+            except Exception as e:
+                print(f"\n  {video}: {e}")
+                continue
+            manifest["videos"][video] = provenance
+            total_crops += len(provenance["crops"])
+            print(f"\r  {done}/{len(tasks)} videos, {total_crops} face crops", end="", flush=True)
+
+            # Checkpoint periodically so a crash loses little work
+            if done % 50 == 0:
+                _write_manifest(manifest_path, manifest)
+    print()
+
+    _write_manifest(manifest_path, manifest)
+    return total_crops
+
+
+def _write_manifest(manifest_path, manifest):
+    """Write the manifest atomically"""
+    tmp_path = manifest_path.with_suffix(".json.tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(tmp_path, manifest_path)
+
+
+def find_videos(folder):
+    """All video files under a folder"""
+    return sorted(p for p in Path(folder).rglob("*") if p.suffix.lower() in VIDEO_EXTENSIONS)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Extract face crops from dataset videos")
+    parser.add_argument("--real", nargs="*", default=[],
+                        help="Folders with real (live) videos")
+    parser.add_argument("--spoof", nargs="*", default=[],
+                        help="Folders with spoof (attack) videos")
+    parser.add_argument("--target-dir", default="datasets",
+                        help="Dataset directory (crops go to real/ and spoof/)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Worker processes (default: CPU count)")
+    parser.add_argument("--frame-stride", type=int, default=5,
+                        help="Sample every N-th frame")
+    parser.add_argument("--sample-fps", type=float, default=None,
+                        help="Sample this many frames per second instead of --frame-stride")
+    parser.add_argument("--max-frames", type=int, default=None,
+                        help="Maximum sampled frames per video")
+    args = parser.parse_args()
+
+    videos = [(video, "real") for folder in args.real for video in find_videos(folder)]
+    videos += [(video, "spoof") for folder in args.spoof for video in find_videos(folder)]
+    if not videos:
+        print("No videos found")
+        sys.exit(1)
+
+    crops = extract_faces(
+        videos, args.target_dir, args.workers,
+        frame_stride=args.frame_stride, sample_fps=args.sample_fps, max_frames=args.max_frames
+    )
+    print(f"Wrote {crops} face crops to {args.target_dir}/")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,7 +2,6 @@
 Automated Model Training Script
 Trains the face liveness detection model
 """
-import os
 import sys
 from pathlib import Path
 
@@ -10,6 +9,7 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent / 'backend'))
 
 from model.train_model import train_model
+from model.preprocess_dataset import shards_up_to_date
 
 
 def main():
@@ -56,6 +56,16 @@ def main():
     epochs = 10
     batch_size = 32
     
+    # Preprocessed shards skip JPEG decoding; only used while they match the dataset
+    shard_dir = dataset_dir / "shards"
+    if shards_up_to_date(dataset_dir, shard_dir):
+        print(f"\n📦 Using preprocessed shards in {shard_dir}")
+    else:
+        if (shard_dir / "manifest.json").exists():
+            print(f"\n⚠️  Shards in {shard_dir} are out of date; decoding images instead")
+        print(f"   Speed up repeated runs: python backend/model/preprocess_dataset.py shard {dataset_dir} {shard_dir}")
+        shard_dir = None
+    
     print(f"\n🚀 Starting training...")
     print(f"  Epochs: {epochs}")
     print(f"  Batch size: {batch_size}")
@@ -70,7 +80,8 @@ def main():
             epochs=epochs,
             batch_size=batch_size,
             validation_split=0.2,
-            test_split=0.1
+            test_split=0.1,
+            shard_dir=str(shard_dir) if shard_dir else None
         )
         
         print("\n" + "=" * 60)